@@ -34,26 +34,74 @@ echo "giving ownership of /data/ to ubuntu"
 chown -R ubuntu:ubuntu /data/
 chgrp -R ubuntu /data/
 
-# Update the Nginx configuration to serve the content 
+# Update the Nginx configuration to serve the content
 # of /data/web_static/current/ to https://travortech.tech/hbnb_static
-printf %s "server {
+# The server block below is rendered by deploy/nginx.py (regenerate it with
+# python3 -m deploy.nginx --embed 0-setup_web_static.sh), so the script
+# runs on its own; it is checked before the restart, so a bad config never
+# replaces a working one
+echo "writing nginx configuration"
+cat > /tmp/hbnb_nginx.conf <<'NGINX'
+server {
     listen 80 default_server;
     listen [::]:80 default_server;
-    add_header X-Served-By $HOSTNAME;
-    root   /var/www/html;
-    index  index.html index.htm;
-    
-    location /hbnb_static {
-        alias /data/web_static/current;
+    add_header X-Served-By $hostname;
+    root /var/www/html;
+    index index.html index.htm;
+
+    sendfile on;
+    tcp_nopush on;
+    tcp_nodelay on;
+    keepalive_timeout 65;
+    open_file_cache max=10000 inactive=60s;
+    open_file_cache_valid 60s;
+    open_file_cache_min_uses 2;
+    open_file_cache_errors on;
+
+    gzip on;
+    gzip_vary on;
+    gzip_comp_level 5;
+    gzip_min_length 256;
+    gzip_types text/css application/javascript image/svg+xml;
+
+    location = /hbnb_static {
+        return 301 /hbnb_static/;
+    }
+
+    location /hbnb_static/ {
+        alias /data/web_static/current/;
         index index.html index.htm;
+        gzip_static on;
+        add_header X-Served-By $hostname;
+        add_header Cache-Control "public, max-age=60, must-revalidate";
+
+        location ~* "\.[0-9a-f]{10}\.(css|js)$" {
+            gzip_static on;
+            access_log off;
+            add_header X-Served-By $hostname;
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }
+
+        location ~* "\.(png|jpe?g|gif|ico|svg|webp)$" {
+            access_log off;
+            add_header X-Served-By $hostname;
+            add_header Cache-Control "public, max-age=604800";
+        }
     }
+
     error_page 404 /404.html;
     location /404 {
-      root /var/www/html;
-      internal;
+        root /var/www/html;
+        internal;
     }
-}" > /etc/nginx/sites-available/default
-
+}
+NGINX
+cp /etc/nginx/sites-available/default /tmp/hbnb_nginx.conf.bak
+cp /tmp/hbnb_nginx.conf /etc/nginx/sites-available/default
+if ! nginx -t; then
+    cp /tmp/hbnb_nginx.conf.bak /etc/nginx/sites-available/default
+    exit 1
+fi
 
 service nginx restart
 
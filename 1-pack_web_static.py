@@ -1,22 +1,18 @@
 #!/usr/bin/python3
 # Fabfile to generates a .tgz archive from the contents of web_static.
-import os.path
-from datetime import datetime
-from fabric.api import local
+from deploy.assets import build, format_report
+from deploy.pack import pack
 
 
-def do_pack():
-    """Create a tar gzipped archive of the directory web_static."""
-    dt = datetime.utcnow()
-
-    attrs = ["year", "month", "day", "hour", "minute", "second"]
-    path_is = f"versions/web_static_{''.join(getattr(dt, x) for x in attrs)}.tgz"
-    
-    if (
-        os.path.isdir("versions") is False
-        and local("mkdir -p versions").failed is True
-    ):
-        return None
-    if local("tar -cvzf {} web_static".format(path_is)).failed is True:
+def do_pack(fmt="gz"):
+    """Create an archive of the directory web_static.
+    web_static is first built into build/web_static: stylesheets bundled,
+    minified and fingerprinted, text files precompressed. The archive is
+    named after the built content, and an existing archive of the same
+    content is reused. fmt is gz, zst (multi-threaded zstd) or tar.
+    """
+    try:
+        print(format_report(build("web_static", "build/web_static")))
+        return pack("build/web_static", "versions", fmt)
+    except OSError:
         return None
-    return path_is
\ No newline at end of file
@@ -5,6 +5,9 @@ from fabric.api import env
 from fabric.api import put
 from fabric.api import run
 
+from deploy.pack import FORMATS, detect
+from deploy.remote import release_script
+
 env.hosts = ["34.74.227.185", "100.24.126.241"]
 
 
@@ -21,21 +24,13 @@ def do_deploy(archive_path):
     
     file = archive_path.split("/")[-1]
     name = file.split(".")[0]
+    try:
+        option = FORMATS[detect(archive_path)].tar_option
+    except (OSError, ValueError):
+        return False
 
     if put(archive_path, f"/tmp/{file}").failed:
         return False
 
-
-    to_run = [
-        f"rm -rf /data/web_static/releases/{name}/",
-        f"mkdir -p /data/web_static/releases/{name}/",
-        f"tar -xzf /tmp/{file} -C /data/web_static/releases/{name}/",
-        f"rm /tmp/{file}",
-        f"mv /data/web_static/releases/{name}/web_static/* "
-        f"/data/web_static/releases/{name}/",
-        f"rm -rf /data/web_static/releases/{name}/web_static",
-        "rm -rf /data/web_static/current",
-        f"ln -s /data/web_static/releases/{name}/ /data/web_static/current"
-    ]
-
-    return not any(run(command).failed for command in to_run)
\ No newline at end of file
+    script = release_script(name, source=f"/tmp/{file}", option=option)
+    return not run(script).failed
\ No newline at end of file
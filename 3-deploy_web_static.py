@@ -1,33 +1,32 @@
 #!/usr/bin/python3
 # Fabfile to create and distribute an archive to a web server.
 import os.path
-from datetime import datetime
 
 
 from fabric.api import env
-from fabric.api import local
 from fabric.api import put
-from fabric.api import run, sudo
+from fabric.api import run, sudo, runs_once
 
+from deploy.assets import build, format_report
+from deploy.pack import FORMATS, detect, pack
+from deploy.remote import SshHost, deploy_all, release_script
 
-env.hosts = ["34.74.227.185", "100.24.126.241"]
 
+env.hosts = ["34.74.227.185", "100.24.126.241"]
 
-def do_pack():
-    """Create a tar gzipped archive of the directory web_static."""
-    dt = datetime.utcnow()
 
-    attrs = ["year", "month", "day", "hour", "minute", "second"]
-    path_is = f"versions/web_static_{''.join(str(getattr(dt, x)) for x in attrs)}.tgz"
-    
-    if (
-        os.path.isdir("versions") is False
-        and local("mkdir -p versions").failed is True
-    ):
-        return None
-    if local("tar -cvzf {} web_static".format(path_is)).failed is True:
+def do_pack(fmt="gz"):
+    """Create an archive of the directory web_static.
+    web_static is first built into build/web_static: stylesheets bundled,
+    minified and fingerprinted, text files precompressed. The archive is
+    named after the built content, and an existing archive of the same
+    content is reused. fmt is gz, zst (multi-threaded zstd) or tar.
+    """
+    try:
+        print(format_report(build("web_static", "build/web_static")))
+        return pack("build/web_static", "versions", fmt)
+    except OSError:
         return None
-    return path_is
 
 
 def do_deploy(archive_path):
@@ -43,28 +42,47 @@ def do_deploy(archive_path):
     
     file = archive_path.split("/")[-1]
     name = file.split(".")[0]
+    try:
+        option = FORMATS[detect(archive_path)].tar_option
+    except (OSError, ValueError):
+        return False
 
     if put(archive_path, f"/tmp/{file}").failed:
         return False
 
+    script = release_script(name, source=f"/tmp/{file}", option=option)
+    return not sudo(script).failed
 
-    to_run = [
-        f"rm -rf /data/web_static/releases/{name}/",
-        f"mkdir -p /data/web_static/releases/{name}/",
-        f"tar -xzf /tmp/{file} -C /data/web_static/releases/{name}/",
-        f"rm /tmp/{file}",
-        f"mv /data/web_static/releases/{name}/web_static/* "
-        f"/data/web_static/releases/{name}/",
-        f"rm -rf /data/web_static/releases/{name}/web_static",
-        "rm -rf /data/web_static/current",
-        f"ln -s /data/web_static/releases/{name}/ /data/web_static/current"
-    ]
-    return not any(sudo(command).failed for command in to_run)
 
-
-def deploy():
+def deploy(fmt="gz"):
     """Create and distribute an archive to a web server."""
-    file = do_pack()
+    file = do_pack(fmt)
+    if not file:
+        return False
+    return do_deploy(file)
+
+
+@runs_once
+def deploy_parallel(parallel=4, delta=False, keep=None, fmt="gz"):
+    """Create an archive and distribute it to every host at once.
+    Each host gets the archive and its release script in one ssh session,
+    at most `parallel` hosts at a time. With delta, only the files that
+    differ from the current release are sent and the others hardlinked;
+    with keep, only the newest `keep` releases are left. fmt is the
+    archive format, as for do_pack.
+    """
+    file = do_pack(fmt)
     if not file:
         return False
-    return do_deploy(file)
\ No newline at end of file
+    key = env.key_filename
+    if isinstance(key, (list, tuple)):
+        key = key[0] if key else None
+    hosts = [SshHost(host, env.user, key) for host in env.hosts]
+    results = deploy_all(file, hosts, int(parallel),
+                         delta=str(delta).lower() in ("1", "true", "yes"),
+                         keep=None if keep is None else int(keep))
+    for result in results:
+        status = "ok" if result.ok else f"failed: {result.error}"
+        print(f"{result.host}: {result.sent} bytes in "
+              f"{result.seconds:.2f}s {status}")
+    return all(result.ok for result in results)
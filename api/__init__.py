@@ -0,0 +1,2 @@
+#!/usr/bin/python3
+"""Read-only JSON API over the hbnb storage"""
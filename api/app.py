@@ -0,0 +1,324 @@
+#!/usr/bin/python3
+"""Serves storage as a read-only JSON API over HTTP/1.1 with asyncio
+
+Routes, under /api/v1:
+    /status                      {"status": "OK"}
+    /stats                       number of objects per class
+    /<objects>                   every object of a class: /states, ...
+    /<objects>/<id>              one object
+    /<objects>/<id>/<related>    related objects: /states/<id>/cities
+
+Responses are serialized once and kept until storage reports a change
+to one of their classes. Each has a strong ETag, a hash of its body,
+and a request whose If-None-Match holds it gets an empty 304.
+
+Usage: HBNB_API_HOST=0.0.0.0 HBNB_API_PORT=5000 python3 -m api.app
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, NamedTuple, Set
+
+from models import metrics
+from models import storage
+from models.base_model import BaseModel
+
+PREFIX = "/api/v1/"
+CLASSES = {
+    "amenities": "Amenity", "cities": "City", "places": "Place",
+    "reviews": "Review", "states": "State", "users": "User"
+}
+# (parent, related): the related class and its key to the parent, or
+# None for a list attribute of the parent
+RELATIONS = {
+    ("states", "cities"): ("City", "state_id"),
+    ("cities", "places"): ("Place", "city_id"),
+    ("users", "places"): ("Place", "user_id"),
+    ("places", "reviews"): ("Review", "place_id"),
+    ("users", "reviews"): ("Review", "user_id"),
+    ("places", "amenities"): ("Amenity", None),
+}
+# attributes never served
+PRIVATE = {"password"}
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request",
+           404: "Not Found", 405: "Method Not Allowed"}
+# bodies at least this large are also kept gzipped
+GZIP_MIN = 1024
+MAX_HEADERS = 100
+
+
+class Response(NamedTuple):
+    """a serialized response and the classes it was built from"""
+    status: int
+    body: bytes
+    etag: str
+    classes: frozenset
+    gzipped: bytes = None
+
+
+def serialize(obj: BaseModel) -> dict:
+    """returns the public attributes of obj, without loaded relations"""
+    return {key: value for key, value in obj.to_dict().items()
+            if key not in PRIVATE and not isinstance(value, BaseModel)
+            and not (isinstance(value, list) and value and
+                     isinstance(value[0], BaseModel))}
+
+
+def respond(status: int, data, classes=()) -> Response:
+    """returns the JSON response of data"""
+    body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    gzipped = None
+    if len(body) >= GZIP_MIN:
+        gzipped = gzip.compress(body, 6, mtime=0)
+    return Response(status, body, etag, frozenset(classes), gzipped)
+
+
+def matches(header: str, etag: str) -> bool:
+    """returns whether an If-None-Match header holds etag"""
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag
+                                   for tag in tags)
+
+
+class Api:
+    """Builds and caches the responses of the API.
+    Attributes:
+        cache (dict): Response of each path, None when caching is off.
+        refresh (float): Seconds between checks for writes made by other
+            processes, None to never check.
+        hits (int): Responses served from the cache.
+        misses (int): Responses built.
+    """
+
+    def __init__(self, cache: bool = True, refresh: float = 1.0):
+        """creates the API and starts listening to storage changes"""
+        self.cache: Dict[str, Response] = {} if cache else None
+        self.by_class: Dict[str, Set[str]] = {}
+        self.refresh = refresh
+        self.refreshed = 0.0
+        self.touched = False
+        self.hits = self.misses = 0
+        storage.add_listener(self.changed)
+
+    def close(self):
+        """stops listening to storage changes"""
+        storage.remove_listener(self.changed)
+
+    def changed(self, event: str, obj: BaseModel = None):
+        """Drops the responses built from the class of a changed object.
+        A save with no change reported since the previous one may follow
+        attributes set in place, so it drops every response, like reload.
+        """
+        if self.cache is None:
+            return
+        if obj is not None:
+            for path in self.by_class.pop(type(obj).__name__, ()):
+                self.cache.pop(path, None)
+            self.touched = True
+        elif event == "save" and self.touched:
+            self.touched = False
+        else:
+            self.cache.clear()
+            self.by_class.clear()
+            self.touched = False
+
+    def response(self, path: str) -> Response:
+        """returns the response of path, from the cache when possible"""
+        if self.refresh is not None and \
+                time.monotonic() - self.refreshed >= self.refresh:
+            self.refreshed = time.monotonic()
+            storage.refresh()
+        if self.cache is not None and path in self.cache:
+            self.hits += 1
+            metrics.counters["cache_hits.api"] += 1
+            return self.cache[path]
+        self.misses += 1
+        if self.cache is not None:
+            metrics.counters["cache_misses.api"] += 1
+        response = self.build(path)
+        if self.cache is not None and response.status == 200:
+            self.cache[path] = response
+            for name in response.classes:
+                self.by_class.setdefault(name, set()).add(path)
+        return response
+
+    def build(self, path: str) -> Response:
+        """serializes the response of path"""
+        parts = path[len(PREFIX):].strip("/").split("/") \
+            if path.startswith(PREFIX) else []
+        missing = respond(404, {"error": "Not found"})
+        if parts == ["status"]:
+            return respond(200, {"status": "OK"})
+        if parts == ["stats"]:
+            return respond(200, {plural: storage.count(name)
+                                 for plural, name in CLASSES.items()},
+                           CLASSES.values())
+        if not parts or parts[0] not in CLASSES:
+            return missing
+        name = CLASSES[parts[0]]
+        if len(parts) == 1:
+            return respond(200, [serialize(obj) for obj in
+                                 storage.all(name).values()], [name])
+        obj = storage.get(name, parts[1])
+        if obj is None or len(parts) > 3:
+            return missing
+        if len(parts) == 2:
+            return respond(200, serialize(obj), [name])
+        if (parts[0], parts[2]) not in RELATIONS:
+            return missing
+        related, key = RELATIONS[(parts[0], parts[2])]
+        if key is None:
+            objs = getattr(obj, parts[2])
+        else:
+            objs = [child for child in storage.all(related).values()
+                    if getattr(child, key, None) == obj.id]
+        return respond(200, [serialize(child) for child in objs],
+                       [name, related])
+
+    def reply(self, method: str, target: str, headers: Dict[str, str],
+              keep: bool) -> bytes:
+        """returns the bytes of the response to one request"""
+        extra = [] if keep else ["Connection: close"]
+        if method not in ("GET", "HEAD"):
+            response = respond(405, {"error": "Method not allowed"})
+            extra.append("Allow: GET, HEAD")
+        else:
+            response = self.response(target.partition("?")[0])
+        body, etag = response.body, response.etag
+        if response.gzipped and \
+                "gzip" in headers.get("accept-encoding", ""):
+            body, etag = response.gzipped, etag[:-1] + '-gz"'
+            extra.append("Content-Encoding: gzip")
+        status = response.status
+        if status == 200:
+            extra += [f"ETag: {etag}", "Cache-Control: no-cache",
+                      "Vary: Accept-Encoding"]
+            if matches(headers.get("if-none-match"), etag):
+                status, body = 304, b""
+        if method == "HEAD" or status == 304:
+            length, body = len(body), b""
+        else:
+            length = len(body)
+        head = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        if status != 304:
+            head += ["Content-Type: application/json",
+                     f"Content-Length: {length}"]
+        return ("\r\n".join(head + extra) + "\r\n\r\n").encode() + body
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """answers the requests of one keep-alive connection"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = line.decode("latin-1").split()
+                headers = {}
+                while len(headers) <= MAX_HEADERS:
+                    raw = await reader.readline()
+                    if raw in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = raw.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(request) != 3 or len(headers) > MAX_HEADERS:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\n"
+                                 b"Content-Length: 0\r\n"
+                                 b"Connection: close\r\n\r\n")
+                    break
+                method, target, version = request
+                length = headers.get("content-length", "0")
+                if length.isdigit() and int(length):
+                    await reader.readexactly(int(length))
+                connection = headers.get("connection", "").lower()
+                keep = connection == "keep-alive" or \
+                    (version == "HTTP/1.1" and connection != "close")
+                writer.write(self.reply(method, target, headers, keep))
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+class ApiServer:
+    """Runs an Api on its own event loop in a background thread.
+    Attributes:
+        api (Api): The API served.
+        port (int): The port bound, chosen by the system when 0 is asked.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 api: Api = None):
+        """creates a server of api on host and port"""
+        self.api = api or Api()
+        self.host = host
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.thread = None
+        self.server = None
+
+    def start(self) -> "ApiServer":
+        """binds the port and serves in a background thread"""
+        self.server = self.loop.run_until_complete(asyncio.start_server(
+            self.api.handle, self.host, self.port))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """stops serving and closes the loop"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.run_until_complete(self._cancel())
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+        self.api.close()
+
+    @staticmethod
+    async def _cancel():
+        """cancels the connections still open"""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def serve(host: str, port: int, api: Api = None):
+    """serves api on host and port until cancelled"""
+    api = api or Api()
+    server = await asyncio.start_server(api.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> int:
+    """serves the API on HBNB_API_HOST and HBNB_API_PORT, writing the
+    metrics to HBNB_METRICS_TEXTFILE when set
+    """
+    host = os.getenv("HBNB_API_HOST", "0.0.0.0")
+    port = int(os.getenv("HBNB_API_PORT", "5000"))
+    metrics.export_from_env()
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,15 @@
 #!/usr/bin/python3
 """command line parser"""
 import re
-from typing import Dict, Callable, List, Union, Any
-from dataclasses import dataclass
+import threading
+from collections import OrderedDict
+from queue import Queue
+from typing import Dict, Callable, List, NamedTuple, Union, Any
 from enum import Enum
 from cmd import Cmd as BaseCmd
 
 
-@dataclass
-class Token:
+class Token(NamedTuple):
     """Token class"""
     type: str
     value: str
@@ -17,13 +18,33 @@ class Token:
         return f"{self.type}: {self.value}"
 
 
-@dataclass
-class Cmd:
+class Cmd(NamedTuple):
     """cmd class"""
     function: Callable
     args: List
 
 
+# above this many capture groups, backtracking state copies make unrolled
+# plans slower than the general grammar
+PLAN_MAX_GROUPS = 1000
+
+
+class Parsed(NamedTuple):
+    """a line parsed ahead of its execution"""
+    number: int
+    line: str
+    cmd: Union[str, None]
+    args: Union[List, None]
+
+
+class CacheInfo(NamedTuple):
+    """parse plan cache statistics"""
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
 class RULE(Enum):
     """Rule Enums"""
     RECURSIVE = 'RECURSIVE'
@@ -42,7 +63,7 @@ def create_match_func(_type: str, match_actions: dict = None) -> Callable:
 
 
 def build_scanner(patterns: Dict[str, str],
-                  match_actions: dict = None) -> Scanner:
+                  match_actions: dict = None) -> re.Scanner:
     """builds a Scanner from a dict"""
     new_patterns = [
         (value, create_match_func(key, match_actions))
@@ -51,7 +72,7 @@ def build_scanner(patterns: Dict[str, str],
     return re.Scanner(new_patterns)
 
 
-def create_args(args, match_actions: dict = None) -> List[Rule]:
+def create_args(args, match_actions: dict = None) -> List["Rule"]:
     """creates args for te inbuilt scanner"""
     pats = {
         RULE.RECURSIVE: r"r<([a-zA-Z_|][a-zA-Z0-9_|]*\s*?)+>",
@@ -183,14 +204,234 @@ class Rule:
         return f"{self.rule_type}: {self.rule}"
 
 
+class Parser:
+    """A command grammar compiled into one regex.
+    Every token is matched atomically, guarded by negative lookaheads for
+    every pattern listed before it, so the regex accepts the same token
+    types the scanner would produce, in a single pass. Atomic groups
+    (?>...) need Python 3.11, so they are emulated: a lookahead captures
+    what the token matches first and a backreference consumes it. Group
+    numbers are allocated in the order the groups open in the regex.
+    Token patterns must not contain capturing groups.
+    """
+
+    def __init__(self, rules: List[Rule], patterns: Dict[str, str],
+                 match_actions: dict) -> None:
+        """compiles rules against the scanner patterns"""
+        self.rules = rules
+        self.patterns = patterns
+        self.actions = match_actions
+        self.ignore = patterns.get("ignore")
+
+        self.tokens = {}
+        higher = []
+        for name, pattern in patterns.items():
+            if re.compile(pattern).groups:
+                raise ValueError(f"pattern {name} has capturing groups")
+            guard = f"(?!{'|'.join(higher)})" if higher else ""
+            self.tokens[name] = f"{guard}(?:{pattern})"
+            higher.append(f"(?:{pattern})")
+
+        self.regex, self.extract = self.compile_seq(rules)
+
+    @staticmethod
+    def atomic(frag: str, groups: List[int]) -> str:
+        """returns frag matched like (?>frag), in the next group"""
+        groups[0] += 1
+        # named, as \100 and up would read as octal escapes
+        return f"(?=(?P<a{groups[0]}>{frag}))(?P=a{groups[0]})"
+
+    def sep(self, groups: List[int]) -> str:
+        """returns the regex of the ignored text between two tokens"""
+        if not self.ignore:
+            return ""
+        return self.atomic(f"(?:{self.ignore})*", groups)
+
+    def token(self, name: str, groups: List[int]) -> str:
+        """returns the regex of one token of type name"""
+        return self.atomic(self.tokens[name], groups)
+
+    @staticmethod
+    def capture(groups: List[int]) -> int:
+        """returns the index of the next group among the match groups"""
+        groups[0] += 1
+        return groups[0] - 1
+
+    def fragment(self, rule: Rule, groups: List[int],
+                 capture: bool = False):
+        """Returns the regex of rule and, when capture is set, a function
+        reading its value from the groups of a match.
+        """
+        actions = self.actions
+
+        if rule.rule_type == RULE.SINGLE:
+            if not capture:
+                return self.token(rule.rule, groups), None
+            index = self.capture(groups)
+            frag = f"({self.token(rule.rule, groups)})"
+            action = actions.get(rule.rule)
+            if action is None:
+                return frag, lambda values: values[index]
+            return frag, lambda values: action(values[index])
+
+        if rule.rule_type == RULE.MANY:
+            names = [name for name in self.patterns
+                     if name in rule.rule.split()]
+            if not capture:
+                return "(?:" + "|".join(
+                    self.token(name, groups) for name in names) + ")", None
+            alts = []
+            frags = []
+            for name in names:
+                alts.append((self.capture(groups), actions.get(name)))
+                frags.append(f"({self.token(name, groups)})")
+
+            def many(values):
+                """returns the value of the alternative that matched"""
+                for i, action in alts:
+                    value = values[i]
+                    if value is not None:
+                        return action(value) if action else value
+            return "(?:" + "|".join(frags) + ")", many
+
+        index = self.capture(groups) if capture else None
+        item = []
+        for sub in rule.rule:
+            item.append(self.sep(groups))
+            item.append(self.fragment(sub, groups)[0])
+        frag = f"(?:{''.join(item)})*"
+        if not capture:
+            return frag, None
+        item_regex, item_extract = self.compile_seq(rule.rule, trail=False)
+        finditer = item_regex.finditer
+
+        def recursive(values):
+            """returns the values of every repetition"""
+            return [item_extract(m) for m in finditer(values[index])]
+        return f"({frag})", recursive
+
+    def compile_seq(self, rules: List[Rule], trail: bool = True):
+        """Compiles a sequence of rules, led by ignored text, into a regex
+        and a function returning one value per rule from a match of it.
+        """
+        groups = [0]
+        parts = [self.sep(groups)]
+        extractors = []
+        for i, rule in enumerate(rules):
+            if i:
+                parts.append(self.sep(groups))
+            frag, extract = self.fragment(rule, groups, capture=True)
+            parts.append(frag)
+            extractors.append(extract)
+        if trail:
+            parts.append(self.sep(groups))
+        regex = re.compile("".join(parts))
+
+        def extract(match):
+            """returns the values of the rules in match"""
+            values = match.groups()
+            return [func(values) for func in extractors]
+        return regex, extract
+
+    def plan(self, values: List[Any]):
+        """Compiles the rules unrolled to the repetition counts found in
+        values, a result of parse. Returns a regex and a function reading
+        the values from one of its matches, or None for shapes needing
+        more than PLAN_MAX_GROUPS groups.
+        """
+        groups = [0]
+        lead = self.sep(groups)
+        frag, extract = self.plan_seq(self.rules, values, groups)
+        trail = self.sep(groups)
+        if groups[0] > PLAN_MAX_GROUPS:
+            return None
+        regex = re.compile(lead + frag + trail)
+        return regex, lambda match: extract(match.groups())
+
+    def plan_seq(self, rules: List[Rule], values: List[Any],
+                 groups: List[int]):
+        """returns the fragment and extractor of rules unrolled to values"""
+        parts = []
+        extractors = []
+
+        for i, (rule, value) in enumerate(zip(rules, values)):
+            if i:
+                parts.append(self.sep(groups))
+            if rule.rule_type == RULE.RECURSIVE:
+                items = []
+                for item in value:
+                    sep = self.sep(groups)
+                    frag, extract = self.plan_seq(rule.rule, item, groups)
+                    parts.append(sep + frag)
+                    items.append(extract)
+                extractors.append(self.plan_list(items))
+            else:
+                frag, extract = self.fragment(rule, groups, capture=True)
+                parts.append(frag)
+                extractors.append(extract)
+
+        return "".join(parts), self.plan_list(extractors)
+
+    @staticmethod
+    def plan_list(extractors: List[Callable]) -> Callable:
+        """returns a function calling every extractor on the groups"""
+        return lambda values: [func(values) for func in extractors]
+
+    def parse(self, string: str) -> Union[List[Any], None]:
+        """returns the rule values of string, or None if it does not match"""
+        match = self.regex.fullmatch(string)
+        return None if match is None else self.extract(match)
+
+
+class Walker:
+    """A command grammar matched by walking its rules over the scanned
+    tokens; the fallback for grammars Parser cannot compile.
+    """
+
+    def __init__(self, rules: List[Rule], scanner) -> None:
+        """walks rules over the tokens of scanner"""
+        self.rules = rules
+        self.scanner = scanner
+
+    def parse(self, string: str) -> Union[List[Any], None]:
+        """returns the rule values of string, or None if it does not match"""
+        tokens, remainder = self.scanner.scan(string)
+        if remainder:
+            return None
+        tokens = [token for token in tokens if token.type != "ignore"]
+        try:
+            return Rule.match_func_tokens(tokens, self.rules)
+        except Exception:
+            return None
+
+    def plan(self, values: List[Any]) -> None:
+        """walked grammars have no plans"""
+        return None
+
+
 class Cmdmaker:
     """cmdmaker class"""
 
-    def __init__(self, patterns):
+    def __init__(self, patterns, maxsize: int = 128):
         """initializer"""
         self.funcs: Dict[str, Callable] = {}
+        self.parsers: Dict[str, Union[Parser, Walker]] = {}
+        self.plans: OrderedDict = OrderedDict()
+        self.hints: OrderedDict = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
         self.on_match = {}
+        self.patterns = patterns
         self.scanner = build_scanner(patterns, self.on_match)
+        # one capturing group per pattern, tried in order like the scanner;
+        # letters maps the number of each group to the letter of its type
+        self.shapes = re.compile("|".join(f"({pattern})"
+                                          for pattern in patterns.values()))
+        self.letters = [""]
+        for i, (name, pattern) in enumerate(patterns.items()):
+            self.letters.append("" if name == "ignore" else chr(ord("a") + i))
+            self.letters.extend([""] * re.compile(pattern).groups)
 
     def scan_str(self, string):
         """scans string for tokens"""
@@ -235,21 +476,139 @@ class Cmdmaker:
             raise Exception(
                 f"Command not found: {cmd}, available commands are {', '.join(self.funcs.keys())}")
 
-        try:
-            func = self.funcs[cmd]
-            tokens = self.scan_str(string)
-            args = Rule.match_func_tokens(tokens, func.args)
-
-            func_args = func.function.__code__.co_varnames[:
-                                                           func.function.__code__.co_argcount]
-            if len(func_args) != len(args):
-                self.print_help(self.funcs[cmd], cmd)
-                return
-
-            return self.funcs[cmd].function(*args)
+        func = self.funcs[cmd]
+        args = self.parse(cmd, string)
+        if args is None:
+            self.print_help(func, cmd)
+            return
+        return func.function(*args)
+
+    def parse(self, cmd: str, string: str) -> Union[List[Any], None]:
+        """Returns the arguments of cmd parsed from string, or None if
+        string does not match the grammar of cmd.
+        Plans are compiled once per shape, the command and the types of
+        the tokens of the line. Computing the shape costs about as much
+        as the plan saves, so the shape last seen with the same word count
+        is tried first; the full grammar is the fallback.
+        """
+        hint = (cmd, len(string.split()))
+        key = self.hints.get(hint)
+        plan, match = self.match_plan(key, string)
+        if match is None:
+            key = self.hints[hint] = (cmd, self.shape(string))
+            self.hints.move_to_end(hint)
+            if len(self.hints) > self.maxsize:
+                self.hints.popitem(last=False)
+            plan, match = self.match_plan(key, string)
+        if match is not None:
+            self.hits += 1
+            return plan[1](match)
+
+        self.misses += 1
+        parser = self.parsers.get(cmd)
+        if parser is None:
+            parser = self.parsers[cmd] = self.compile(cmd)
+        args = parser.parse(string)
+        argcount = self.funcs[cmd].function.__code__.co_argcount
+        if args is None or len(args) != argcount:
+            return None
+
+        # a shape too large to unroll is remembered so it is not retried
+        if plan is None or plan[0] is not None:
+            self.plans[key] = parser.plan(args) or (None, None)
+            self.plans.move_to_end(key)
+            if len(self.plans) > self.maxsize:
+                self.plans.popitem(last=False)
+        return args
+
+    def match_plan(self, key, string: str):
+        """returns the plan cached for key, or None, and its match of
+        string, or None
+        """
+        plan = self.plans.get(key)
+        if plan is None:
+            return None, None
+        self.plans.move_to_end(key)
+        if plan[0] is None:
+            return plan, None
+        return plan, plan[0].fullmatch(string)
+
+    def shape(self, string: str) -> str:
+        """returns the types of the tokens of string, one letter each"""
+        letters = self.letters
+        return "".join(letters[match.lastindex]
+                       for match in self.shapes.finditer(string))
+
+    def cache_info(self) -> CacheInfo:
+        """returns the hits, misses and size of the parse plan cache"""
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self.plans))
+
+    def cache_clear(self) -> None:
+        """empties the parse plan cache and resets its statistics"""
+        self.plans.clear()
+        self.hints.clear()
+        self.hits = self.misses = 0
+
+    def usage(self, cmd: str) -> str:
+        """returns the arguments of cmd on one line"""
+        func = self.funcs[cmd]
+        return " ".join(f"<{arg}: {rule.rule_info()}>" for arg, rule in
+                        zip(func.function.__code__.co_varnames, func.args))
+
+    def prepare(self, number: int, line: str) -> Parsed:
+        """Parses line when it runs one of the commands of this maker.
+        cmd is None for other lines, args is None when parsing failed.
+        """
+        line = line.rstrip("\r\n")
+        cmd, _, string = line.strip().partition(" ")
+        if cmd not in self.funcs:
+            return Parsed(number, line, None, None)
+        return Parsed(number, line, cmd, self.parse(cmd, string))
+
+    def pipeline(self, lines, depth: int = 16, chunk: int = 64):
+        """Yields a Parsed for each of lines, in order. A worker thread
+        reads and parses up to depth chunks of lines ahead of the consumer.
+        """
+        queue = Queue(depth)
+        stopped = threading.Event()
+
+        def work():
+            """reads and parses lines until the end or a stop"""
+            parsed = []
+            try:
+                for number, line in enumerate(lines, 1):
+                    parsed.append(self.prepare(number, line))
+                    if len(parsed) == chunk:
+                        if stopped.is_set():
+                            return
+                        queue.put(parsed)
+                        parsed = []
+                queue.put(parsed)
+            except Exception as e:
+                queue.put(parsed)
+                queue.put(e)
+            queue.put(None)
 
-        except Exception as e:
-            self.print_help(self.funcs[cmd], cmd)
+        threading.Thread(target=work, daemon=True).start()
+        try:
+            while (item := queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield from item
+        finally:
+            stopped.set()
+            while not queue.empty():
+                queue.get_nowait()
+
+    def compile(self, cmd: str) -> Union[Parser, Walker]:
+        """Compiles the grammar of cmd; done once, on its first use.
+        Grammars that do not fit in one regex are walked instead.
+        """
+        try:
+            return Parser(self.funcs[cmd].args, self.patterns, self.on_match)
+        except (re.error, ValueError):
+            return Walker(self.funcs[cmd].args, self.scanner)
 
     def run_cmd(self, cmd_string: str):
         """runnef function after succesful parsing"""
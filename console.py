@@ -1,9 +1,15 @@
 #!/usr/bin/python3
 """ Console Module """
+import ast
 import cmd
+import json
 import sys
-from models.base_model import BaseModel
-from models.__init__ import storage
+import time
+from collections import Counter
+from models.base_model import BaseModel, RESERVED
+from models.aggregates import GROUPS
+from models import metrics
+from models import storage
 from models.user import User
 from models.place import Place
 from models.state import State
@@ -30,6 +36,22 @@ pat = {
 maker = Cmdmaker(pat)
 
 
+def error(message):
+    """Prints the error of a command and marks the command failed, so
+    that a batch is rolled back
+    """
+    HBNBCommand.failed = True
+    print(f"** {message} **")
+
+
+@metrics.collector
+def parse_cache():
+    """gauge of the share of command lines parsed from the plan cache"""
+    info = maker.cache_info()
+    lookups = info.hits + info.misses
+    return {"cache_hit_ratio.parse": info.hits / lookups} if lookups else {}
+
+
 @maker.match
 def integer(token):
     return int(token)
@@ -51,39 +73,135 @@ def create(class_name, args):
      eg  (hbnb) create Place id=1 name="Holberton")"""
     args = {arg: value for arg, _, value in args}
     if class_name not in classes:
-        print(f"** class {class_name} doesn't exist **")
-    else:
+        error(f"class {class_name} doesn't exist")
+        return
+    try:
         new_instance = classes[class_name](**args)
+    except ValueError as e:
+        error(f"{e}")
+    else:
         storage.new(new_instance)
         print(new_instance.id)
         storage.save()
 
 
+def parse_where(clause):
+    """Splits `<k>=<v> ... [set <k>=<v> ...]` into filters and values.
+    Without `set`, the first pair is the filter and the rest are values.
+    Raises:
+        ValueError: If the clause is not a list of pairs.
+    """
+    groups = [[]]
+    tokens = maker.scan_str(clause)
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok.type == "identifier" and tok.value == "set" and \
+                (i + 1 == len(tokens) or tokens[i + 1].type != "equal"):
+            groups.append([])
+            i += 1
+        elif (tok.type == "identifier" and i + 2 < len(tokens) and
+              tokens[i + 1].type == "equal" and
+              tokens[i + 2].type in ("integer", "float_p", "string")):
+            groups[-1].append((tok.value, tokens[i + 2].value))
+            i += 3
+        else:
+            raise ValueError(f"unexpected {tok.value!r} in where clause")
+
+    if len(groups) == 1:
+        groups = [groups[0][:1], groups[0][1:]]
+    if len(groups) != 2 or not groups[0] or not groups[1]:
+        raise ValueError("usage: where <k>=<v> ... set <k>=<v> ...")
+    return dict(groups[0]), dict(groups[1])
+
+
 @maker.infect
 class HBNBCommand(cmd.Cmd):
     """ Contains the functionality for the HBNB console"""
 
     # determines prompt for interactive/non-interactive modes
     prompt = '(hbnb) ' if sys.__stdin__.isatty() else ''
+    # echoes the prompt after each command when input is piped
+    echo_prompt = not sys.__stdin__.isatty()
 
     dot_cmds = ['all', 'count', 'show', 'destroy', 'update']
-    types = {
-        'number_rooms': int, 'number_bathrooms': int,
-        'max_guest': int, 'price_by_night': int,
-        'latitude': float, 'longitude': float
-    }
+    batch_start = None
+    batch_count = 0
+    # per command latency and storage activity, shared by all consoles
+    latency = {}
+    storage_use = {}
+    cmd_start = None
+    cmd_counters = None
+    # whether the last command printed an error
+    failed = False
 
     def preloop(self):
         """Prints if isatty is false"""
-        if not sys.__stdin__.isatty():
+        if self.echo_prompt:
             print('(hbnb)')
 
+    def precmd(self, line):
+        """Counts batch commands and starts timing the command"""
+        HBNBCommand.failed = False
+        if self.batch_start is not None:
+            self.batch_count += 1
+        self.cmd_counters = metrics.counters.copy()
+        self.cmd_start = time.perf_counter()
+        return line
+
     def postcmd(self, stop, line):
-        """Prints if isatty is false"""
-        if not sys.__stdin__.isatty():
+        """Records the command timing, prints if isatty is false"""
+        if self.cmd_start is not None:
+            self.record(line, time.perf_counter() - self.cmd_start)
+            self.cmd_start = None
+        if self.echo_prompt:
             print('(hbnb) ', end='')
         return stop
 
+    def record(self, line, elapsed):
+        """Adds a command run to the latency and storage statistics"""
+        name = self.parseline(line)[0]
+        if not name:
+            return
+        if name not in self.latency:
+            self.latency[name] = metrics.Histogram()
+            self.storage_use[name] = Counter()
+        self.latency[name].observe(elapsed)
+        self.storage_use[name].update(metrics.counters - self.cmd_counters)
+
+    def run_line(self, line):
+        """Runs one command line through the same hooks as cmdloop.
+        Returns:
+            True if the command asked the console to stop.
+        """
+        try:
+            stop = self.onecmd(self.precmd(line))
+        except SystemExit:
+            stop = True
+        return self.postcmd(stop, line)
+
+    def run_parsed(self, number, line, name, args):
+        """Runs a line read ahead by maker.pipeline.
+        Cmdmaker commands run with the arguments already parsed, other
+        lines go through run_line.
+        Returns:
+            True if the command asked the console to stop.
+        """
+        if name is None:
+            return self.run_line(line)
+        self.precmd(line)
+        if args is None:
+            HBNBCommand.failed = True
+            print(f"** line {number}: invalid arguments for {name}, "
+                  f"expected {maker.usage(name)} **", file=sys.stderr)
+        else:
+            try:
+                maker.funcs[name].function(*args)
+            except Exception as e:
+                HBNBCommand.failed = True
+                print(e)
+        return self.postcmd(False, line)
+
     def do_quit(self, command):
         """ Method to exit the HBNB console"""
         exit()
@@ -105,6 +223,153 @@ class HBNBCommand(cmd.Cmd):
         """ Overrides the emptyline method of CMD """
         pass
 
+    def default(self, line):
+        """ Reports lines that are not commands as failed """
+        error(f"unknown syntax: {line}")
+
+    def do_begin(self, args):
+        """ Starts a batch: saves are deferred until commit """
+        storage.begin()
+        self.batch_start = time.perf_counter()
+        self.batch_count = 0
+
+    def help_begin(self):
+        """ Help information for the begin command """
+        print("Starts a batch, storage is only written on commit")
+        print("[Usage]: begin\n")
+
+    def do_commit(self, args):
+        """ Persists every change made since begin at once """
+        storage.commit()
+        self.batch_summary()
+
+    def help_commit(self):
+        """ Help information for the commit command """
+        print("Ends a batch and writes its changes to storage")
+        print("[Usage]: commit\n")
+
+    def do_rollback(self, args):
+        """ Discards every change made since begin """
+        storage.rollback()
+        self.batch_summary()
+
+    def help_rollback(self):
+        """ Help information for the rollback command """
+        print("Ends a batch and discards its changes")
+        print("[Usage]: rollback\n")
+
+    def batch_summary(self):
+        """Prints the command rate of the batch that just ended"""
+        if self.batch_start is None:
+            return
+        elapsed = time.perf_counter() - self.batch_start
+        rate = self.batch_count / elapsed if elapsed else 0
+        print(f"** {self.batch_count} commands in {elapsed:.3f}s "
+              f"({rate:.0f} commands/sec) **", file=sys.stderr)
+        self.batch_start = None
+
+    def run_batch(self, lines):
+        """Runs lines as commands in one batch committed at the end, or
+        rolled back at the first command that fails.
+        Returns:
+            True if the batch was committed, False if it was rolled back.
+        """
+        self.echo_prompt = False
+        self.do_begin('')
+        number = 0
+        try:
+            for number, line, name, args in maker.pipeline(lines):
+                stop = self.run_parsed(number, line, name, args)
+                if HBNBCommand.failed:
+                    print(f"** line {number}: {line.strip()!r} failed, "
+                          "rolling back **", file=sys.stderr)
+                    self.do_rollback('')
+                    return False
+                if stop:
+                    break
+        except Exception as e:
+            print(f"** line {number}: {e!r}, rolling back **",
+                  file=sys.stderr)
+            self.do_rollback('')
+            return False
+        self.do_commit('')
+        return True
+
+    def do_stats(self, args):
+        """ Prints the timings of every command run so far """
+        if args.strip() == "reset":
+            self.latency.clear()
+            self.storage_use.clear()
+            maker.cache_clear()
+            return
+        print(f"{'command':<12}{'count':>8}{'mean ms':>10}{'p50 ms':>10}"
+              f"{'p95 ms':>10}{'max ms':>10}{'storage':>9}{'bytes':>12}")
+        for name, hist in sorted(self.latency.items()):
+            use = self.storage_use[name]
+            calls = sum(n for key, n in use.items()
+                        if key.startswith("calls."))
+            print(f"{name:<12}{hist.count:>8}{hist.mean * 1e3:>10.3f}"
+                  f"{hist.quantile(0.5) * 1e3:>10.3f}"
+                  f"{hist.quantile(0.95) * 1e3:>10.3f}"
+                  f"{hist.max * 1e3:>10.3f}{calls:>9}"
+                  f"{use['bytes_written']:>12}")
+        info = maker.cache_info()
+        print(f"parse cache: {info.hits} hits, {info.misses} misses, "
+              f"{info.currsize}/{info.maxsize} plans")
+
+    def help_stats(self):
+        """ Help information for the stats command """
+        print("Shows count, latency, storage calls and bytes written "
+              "per command, and the parse cache hits")
+        print("[Usage]: stats [reset]\n")
+
+    def do_metrics(self, args):
+        """ Prints the storage metrics, or resets them """
+        args = args.strip()
+        if args == "reset":
+            metrics.reset()
+            return
+        if args == "prometheus":
+            print(metrics.prometheus(), end="")
+            return
+        if args == "json":
+            print(json.dumps(metrics.snapshot(), indent=2))
+            return
+        if args:
+            error("unknown format")
+            return
+        snap = metrics.snapshot()
+        for key, value in sorted(snap["counters"].items()):
+            print(f"{key:<36}{value:>14}")
+        for key, value in sorted(snap["gauges"].items()):
+            print(f"{key:<36}{value:>14.6g}")
+        for key, hist in sorted(metrics.histograms.items()):
+            print(f"{key:<36}{hist.count:>14} mean {hist.mean:.6g} "
+                  f"p50 {hist.quantile(0.5):.6g} "
+                  f"p95 {hist.quantile(0.95):.6g} max {hist.max:.6g}")
+
+    def help_metrics(self):
+        """ Help information for the metrics command """
+        print("Shows storage calls, bytes written, relationship reads, "
+              "cache hit ratios, objects per class and save/reload "
+              "durations, in the Prometheus text format or as json")
+        print("[Usage]: metrics [prometheus|json|reset]\n")
+
+    def do_profile(self, args):
+        """ Runs one command under cProfile and prints the top frames """
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.runcall(self.onecmd, args)
+        stats = pstats.Stats(profiler, stream=sys.stdout)
+        stats.sort_stats("cumulative").print_stats(15)
+
+    def help_profile(self):
+        """ Help information for the profile command """
+        print("Runs a command under cProfile and prints the top frames")
+        print("[Usage]: profile <command line>\n")
+
     # def help_create(self):
     #     """ Help information for the create method """
     #     print("Creates a class of any type")
@@ -121,22 +386,22 @@ class HBNBCommand(cmd.Cmd):
             c_id = c_id.partition(' ')[0]
 
         if not c_name:
-            print("** class name missing **")
+            error("class name missing")
             return
 
-        if c_name not in HBNBCommand.classes:
-            print("** class doesn't exist **")
+        if c_name not in classes:
+            error("class doesn't exist")
             return
 
         if not c_id:
-            print("** instance id missing **")
+            error("instance id missing")
             return
 
-        key = c_name + "." + c_id
-        try:
-            print(storage._FileStorage__objects[key])
-        except KeyError:
-            print("** no instance found **")
+        obj = storage.get(classes[c_name], c_id)
+        if obj is None:
+            error("no instance found")
+        else:
+            print(obj)
 
     def help_show(self):
         """ Help information for the show command """
@@ -152,24 +417,23 @@ class HBNBCommand(cmd.Cmd):
             c_id = c_id.partition(' ')[0]
 
         if not c_name:
-            print("** class name missing **")
+            error("class name missing")
             return
 
-        if c_name not in HBNBCommand.classes:
-            print("** class doesn't exist **")
+        if c_name not in classes:
+            error("class doesn't exist")
             return
 
         if not c_id:
-            print("** instance id missing **")
+            error("instance id missing")
             return
 
-        key = c_name + "." + c_id
-
-        try:
-            del(storage.all()[key])
-            storage.save()
-        except KeyError:
-            print("** no instance found **")
+        obj = storage.get(classes[c_name], c_id)
+        if obj is None:
+            error("no instance found")
+            return
+        storage.delete(obj)
+        storage.save()
 
     def help_destroy(self):
         """ Help information for the destroy command """
@@ -182,15 +446,14 @@ class HBNBCommand(cmd.Cmd):
 
         if args:
             args = args.split(' ')[0]  # remove possible trailing args
-            if args not in HBNBCommand.classes:
-                print("** class doesn't exist **")
+            if args not in classes:
+                error("class doesn't exist")
                 return
-            for k, v in storage._FileStorage__objects.items():
-                if k.split('.')[0] == args:
-                    print_list.append(str(v))
+            objs = storage.all(classes[args])
         else:
-            for k, v in storage._FileStorage__objects.items():
-                print_list.append(str(v))
+            objs = storage.all()
+        for v in objs.values():
+            print_list.append(str(v))
 
         print(print_list)
 
@@ -201,15 +464,65 @@ class HBNBCommand(cmd.Cmd):
 
     def do_count(self, args):
         """Count current number of class instances"""
-        count = 0
-        for k, v in storage._FileStorage__objects.items():
-            if args == k.split('.')[0]:
-                count += 1
-        print(count)
+        args = args.split(' ')[0]  # remove possible trailing args
+        if not args:
+            print(storage.count())
+        elif args not in classes:
+            error("class doesn't exist")
+        else:
+            print(storage.count(classes[args]))
 
     def help_count(self):
-        """ """
-        print("Usage: count <class_name>")
+        """ Help information for the count command """
+        print("Counts all objects, or all objects of a class")
+        print("[Usage]: count <className>\n")
+
+    def do_search(self, args):
+        """ Ranks the places and reviews matching some words """
+        words = args.split()
+        cls = None
+        if words and words[0] in classes:
+            cls = classes[words.pop(0)]
+        if not words:
+            error("search words missing")
+            return
+        for obj, score in storage.search(" ".join(words), cls):
+            text = obj.name if isinstance(obj, Place) else obj.text
+            print(f"{score:.3f} [{type(obj).__name__}] ({obj.id}) "
+                  f"{text[:60]}")
+
+    def help_search(self):
+        """ Help information for the search command """
+        print("Ranks the places and reviews whose text matches the words")
+        print("[Usage]: search [<className>] <words>\n")
+
+    def do_aggregate(self, args):
+        """ Prints the counts and numbers of places or reviews by group """
+        words = args.split()
+        if not words:
+            error("grouping missing")
+            return
+        rebuild = words[0] == "rebuild"
+        if rebuild:
+            words.pop(0)
+            if not words:
+                storage.aggregate("city", rebuild=True)
+                return
+        if words[0] not in GROUPS:
+            error("grouping doesn't exist")
+            return
+        if len(words) > 1:
+            print(storage.aggregate(words[0], words[1], rebuild))
+            return
+        groups = storage.aggregate(words[0], rebuild=rebuild)
+        for group_id, summary in sorted(groups.items()):
+            print(f"{group_id}: {summary}")
+
+    def help_aggregate(self):
+        """ Help information for the aggregate command """
+        print("Shows the number of places of a city or state, or of reviews "
+              "of a place, with the sum, min, max and mean of their numbers")
+        print("[Usage]: aggregate [rebuild] [city|state|place [<id>]]\n")
 
     def do_update(self, args):
         """ Updates a certain object with new info """
@@ -220,10 +533,15 @@ class HBNBCommand(cmd.Cmd):
         if args[0]:
             c_name = args[0]
         else:  # class name not present
-            print("** class name missing **")
+            error("class name missing")
             return
-        if c_name not in HBNBCommand.classes:  # class name invalid
-            print("** class doesn't exist **")
+        if c_name not in classes:  # class name invalid
+            error("class doesn't exist")
+            return
+
+        # set-based form, ex: update <cls> where <k>=<v> [set <k>=<v> ...]
+        if args[2].startswith("where "):
+            self.update_where(c_name, args[2][len("where "):])
             return
 
         # isolate id from args
@@ -231,27 +549,29 @@ class HBNBCommand(cmd.Cmd):
         if args[0]:
             c_id = args[0]
         else:  # id not present
-            print("** instance id missing **")
+            error("instance id missing")
             return
 
-        # generate key from class and id
-        key = c_name + "." + c_id
-
-        # determine if key is present
-        if key not in storage.all():
-            print("** no instance found **")
+        # determine if the instance is present
+        new_dict = storage.get(classes[c_name], c_id)
+        if new_dict is None:
+            error("no instance found")
             return
 
         # first determine if kwargs or args
-        if '{' in args[2] and '}' in args[2] and type(eval(args[2])) is dict:
-            kwargs = eval(args[2])
+        if '{' in args[2] and '}' in args[2]:
+            try:
+                kwargs = ast.literal_eval(args[2])
+            except (ValueError, SyntaxError):
+                kwargs = None
+        if type(kwargs) is dict:
             args = []  # reformat kwargs into list, ex: [<name>, <value>, ...]
             for k, v in kwargs.items():
                 args.append(k)
                 args.append(v)
         else:  # isolate args
             args = args[2]
-            if args and args[0] is '\"':  # check for quoted arg
+            if args and args[0] == '\"':  # check for quoted arg
                 second_quote = args.find('\"', 1)
                 att_name = args[1:second_quote]
                 args = args[second_quote + 1:]
@@ -259,10 +579,10 @@ class HBNBCommand(cmd.Cmd):
             args = args.partition(' ')
 
             # if att_name was not quoted arg
-            if not att_name and args[0] is not ' ':
+            if not att_name and args[0] != ' ':
                 att_name = args[0]
             # check for quoted val arg
-            if args[2] and args[2][0] is '\"':
+            if args[2] and args[2][0] == '\"':
                 att_val = args[2][1:args[2].find('\"', 1)]
 
             # if att_val was not quoted arg
@@ -271,34 +591,71 @@ class HBNBCommand(cmd.Cmd):
 
             args = [att_name, att_val]
 
-        # retrieve dictionary of current objects
-        new_dict = storage.all()[key]
+        from models.schema import get_schema
+        schema = get_schema(classes[c_name])
 
-        # iterate through attr names and values
+        # check and cast every pair before changing the object
+        updates = {}
         for i, att_name in enumerate(args):
             # block only runs on even iterations
             if (i % 2 == 0):
                 att_val = args[i + 1]  # following item is value
                 if not att_name:  # check for att_name
-                    print("** attribute name missing **")
+                    error("attribute name missing")
                     return
                 if not att_val:  # check for att_value
-                    print("** value missing **")
+                    error("value missing")
+                    return
+                if att_name in RESERVED:  # kept by the model
+                    error(f"can't update {c_name}.{att_name}")
+                    return
+                # type cast as declared by the model
+                try:
+                    updates[att_name] = schema.coerce(att_name, att_val)
+                except ValueError as e:
+                    error(f"{e}")
                     return
-                # type cast as necessary
-                if att_name in HBNBCommand.types:
-                    att_val = HBNBCommand.types[att_name](att_val)
 
-                # update dictionary with name, value pair
-                new_dict.__dict__.update({att_name: att_val})
+        for att_name, att_val in updates.items():
+            # set through the mapping, so db storage sees the change
+            setattr(new_dict, att_name, att_val)
 
         new_dict.save()  # save updates to file
 
+    def update_where(self, c_name, clause):
+        """ Updates every object of a class matching a where clause """
+        try:
+            filters, values = parse_where(clause)
+            for attr in values:
+                if attr in RESERVED:  # kept by the model
+                    raise ValueError(f"can't update {c_name}.{attr}")
+            from models.schema import get_schema
+            schema = get_schema(classes[c_name])
+            filters = schema.coerce_dict(filters)
+            values = schema.coerce_dict(values)
+            print(storage.update_where(classes[c_name], filters, values))
+        except ValueError as e:
+            error(f"{e}")
+
     def help_update(self):
         """ Help information for the update class """
         print("Updates an object with new information")
-        print("Usage: update <className> <id> <attName> <attVal>\n")
+        print("Usage: update <className> <id> <attName> <attVal>")
+        print("Updates every matching object and prints how many")
+        print("Usage: update <className> where <attName>=<attVal> ... "
+              "set <attName>=<attVal> ...\n")
 
 
 if __name__ == "__main__":
+    metrics.export_from_env()
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "--serve":
+        from console_server import serve
+        sys.exit(serve(*sys.argv[2:]))
+    if len(sys.argv) == 3 and sys.argv[1] == "--batch":
+        if sys.argv[2] == "-":
+            committed = HBNBCommand().run_batch(sys.stdin)
+        else:
+            with open(sys.argv[2]) as script:
+                committed = HBNBCommand().run_batch(script)
+        sys.exit(0 if committed else 1)
     HBNBCommand().cmdloop()
@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+"""Serves HBNBCommand over a Unix socket with a warm, resident storage
+
+Protocol: the client sends one command per line. The server answers each
+line with the command output followed by a NUL byte, then waits for the
+next line. Commands from all clients run one at a time, and a client that
+opens a batch with `begin` keeps exclusive access until it commits, rolls
+back or disconnects (which rolls back).
+"""
+import io
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from contextlib import redirect_stdout
+
+from console import HBNBCommand
+from models import storage
+
+DEFAULT_SOCKET = os.getenv("HBNB_SOCKET", "/tmp/hbnb_console.sock")
+END = b"\0"
+
+
+class ConsoleHandler(socketserver.StreamRequestHandler):
+    """Runs the command lines of one client connection"""
+
+    def handle(self):
+        """reads lines until the client disconnects or quits"""
+        out = io.TextIOWrapper(self.wfile, encoding="utf-8",
+                               line_buffering=True)
+        console = HBNBCommand(stdout=out)
+        console.echo_prompt = False
+        lock = self.server.lock
+        held = False
+
+        try:
+            for raw in self.rfile:
+                line = raw.decode("utf-8").rstrip("\r\n")
+                if not held:
+                    lock.acquire()
+                    held = True
+                    # picks up the writes of other processes; a batch
+                    # works on what it read when it began
+                    storage.refresh()
+                try:
+                    with redirect_stdout(out):
+                        stop = console.run_line(line)
+                    out.flush()
+                finally:
+                    # a client inside a batch keeps the lock until it ends
+                    if console.batch_start is None:
+                        lock.release()
+                        held = False
+                self.wfile.write(END)
+                if stop:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            if held:
+                storage.rollback()
+                console.batch_start = None
+                lock.release()
+            out.detach()
+
+
+class ConsoleServer(socketserver.ThreadingMixIn,
+                    socketserver.UnixStreamServer):
+    """Threaded Unix socket server sharing one storage between clients"""
+    daemon_threads = True
+
+    def __init__(self, path):
+        """Binds path, replacing the socket file of a server that is gone.
+        Raises:
+            OSError: If a server answers on path, or path is not a socket.
+        """
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise OSError(f"{path} exists and is not a socket")
+            if self.answers(path):
+                raise OSError(f"a server is already listening on {path}")
+            os.unlink(path)
+        self.lock = threading.Lock()
+        super().__init__(path, ConsoleHandler)
+
+    @staticmethod
+    def answers(path):
+        """returns whether a server accepts connections on path"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                return False
+        return True
+
+    def server_bind(self):
+        """binds the socket file readable and writable by its owner only,
+        from the moment it is created
+        """
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        """closes the socket and removes its file"""
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def serve(path=DEFAULT_SOCKET):
+    """Serves the console on path until interrupted.
+    Returns:
+        0 once stopped, 1 if path could not be bound.
+    """
+    try:
+        server = ConsoleServer(path)
+    except OSError as e:
+        print(f"** {e} **", file=sys.stderr)
+        return 1
+    storage.all()  # warms storage before the first client connects
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with server:
+        print(f"hbnb console listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
@@ -0,0 +1,2 @@
+#!/usr/bin/python3
+"""Packaging and deployment of web_static, used by the fabfiles"""
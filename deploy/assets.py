@@ -0,0 +1,264 @@
+#!/usr/bin/python3
+"""Build stage for web_static run before packing
+
+Images are optimized first (see deploy.images). Every page's stylesheets
+are then bundled in link order, minified, with small images inlined as
+data URIs, and written under a content-hashed name the page then links
+to. Text assets also get precompressed .gz (and .br when brotli is
+installed) siblings for nginx gzip_static/brotli_static.
+"""
+import gzip
+import hashlib
+import os
+import re
+from typing import Dict, List
+
+from deploy.images import data_uri, format_images, optimize_file
+from deploy.pack import walk, write_changed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STYLESHEET = re.compile(
+    r'[ \t]*<link\s+rel="stylesheet"\s+href="([^"]+\.css)"\s*/?>[ \t]*\n?')
+COMPRESSIBLE = (".css", ".html", ".js", ".svg", ".json", ".txt", ".ico")
+MIN_COMPRESS = 256
+# images up to this many bytes are inlined into bundles as data URIs
+INLINE_MAX = 1024
+CSS_URL = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""")
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')'
+                         r'|/\*.*?\*/', re.S)
+_CSS_SPACES = re.compile(r"\s*([{};,>])\s*")
+
+
+def _minify_code(code: str) -> str:
+    """minifies CSS code that holds no strings or comments"""
+    code = _CSS_SPACES.sub(r"\1", re.sub(r"\s+", " ", code))
+    return re.sub(r":\s+", ":", code).replace(";}", "}")
+
+
+def minify_css(css: str) -> str:
+    """Returns css without comments and needless whitespace.
+    Strings are kept as they are.
+    """
+    out = []
+    code = []
+    pos = 0
+    for match in _CSS_TOKENS.finditer(css):
+        code.append(css[pos:match.start()])
+        pos = match.end()
+        if match.group(1):
+            out.append(_minify_code("".join(code)))
+            out.append(match.group(1))
+            code = []
+        else:
+            code.append(" ")
+    code.append(css[pos:])
+    out.append(_minify_code("".join(code)))
+    return "".join(out).strip()
+
+
+def fingerprint(data: bytes) -> str:
+    """returns the short content hash used in asset names"""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def inline_images(css: str, base: str) -> str:
+    """Replaces the urls in css of images of at most INLINE_MAX bytes,
+    relative to the directory base, with data URIs.
+    """
+    def inline(match):
+        """returns the data URI of a small local image"""
+        url = match.group(2)
+        if ":" in url or url.startswith("/"):
+            return match.group(0)
+        path = os.path.normpath(os.path.join(base, url))
+        if os.path.isfile(path) and os.path.getsize(path) <= INLINE_MAX:
+            return f'url("{data_uri(path)}")'
+        return match.group(0)
+    return CSS_URL.sub(inline, css)
+
+
+def bundle(src: str, hrefs: List[str], page: str, out: str) -> bytes:
+    """Returns the minified concatenation of the stylesheets of a page.
+    Images they use are inlined from out, where they were optimized.
+    """
+    base = os.path.dirname(page)
+    parts = []
+    for href in hrefs:
+        with open(os.path.join(src, base, href), encoding="utf-8") as f:
+            css = minify_css(f.read())
+        parts.append(inline_images(
+            css, os.path.join(out, base, os.path.dirname(href))))
+    return "\n".join(parts).encode("utf-8")
+
+
+def precompress(path: str, report: Dict = None) -> List[str]:
+    """Writes path.gz (and path.br) when that saves bytes.
+    Returns:
+        The extensions of the compressed siblings of path.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS:
+        return []
+    encoders = [(".gz", lambda d: gzip.compress(d, 9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda d: brotli.compress(d, quality=11)))
+    siblings = []
+    for ext, encode in encoders:
+        packed = encode(data)
+        if len(packed) < len(data):
+            write_changed(path + ext, packed)
+            siblings.append(ext)
+            if report is not None:
+                report[ext] = report.get(ext, 0) + len(packed)
+    return siblings
+
+
+def build(src: str = "web_static", out: str = "build/web_static",
+          cache: str = None) -> Dict:
+    """Builds src into out. Files are only written when their content
+    changed, so pack does not hash them again, and files no longer built
+    are removed. Optimized images are cached in cache, by default .cache
+    next to out.
+    Returns:
+        A report of the bytes in src, in out without the precompressed
+        files, of the precompressed files per extension, of the
+        stylesheet requests before and after, per page of the HTML, CSS
+        and CSS image bytes loaded before, after, and after with gzip,
+        and per image of the bytes before, after and as WebP.
+    """
+    if not os.path.isdir(src):
+        raise FileNotFoundError(f"no directory {src}")
+
+    if cache is None:
+        cache = os.path.join(os.path.dirname(out) or ".", ".cache")
+
+    report = {"before": 0, "after": 0, "requests_before": 0,
+              "requests_after": 0, "bundles": [], "pages": {}, "images": {}}
+    files = list(walk(src))
+    # files of out written by this build
+    built = []
+    for rel in files:
+        if rel.lower().endswith(".png"):
+            report["images"][rel] = optimize_file(
+                os.path.join(src, rel), os.path.join(out, rel), cache)
+            built.append(rel)
+            if report["images"][rel][2]:
+                built.append(rel + ".webp")
+
+    pages = [rel for rel in files if rel.endswith(".html")]
+    bundled = set()
+    bundles = {}
+    html = {}
+    # files loaded by each page, before and after the build
+    loads = {}
+
+    for page in pages:
+        with open(os.path.join(src, page), encoding="utf-8") as f:
+            text = f.read()
+        hrefs = STYLESHEET.findall(text)
+        report["requests_before"] += len(hrefs)
+        key = tuple(os.path.normpath(os.path.join(os.path.dirname(page), h))
+                    for h in hrefs)
+        loads[page] = ([page, *key, *_images(src, key)], [page])
+        if not hrefs:
+            html[page] = text
+            continue
+        if key not in bundles:
+            data = bundle(src, hrefs, page, out)
+            name = f"styles/bundle.{fingerprint(data)}.css"
+            bundles[key] = name
+            write_changed(os.path.join(out, name), data)
+            built.append(name)
+            report["bundles"].append(name)
+        bundled.update(key)
+        href = os.path.relpath(bundles[key], os.path.dirname(page) or ".")
+        first = [True]
+
+        def link(match, indent=re.compile(r"^[ \t]*")):
+            """replaces the first stylesheet link, drops the others"""
+            if first[0]:
+                first[0] = False
+                lead = indent.match(match.group(0)).group(0)
+                return f'{lead}<link rel="stylesheet" href="{href}"/>\n'
+            return ""
+        html[page] = STYLESHEET.sub(link, text)
+        report["requests_after"] += 1
+        loads[page][1].extend([bundles[key], *_images(out, [bundles[key]])])
+
+    for rel in files:
+        report["before"] += os.path.getsize(os.path.join(src, rel))
+        if rel in html:
+            write_changed(os.path.join(out, rel), html[rel].encode("utf-8"))
+        elif rel not in bundled and rel not in report["images"]:
+            with open(os.path.join(src, rel), "rb") as f:
+                write_changed(os.path.join(out, rel), f.read())
+        else:
+            continue
+        built.append(rel)
+
+    keep = set(built)
+    for rel in built:
+        path = os.path.join(out, rel)
+        report["after"] += os.path.getsize(path)
+        if rel.endswith(COMPRESSIBLE):
+            keep.update(rel + ext for ext in precompress(path, report))
+    _prune(out, keep)
+
+    for page, (before, after) in loads.items():
+        report["pages"][page] = [
+            sum(os.path.getsize(os.path.join(src, rel)) for rel in before),
+            sum(os.path.getsize(os.path.join(out, rel)) for rel in after),
+            sum(_served(os.path.join(out, rel)) for rel in after)]
+    return report
+
+
+def _images(root: str, stylesheets: List[str]) -> List[str]:
+    """returns the files under root loaded by the urls of stylesheets"""
+    found = []
+    for rel in stylesheets:
+        with open(os.path.join(root, rel), encoding="utf-8") as f:
+            urls = [m.group(2) for m in CSS_URL.finditer(f.read())]
+        for url in urls:
+            image = os.path.normpath(os.path.join(os.path.dirname(rel), url))
+            if ":" not in url and image not in found and \
+                    os.path.isfile(os.path.join(root, image)):
+                found.append(image)
+    return found
+
+
+def _served(path: str) -> int:
+    """returns the bytes served for path to a client accepting gzip"""
+    return os.path.getsize(path + ".gz" if os.path.isfile(path + ".gz")
+                           else path)
+
+
+def _prune(root: str, keep: set) -> None:
+    """removes the files under root not in keep, then empty directories"""
+    for rel in list(walk(root)):
+        if rel not in keep:
+            os.remove(os.path.join(root, rel))
+    for dirpath, _, _ in os.walk(root, topdown=False):
+        if dirpath != root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def format_report(report: Dict) -> str:
+    """returns the build report as text"""
+    lines = [f"{len(report['bundles'])} bundles, stylesheet requests "
+             f"{report['requests_before']} -> {report['requests_after']}",
+             f"bytes {report['before']} -> {report['after']}"]
+    for ext in (".gz", ".br"):
+        if ext in report:
+            lines.append(f"precompressed {ext}: {report[ext]} bytes")
+    lines.append(f"{'page':<18}{'before':>9}{'after':>9}{'gzip':>9}")
+    for page, (before, after, served) in sorted(report["pages"].items()):
+        lines.append(f"{page:<18}{before:>9}{after:>9}{served:>9}")
+    if report["images"]:
+        lines.append(format_images(report["images"]))
+    return "\n".join(lines)
@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+"""Image stage of the web_static build
+
+PNGs are recompressed losslessly: rows are refiltered, the image data
+deflated again at the highest level and text/time chunks dropped. WebP
+siblings are written when Pillow is installed. Results are cached by the
+content hash of the source image, so unchanged images cost nothing.
+"""
+import base64
+import hashlib
+import os
+import struct
+import zlib
+from typing import Dict, List, Union
+
+from deploy.pack import write_changed
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# chunks kept besides IHDR, IDAT and IEND; they change how pixels render
+KEEP = {b"PLTE", b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT",
+        b"pHYs"}
+CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# bump when the output of optimize_png changes, to invalidate caches
+VERSION = "1"
+
+
+def chunks(data: bytes) -> List:
+    """Returns the (type, body) chunks of a PNG.
+    Raises:
+        ValueError: If data is not a well formed PNG.
+    """
+    if not data.startswith(SIGNATURE):
+        raise ValueError("not a PNG")
+    found = []
+    pos = len(SIGNATURE)
+    while pos + 12 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if len(body) != length:
+            raise ValueError("truncated chunk")
+        found.append((kind, body))
+        pos += 12 + length
+        if kind == b"IEND":
+            return found
+    raise ValueError("no IEND chunk")
+
+
+def _chunk(kind: bytes, body: bytes) -> bytes:
+    """returns a chunk with its length and crc"""
+    return (struct.pack(">I", len(body)) + kind + body +
+            struct.pack(">I", zlib.crc32(kind + body)))
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    """returns the Paeth predictor of left a, up b and upper left c"""
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def unfilter(raw: bytes, height: int, stride: int, bpp: int) -> List:
+    """returns the unfiltered scanlines of decompressed image data"""
+    rows = []
+    prev = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1:start + 1 + stride])
+        if kind == 1:
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xff
+        elif kind == 2:
+            for i in range(stride):
+                row[i] = (row[i] + prev[i]) & 0xff
+        elif kind == 3:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xff
+        elif kind == 4:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                upleft = prev[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(left, prev[i], upleft)) & 0xff
+        elif kind != 0:
+            raise ValueError(f"unknown filter {kind}")
+        rows.append(row)
+        prev = row
+    return rows
+
+
+def _filtered(kind: int, row: bytearray, prev: bytearray, bpp: int):
+    """returns row filtered with filter kind"""
+    if kind == 0:
+        return bytes(row)
+    out = bytearray(len(row))
+    for i in range(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        if kind == 1:
+            pred = left
+        elif kind == 2:
+            pred = prev[i]
+        elif kind == 3:
+            pred = (left + prev[i]) >> 1
+        else:
+            pred = _paeth(left, prev[i], prev[i - bpp] if i >= bpp else 0)
+        out[i] = (row[i] - pred) & 0xff
+    return bytes(out)
+
+
+def refilter(rows: List, bpp: int, adaptive: bool) -> bytes:
+    """Returns the rows filtered for compression: with no filter, or with
+    the filter minimizing the sum of absolute values of each row.
+    """
+    out = []
+    prev = bytearray(len(rows[0]) if rows else 0)
+    for row in rows:
+        if not adaptive:
+            out.append(b"\0" + bytes(row))
+        else:
+            kinds = [_filtered(kind, row, prev, bpp) for kind in range(5)]
+            best = min(range(5), key=lambda kind: sum(
+                b if b < 128 else 256 - b for b in kinds[kind]))
+            out.append(bytes([best]) + kinds[best])
+        prev = row
+    return b"".join(out)
+
+
+def optimize_png(data: bytes) -> bytes:
+    """Returns the smallest lossless encoding found for a PNG, or data
+    itself when nothing smaller was found.
+    Raises:
+        ValueError: If data is not a well formed PNG.
+    """
+    found = chunks(data)
+    header = found[0][1]
+    width, height, depth, color, _, _, interlace = struct.unpack(
+        ">IIBBBBB", header)
+    raw = zlib.decompress(b"".join(body for kind, body in found
+                                   if kind == b"IDAT"))
+
+    candidates = [raw]
+    if interlace == 0 and color in CHANNELS:
+        bits = CHANNELS[color] * depth
+        stride = (width * bits + 7) // 8
+        rows = unfilter(raw, height, stride, max(1, bits // 8))
+        candidates = [refilter(rows, max(1, bits // 8), adaptive)
+                      for adaptive in (False, True)]
+
+    best = None
+    for candidate in candidates:
+        for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+            encoder = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+            packed = encoder.compress(candidate) + encoder.flush()
+            if best is None or len(packed) < len(best):
+                best = packed
+
+    out = [SIGNATURE, _chunk(b"IHDR", header)]
+    out += [_chunk(kind, body) for kind, body in found if kind in KEEP]
+    out += [_chunk(b"IDAT", best), _chunk(b"IEND", b"")]
+    out = b"".join(out)
+    return out if len(out) < len(data) else data
+
+
+def to_webp(data: bytes) -> Union[bytes, None]:
+    """returns a lossless WebP of an image, or None without Pillow"""
+    if Image is None:
+        return None
+    import io
+
+    with Image.open(io.BytesIO(data)) as image:
+        out = io.BytesIO()
+        image.save(out, "WEBP", lossless=True, method=6)
+    return out.getvalue()
+
+
+def _cached(cache: str, key: str, ext: str, make) -> Union[bytes, None]:
+    """returns the cached result of make for key, computing it once"""
+    path = os.path.join(cache, f"{key}{ext}")
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    data = make()
+    if data is not None:
+        os.makedirs(cache, exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+    return data
+
+
+def optimize_file(src: str, out: str, cache: str) -> List[int]:
+    """Writes the optimized PNG at src to out, and its WebP to out.webp
+    when that is smaller.
+    Returns:
+        The bytes of src, of out and of the WebP (0 when none).
+    """
+    with open(src, "rb") as f:
+        data = f.read()
+    key = hashlib.sha256(VERSION.encode() + data).hexdigest()
+    try:
+        png = _cached(cache, key, ".png", lambda: optimize_png(data))
+    except (ValueError, zlib.error):
+        png = data
+    webp = _cached(cache, key, ".webp", lambda: to_webp(data))
+
+    write_changed(out, png)
+    if webp is not None and len(webp) < len(png):
+        write_changed(f"{out}.webp", webp)
+        return [len(data), len(png), len(webp)]
+    return [len(data), len(png), 0]
+
+
+MIME = {".png": "image/png", ".gif": "image/gif", ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg", ".svg": "image/svg+xml",
+        ".webp": "image/webp", ".ico": "image/x-icon"}
+
+
+def data_uri(path: str) -> str:
+    """returns the contents of an image file as a data URI"""
+    with open(path, "rb") as f:
+        data = base64.b64encode(f.read()).decode("ascii")
+    mime = MIME.get(os.path.splitext(path)[1].lower(),
+                    "application/octet-stream")
+    return f"data:{mime};base64,{data}"
+
+
+def format_images(images: Dict) -> str:
+    """returns the bytes saved per image as text"""
+    lines = [f"{'image':<24}{'before':>8}{'after':>8}{'webp':>8}{'saved':>8}"]
+    for rel, (before, after, webp) in sorted(images.items()):
+        lines.append(f"{rel:<24}{before:>8}{after:>8}{webp:>8}"
+                     f"{before - after:>8}")
+    return "\n".join(lines)
@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+"""Generates the nginx server block serving web_static at /hbnb_static
+
+Usage: python3 -m deploy.nginx [--port N] [--served-by NAME] [--root DIR]
+                               [--location PATH] [--www DIR] [--check]
+                               [--embed SCRIPT]
+
+The block turns on sendfile/tcp_nopush and an open file cache, serves the
+.gz siblings written by the asset build (gzip_static), caches fingerprinted
+bundles for a year as immutable, images for a week and HTML for a minute.
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import List
+
+# bundles named by deploy.assets: styles/bundle.<10 hex>.css
+HASHED = r"\.[0-9a-f]{10}\.(css|js)$"
+IMAGES = r"\.(png|jpe?g|gif|ico|svg|webp)$"
+IMMUTABLE = '"public, max-age=31536000, immutable"'
+IMAGE_CACHE = '"public, max-age=604800"'
+HTML_CACHE = '"public, max-age=60, must-revalidate"'
+
+
+def _headers(served_by: str, cache: str) -> List[str]:
+    """returns the add_header lines of a location; nginx does not merge
+    add_header from outer levels into a level that sets its own
+    """
+    lines = []
+    if served_by:
+        lines.append(f"add_header X-Served-By {served_by};")
+    lines.append(f"add_header Cache-Control {cache};")
+    return lines
+
+
+def server_block(port: int = 80, served_by: str = "$hostname",
+                 root: str = "/data/web_static/current",
+                 location: str = "/hbnb_static",
+                 www: str = "/var/www/html") -> str:
+    """returns the tuned server block"""
+    location = location.rstrip("/")
+    lines = [
+        "server {",
+        f"listen {port} default_server;",
+        f"listen [::]:{port} default_server;",
+    ]
+    if served_by:
+        lines.append(f"add_header X-Served-By {served_by};")
+    lines += [
+        f"root {www};",
+        "index index.html index.htm;",
+        "",
+        "sendfile on;",
+        "tcp_nopush on;",
+        "tcp_nodelay on;",
+        "keepalive_timeout 65;",
+        "open_file_cache max=10000 inactive=60s;",
+        "open_file_cache_valid 60s;",
+        "open_file_cache_min_uses 2;",
+        "open_file_cache_errors on;",
+        "",
+        "gzip on;",
+        "gzip_vary on;",
+        "gzip_comp_level 5;",
+        "gzip_min_length 256;",
+        "gzip_types text/css application/javascript image/svg+xml;",
+        "",
+        f"location = {location} {{",
+        f"return 301 {location}/;",
+        "}",
+        "",
+        f"location {location}/ {{",
+        f"alias {root.rstrip('/')}/;",
+        "index index.html index.htm;",
+        "gzip_static on;",
+        *_headers(served_by, HTML_CACHE),
+        "",
+        f'location ~* "{HASHED}" {{',
+        "gzip_static on;",
+        "access_log off;",
+        *_headers(served_by, IMMUTABLE),
+        "}",
+        "",
+        f'location ~* "{IMAGES}" {{',
+        "access_log off;",
+        *_headers(served_by, IMAGE_CACHE),
+        "}",
+        "}",
+        "",
+        "error_page 404 /404.html;",
+        "location /404 {",
+        f"root {www};",
+        "internal;",
+        "}",
+        "}",
+    ]
+    return indent(lines)
+
+
+def indent(lines: List[str]) -> str:
+    """returns lines joined and indented by block depth"""
+    out = []
+    depth = 0
+    for line in lines:
+        if line.startswith("}"):
+            depth -= 1
+        out.append("    " * depth + line if line else "")
+        if line.endswith("{"):
+            depth += 1
+    return "\n".join(out) + "\n"
+
+
+def embed(script: str, config: str) -> str:
+    """Returns script with config as the body of its NGINX here-document,
+    the block 0-setup_web_static.sh writes without a checkout of the repo.
+    Raises:
+        ValueError: If script has no NGINX here-document.
+    """
+    match = re.search(r"<<'NGINX'\n(.*?)^NGINX$", script, re.M | re.S)
+    if match is None:
+        raise ValueError("no <<'NGINX' here-document")
+    return script[:match.start(1)] + config + script[match.end(1):]
+
+
+def check(config: str) -> List[str]:
+    """Returns the structural errors of a config: unbalanced braces and
+    statements missing their semicolon.
+    """
+    errors = []
+    depth = 0
+    for number, raw in enumerate(config.splitlines(), 1):
+        line = re.sub(r'"[^"]*"', '""', raw.split("#", 1)[0]).strip()
+        if not line:
+            continue
+        if line.endswith("{"):
+            depth += 1
+        elif line == "}":
+            depth -= 1
+            if depth < 0:
+                errors.append(f"line {number}: unexpected }}")
+                depth = 0
+        elif not line.endswith(";"):
+            errors.append(f"line {number}: missing ; in {raw.strip()!r}")
+    if depth:
+        errors.append(f"{depth} unclosed block(s)")
+    return errors
+
+
+def nginx_conf(server: str, prefix: str) -> str:
+    """returns a complete nginx.conf running server under prefix"""
+    body = "\n".join("    " + line if line else ""
+                     for line in server.splitlines())
+    return (f"worker_processes 1;\n"
+            f"pid {prefix}/nginx.pid;\n"
+            f"error_log {prefix}/error.log;\n"
+            f"events {{\n    worker_connections 1024;\n}}\n"
+            f"http {{\n"
+            f"    types {{\n"
+            f"        text/html html htm;\n"
+            f"        text/css css;\n"
+            f"        application/javascript js;\n"
+            f"        image/png png;\n"
+            f"        image/webp webp;\n"
+            f"        image/x-icon ico;\n"
+            f"    }}\n"
+            f"    access_log off;\n"
+            f"    client_body_temp_path {prefix}/body;\n"
+            f"    proxy_temp_path {prefix}/proxy;\n"
+            f"    fastcgi_temp_path {prefix}/fastcgi;\n"
+            f"    uwsgi_temp_path {prefix}/uwsgi;\n"
+            f"    scgi_temp_path {prefix}/scgi;\n"
+            f"{body}\n"
+            f"}}\n")
+
+
+def nginx_test(server: str) -> List[str]:
+    """Returns the errors `nginx -t` finds in server, or [] when nginx
+    is not installed.
+    """
+    binary = shutil.which("nginx")
+    if binary is None:
+        return []
+    with tempfile.TemporaryDirectory() as prefix:
+        path = os.path.join(prefix, "nginx.conf")
+        with open(path, "w") as f:
+            f.write(nginx_conf(server, prefix))
+        done = subprocess.run([binary, "-t", "-p", prefix, "-c", path],
+                              capture_output=True, text=True)
+    if done.returncode == 0:
+        return []
+    return [line for line in done.stderr.splitlines() if "emerg" in line]
+
+
+def main(argv: List[str]) -> int:
+    """prints the server block, or its errors on stderr"""
+    parser = argparse.ArgumentParser(prog="python3 -m deploy.nginx")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--served-by", default="$hostname")
+    parser.add_argument("--root", default="/data/web_static/current")
+    parser.add_argument("--location", default="/hbnb_static")
+    parser.add_argument("--www", default="/var/www/html")
+    parser.add_argument("--check", action="store_true",
+                        help="also run nginx -t when nginx is installed")
+    parser.add_argument("--embed", metavar="SCRIPT",
+                        help="write the block into the here-document of "
+                             "SCRIPT instead of stdout")
+    args = parser.parse_args(argv)
+
+    config = server_block(args.port, args.served_by, args.root,
+                          args.location, args.www)
+    errors = check(config) + (nginx_test(config) if args.check else [])
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        return 1
+    if args.embed:
+        with open(args.embed) as f:
+            script = embed(f.read(), config)
+        with open(args.embed, "w") as f:
+            f.write(script)
+        return 0
+    sys.stdout.write(config)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,294 @@
+#!/usr/bin/python3
+"""Content-addressed, reproducible archives of the web_static tree
+
+The tree is hashed into a manifest; the archive is named after the hash,
+so an unchanged tree reuses the archive of the previous pack. Entries are
+sorted and their metadata fixed, so identical trees give identical bytes.
+Archives are gzip (the default), multi-threaded zstd, or plain tar.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+from contextlib import contextmanager
+from typing import NamedTuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK = 1 << 16
+HASH_CACHE = ".hashes.json"
+# gzip's own default, which `tar -z` used
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+class Format(NamedTuple):
+    """an archive format: file extension, magic bytes and their offset,
+    and the tar option extracting it
+    """
+    ext: str
+    magic: bytes
+    offset: int
+    tar_option: str
+
+
+FORMATS = {
+    "gz": Format(".tgz", b"\x1f\x8b", 0, "-z"),
+    "zst": Format(".tar.zst", b"\x28\xb5\x2f\xfd", 0, "--zstd"),
+    "tar": Format(".tar", b"ustar", 257, ""),
+}
+
+
+def detect(path: str) -> str:
+    """Returns the format name of the archive at path from its magic bytes.
+    Raises:
+        ValueError: If the format is not one of FORMATS.
+    """
+    with open(path, "rb") as f:
+        head = f.read(512)
+    for name, fmt in FORMATS.items():
+        if head[fmt.offset:fmt.offset + len(fmt.magic)] == fmt.magic:
+            return name
+    raise ValueError(f"unknown archive format: {path}")
+
+
+def zstd_available() -> bool:
+    """returns whether zstd archives can be written and read"""
+    return zstandard is not None or shutil.which("zstd") is not None
+
+
+@contextmanager
+def compressor(fmt: str, raw):
+    """yields a file object compressing into the file object raw"""
+    if fmt == "tar":
+        yield raw
+    elif fmt == "gz":
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw,
+                           compresslevel=GZIP_LEVEL, mtime=0) as gz:
+            yield gz
+    elif fmt != "zst":
+        raise ValueError(f"unknown archive format: {fmt}")
+    elif zstandard is not None:
+        cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+        with cctx.stream_writer(raw, closefd=False) as zst:
+            yield zst
+    else:
+        with _zstd(["-q", f"-{ZSTD_LEVEL}", "-T0", "-c"],
+                   stdin=subprocess.PIPE, stdout=raw) as proc:
+            yield proc.stdin
+
+
+@contextmanager
+def decompressor(fmt: str, raw):
+    """yields a file object reading the decompressed file object raw"""
+    if fmt == "tar":
+        yield raw
+    elif fmt == "gz":
+        with gzip.GzipFile(fileobj=raw, mode="rb") as gz:
+            yield gz
+    elif fmt != "zst":
+        raise ValueError(f"unknown archive format: {fmt}")
+    elif zstandard is not None:
+        with zstandard.ZstdDecompressor().stream_reader(raw) as zst:
+            yield zst
+    else:
+        with _zstd(["-q", "-d", "-c"], stdin=raw,
+                   stdout=subprocess.PIPE) as proc:
+            yield proc.stdout
+
+
+@contextmanager
+def _zstd(args, stdin, stdout):
+    """runs the zstd command, failing when it is missing or fails"""
+    if shutil.which("zstd") is None:
+        raise FileNotFoundError("zstd archives need the zstandard module "
+                                "or the zstd command")
+    proc = subprocess.Popen(["zstd", *args], stdin=stdin, stdout=stdout)
+    try:
+        yield proc
+    finally:
+        for pipe in (proc.stdin, proc.stdout):
+            if pipe is not None:
+                pipe.close()
+        if proc.wait() != 0:
+            raise OSError(f"zstd exited with status {proc.returncode}")
+
+
+@contextmanager
+def open_archive(path: str):
+    """yields the archive at path as a tarfile read in stream mode"""
+    with open(path, "rb") as raw, \
+            decompressor(detect(path), raw) as stream, \
+            tarfile.open(fileobj=stream, mode="r|") as tar:
+        yield tar
+
+
+def file_hash(path: str) -> str:
+    """returns the sha256 hex digest of the file at path"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_changed(path: str, data: bytes) -> bool:
+    """Writes data to path, creating its directory, unless the file holds
+    data already: its mtime then still matches the hash cache of manifest.
+    Returns:
+        True if the file was written.
+    """
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def walk(root: str):
+    """yields the paths of the files under root relative to it, sorted"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        rel = os.path.relpath(dirpath, root)
+        for name in sorted(filenames):
+            yield name if rel == "." else f"{rel}/{name}"
+
+
+def manifest(root: str, cache: dict = None) -> dict:
+    """Returns {relative path: [size, sha256]} for every file under root.
+    cache maps paths to [size, mtime_ns, sha256] from an earlier run;
+    files whose size and mtime did not change are not read again. It is
+    updated in place.
+    """
+    files = {}
+    for rel in walk(root):
+        st = os.stat(os.path.join(root, rel))
+        known = cache.get(rel) if cache is not None else None
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            digest = known[2]
+        else:
+            digest = file_hash(os.path.join(root, rel))
+            if cache is not None:
+                cache[rel] = [st.st_size, st.st_mtime_ns, digest]
+        files[rel] = [st.st_size, digest]
+    return files
+
+
+def tree_hash(files: dict) -> str:
+    """returns the sha256 of a manifest, independent of its order"""
+    digest = hashlib.sha256()
+    for rel in sorted(files):
+        size, sha = files[rel]
+        digest.update(f"{rel}\0{size}\0{sha}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _entry(name: str, size: int = 0, directory: bool = False):
+    """returns a TarInfo with fixed ownership, mode and mtime"""
+    info = tarfile.TarInfo(name)
+    info.mtime = 0
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    if directory:
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o755
+    else:
+        info.size = size
+        info.mode = 0o644
+    return info
+
+
+def write_archive(root: str, files: dict, path: str, prefix: str,
+                  fmt: str = "gz") -> None:
+    """Writes the files of root to a reproducible archive at path, under
+    the directory prefix, in format fmt.
+    """
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as raw, compressor(fmt, raw) as stream, \
+                tarfile.open(fileobj=stream, mode="w|",
+                             format=tarfile.GNU_FORMAT) as tar:
+            tar.addfile(_entry(prefix, directory=True))
+            dirs = set()
+            for rel in sorted(files):
+                parts = rel.split("/")[:-1]
+                for i in range(1, len(parts) + 1):
+                    name = "/".join(parts[:i])
+                    if name not in dirs:
+                        dirs.add(name)
+                        tar.addfile(_entry(f"{prefix}/{name}",
+                                           directory=True))
+                with open(os.path.join(root, rel), "rb") as f:
+                    tar.addfile(_entry(f"{prefix}/{rel}", files[rel][0]), f)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+
+
+def _load_json(path: str) -> dict:
+    """returns the JSON object stored at path, or {} if unreadable"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def pack(root: str = "web_static", versions: str = "versions",
+         fmt: str = "gz") -> str:
+    """Archives root into versions in format fmt (a key of FORMATS),
+    unless an archive of the same content and format already exists there.
+    Returns:
+        The path of the archive, named <root name>_<tree hash> plus the
+        extension of fmt, with its manifest next to it as .manifest.json.
+    Raises:
+        OSError: If root can not be read or the archive written.
+        ValueError: If fmt is not a known format.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown archive format: {fmt}")
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"no directory {root}")
+    os.makedirs(versions, exist_ok=True)
+
+    prefix = os.path.basename(os.path.normpath(root))
+    cache_path = os.path.join(versions, HASH_CACHE)
+    caches = _load_json(cache_path)
+    cache = caches.get(prefix, {})
+    files = manifest(root, cache)
+    digest = tree_hash(files)
+
+    name = f"{prefix}_{digest[:16]}"
+    path = os.path.join(versions, name + FORMATS[fmt].ext)
+    if not os.path.isfile(path):
+        write_archive(root, files, path, prefix, fmt)
+        with open(os.path.join(versions, f"{name}.manifest.json"),
+                  "w") as f:
+            json.dump({"tree": digest, "files": files}, f,
+                      indent=0, sort_keys=True)
+
+    caches[prefix] = {rel: cache[rel] for rel in files}
+    with open(cache_path, "w") as f:
+        json.dump(caches, f)
+    return path
+
+
+def read_manifest(archive: str) -> dict:
+    """returns the manifest written next to archive by pack"""
+    name = os.path.basename(archive).split(".")[0]
+    with open(os.path.join(os.path.dirname(archive),
+                           f"{name}.manifest.json")) as f:
+        return json.load(f)
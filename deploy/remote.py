@@ -0,0 +1,283 @@
+#!/usr/bin/python3
+"""Runs release scripts on web servers, or on local stand-ins for them
+
+A deploy to one host is a single round trip: the archive is streamed to
+the stdin of one shell script that unpacks it into a new release and
+swaps the `current` symlink atomically. A delta deploy first lists the
+hashes of the current release, then sends only the files that changed.
+"""
+import os
+import shlex
+import subprocess
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple
+
+from deploy.pack import (FORMATS, compressor, detect, open_archive,
+                         read_manifest)
+
+BASE = "/data/web_static"
+
+# "# phase <name>" comments mark the steps of the scripts below, which
+# deploy.simulate turns into timestamps
+
+# unpacks stdin into releases/<name>. Release names are content
+# addressed, so an existing release already holds the same files and is
+# only relinked; new ones are unpacked aside and renamed into place.
+FULL = """set -e
+# phase unpack
+base={base}
+release="$base/releases/{name}"
+mkdir -p "$base/releases"
+if [ -d "$release" ]; then
+    {skip}
+else
+    unpack="$release.tmp.$$"
+    rm -rf "$unpack"
+    mkdir -p "$unpack"
+    tar {option} -xf {source} -C "$unpack" --strip-components=1
+    mv -T "$unpack" "$release"
+fi
+{cleanup}"""
+
+# hardlinks the current release into releases/<name>, drops the files
+# that changed or went away, then unpacks the changed files from stdin
+DELTA = """set -e
+# phase unpack
+base={base}
+release="$base/releases/{name}"
+mkdir -p "$base/releases"
+if [ -d "$release" ]; then
+    cat > /dev/null
+else
+    unpack="$release.tmp.$$"
+    rm -rf "$unpack"
+    prev=$(readlink -f "$base/current" || true)
+    if [ -n "$prev" ] && [ -d "$prev" ]; then
+        cp -al "$prev" "$unpack"
+    else
+        mkdir -p "$unpack"
+    fi
+    cd "$unpack"
+    {removals}tar {option} -xf - --strip-components=1 --unlink-first
+    find . -mindepth 1 -type d -empty -delete
+    cd /
+    mv -T "$unpack" "$release"
+fi
+"""
+
+# renames a fresh symlink over `current`, so readers see either the old
+# or the new release, then prunes all but the newest releases. The
+# release `current` points to is never removed before the swap.
+SWAP = """# phase relink
+touch "$release"
+ln -sfn "$release" "$base/current.tmp.$$"
+mv -T "$base/current.tmp.$$" "$base/current"
+"""
+
+PRUNE = """# phase prune
+ls -1dt "$base"/releases/*/ | tail -n +{skip} | while read -r old; do
+    [ "${{old%/}}" = "$release" ] || rm -rf "${{old%/}}"
+done
+"""
+
+# prints the sha256 and path of every file of the current release
+HASHES = """cd {base}/current 2>/dev/null || exit 0
+find . -type f -print0 | xargs -0 -r sha256sum
+"""
+
+
+def _tail(keep: int = None) -> str:
+    """returns the swap, and the pruning when releases are kept"""
+    return SWAP + ("" if keep is None else PRUNE.format(skip=keep + 1))
+
+
+def release_script(name: str, base: str = BASE, source: str = "-",
+                   option: str = "-z", keep: int = None) -> str:
+    """Returns the script releasing the archive at source (stdin for -)
+    as releases/<name> under base, extracting it with the tar option
+    of its format. An archive file is removed once unpacked. With keep,
+    only the newest keep releases are left.
+    """
+    cleanup = "" if source == "-" else f"rm -f {shlex.quote(source)}\n"
+    skip = "cat > /dev/null" if source == "-" else ":"
+    return FULL.format(base=shlex.quote(base), name=shlex.quote(name),
+                       source=shlex.quote(source), option=option,
+                       skip=skip, cleanup=cleanup) + _tail(keep)
+
+
+def delta_script(name: str, removed: List[str], base: str = BASE,
+                 option: str = "-z", keep: int = None) -> str:
+    """Returns the script building releases/<name> from the current
+    release without the removed paths, plus the files read from stdin.
+    """
+    removals = "".join(
+        "rm -f -- " + " ".join(shlex.quote(rel) for rel in
+                               removed[i:i + 100]) + "\n    "
+        for i in range(0, len(removed), 100))
+    return DELTA.format(base=shlex.quote(base), name=shlex.quote(name),
+                        option=option, removals=removals) + _tail(keep)
+
+
+def release_name(archive: str) -> str:
+    """returns the release name of an archive: its file name without
+    extensions
+    """
+    return os.path.basename(archive).split(".")[0]
+
+
+class LocalHost:
+    """A web server stand-in: runs scripts locally, with the server's
+    filesystem rooted at a local directory.
+    Attributes:
+        name (str): Name shown in reports.
+        root (str): Local directory standing for the server's /.
+    """
+
+    def __init__(self, root: str, name: str = None):
+        """creates a host rooted at root"""
+        self.root = root
+        self.name = name or root
+
+    def path(self, remote: str) -> str:
+        """returns the local path of a path on the server"""
+        return os.path.join(self.root, remote.lstrip("/"))
+
+    def run(self, script: str, stdin=None) -> subprocess.CompletedProcess:
+        """runs script with bash, feeding it stdin"""
+        return subprocess.run(["bash", "-c", script], stdin=stdin,
+                              capture_output=True)
+
+
+class SshHost:
+    """A web server reached with ssh.
+    Attributes:
+        name (str): Host name or address.
+        user (str): Login, or None for the ssh default.
+        key (str): Private key file, or None for the ssh default.
+        sudo (bool): Whether scripts run as root.
+    """
+
+    def __init__(self, name: str, user: str = None, key: str = None,
+                 sudo: bool = True):
+        """creates a host reached at name"""
+        self.name = name
+        self.user = user
+        self.key = key
+        self.sudo = sudo
+
+    def path(self, remote: str) -> str:
+        """returns remote unchanged: the server's paths are used as is"""
+        return remote
+
+    def run(self, script: str, stdin=None) -> subprocess.CompletedProcess:
+        """runs script with bash on the host in one ssh session"""
+        command = ["ssh", "-o", "BatchMode=yes"]
+        if self.key:
+            command += ["-i", self.key]
+        command.append(f"{self.user}@{self.name}" if self.user
+                       else self.name)
+        shell = ["sudo", "bash"] if self.sudo else ["bash"]
+        command.append(" ".join(shell + ["-c", shlex.quote(script)]))
+        return subprocess.run(command, stdin=stdin, capture_output=True)
+
+
+class Result(NamedTuple):
+    """the outcome of a deploy to one host"""
+    host: str
+    ok: bool
+    seconds: float
+    error: str
+    sent: int = 0
+
+
+def remote_hashes(host, base: str = BASE) -> dict:
+    """Returns {relative path: sha256} of the current release of host,
+    empty when there is none.
+    Raises:
+        OSError: If the files of the release could not be listed.
+    """
+    done = host.run(HASHES.format(base=shlex.quote(host.path(base))))
+    if done.returncode != 0:
+        raise OSError(done.stderr.decode("utf-8", "replace").strip())
+    hashes = {}
+    for line in done.stdout.decode("utf-8").splitlines():
+        sha, _, rel = line.partition("  ")
+        hashes[rel[2:]] = sha
+    return hashes
+
+
+def write_delta(archive: str, hashes: dict, out) -> List[str]:
+    """Writes to out a .tgz of the files of archive that are missing
+    from or differ in hashes, a {path: sha256} of the release to update.
+    Returns:
+        The paths to remove from that release before unpacking out.
+    """
+    files = read_manifest(archive)["files"]
+    changed = {rel for rel, (_, sha) in files.items()
+               if hashes.get(rel) != sha}
+    with open_archive(archive) as src, compressor("gz", out) as gz, \
+            tarfile.open(fileobj=gz, mode="w|",
+                         format=tarfile.GNU_FORMAT) as tar:
+        for member in src:
+            rel = member.name.partition("/")[2]
+            if member.isfile() and rel in changed:
+                tar.addfile(member, src.extractfile(member))
+    return sorted(changed & hashes.keys() | hashes.keys() - files.keys())
+
+
+def deploy_host(archive: str, host, name: str = None,
+                keep: int = None) -> Result:
+    """Streams archive to host and releases it as name"""
+    name = name or release_name(archive)
+    start = time.perf_counter()
+    try:
+        option = FORMATS[detect(archive)].tar_option
+        script = release_script(name, host.path(BASE), option=option,
+                                keep=keep)
+        with open(archive, "rb") as stdin:
+            done = host.run(script, stdin)
+    except (OSError, ValueError) as e:
+        return Result(host.name, False, time.perf_counter() - start, str(e))
+    error = done.stderr.decode("utf-8", "replace").strip()
+    return Result(host.name, done.returncode == 0,
+                  time.perf_counter() - start, error,
+                  os.path.getsize(archive))
+
+
+def deploy_delta(archive: str, host, name: str = None,
+                 keep: int = None) -> Result:
+    """Releases archive on host as name, sending only the files that
+    differ from its current release and hardlinking the others.
+    The archive needs the manifest written next to it by pack.
+    """
+    name = name or release_name(archive)
+    start = time.perf_counter()
+    try:
+        hashes = remote_hashes(host)
+        with tempfile.TemporaryFile() as stdin:
+            removed = write_delta(archive, hashes, stdin)
+            sent = stdin.tell()
+            stdin.seek(0)
+            done = host.run(delta_script(name, removed, host.path(BASE),
+                                         keep=keep), stdin)
+    except (OSError, ValueError, tarfile.TarError) as e:
+        return Result(host.name, False, time.perf_counter() - start, str(e))
+    error = done.stderr.decode("utf-8", "replace").strip()
+    return Result(host.name, done.returncode == 0,
+                  time.perf_counter() - start, error, sent)
+
+
+def deploy_all(archive: str, hosts: List, parallel: int = 4,
+               delta: bool = False, keep: int = None) -> List[Result]:
+    """Deploys archive to every host, at most parallel at a time, as a
+    delta against each host's current release when delta is set.
+    Returns:
+        One Result per host, in the order of hosts.
+    """
+    deploy = deploy_delta if delta else deploy_host
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        return list(pool.map(lambda host: deploy(archive, host, keep=keep),
+                             hosts))
@@ -0,0 +1,319 @@
+#!/usr/bin/python3
+"""Runs the fabfiles against local stand-ins for the web servers
+
+The fabfile is loaded with a `fabric.api` whose put, run and sudo act
+on LocalHosts: files are copied under each host's directory and
+scripts run locally with the server paths (/data/, /tmp/) mapped into
+it. Each task is timed per host and phase: pack, upload, and the
+phases marked in the release scripts (unpack, relink, prune).
+
+Usage: python3 -m deploy.simulate [--fabfile F] [--hosts N] [--rounds R]
+       [--out report.json] [--baseline report.json] [--tolerance 0.25]
+"""
+import argparse
+import functools
+import importlib.util
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+from contextlib import redirect_stdout
+from typing import List
+
+from deploy.pack import pack
+from deploy.remote import LocalHost
+
+# the server paths the fabfiles write to
+MOUNTS = re.compile(r"(?<![^\s'\"=])/(data|tmp)/")
+MARK = re.compile(r"^# phase (\w+)$", re.M)
+TASKS = ("do_pack", "do_deploy", "deploy")
+
+
+class Output(str):
+    """the outcome of put, run or sudo, like fabric's"""
+
+    def __new__(cls, stdout: str = "", code: int = 0, stderr: str = ""):
+        """creates the output of a command that exited with code"""
+        out = super().__new__(cls, stdout)
+        out.return_code = code
+        out.stderr = stderr
+        out.failed = code != 0
+        out.succeeded = code == 0
+        return out
+
+
+def localize(host: LocalHost, script: str) -> str:
+    """returns script with the server paths mapped into host"""
+    return MOUNTS.sub(lambda m: host.path(m.group(0)), script)
+
+
+class FabricApi:
+    """The fabric.api seen by a simulated fabfile. Commands go to the
+    host named by env.host_string, and like with warn_only, failures are
+    returned rather than aborting.
+    Attributes:
+        env: Fabric's env: hosts, host_string, user, key_filename.
+        hosts (dict): LocalHost of each host name.
+        phases (dict): Seconds per phase since the last reset.
+    """
+
+    def __init__(self, hosts: List[LocalHost]):
+        """creates the api of a deploy to hosts"""
+        self.hosts = {host.name: host for host in hosts}
+        self.env = types.SimpleNamespace(hosts=list(self.hosts),
+                                         host_string=None, user=None,
+                                         key_filename=None)
+        self.phases = defaultdict(float)
+
+    def host(self) -> LocalHost:
+        """returns the current host"""
+        return self.hosts[self.env.host_string]
+
+    def put(self, local_path: str, remote_path: str) -> Output:
+        """copies local_path to the current host"""
+        start = time.perf_counter()
+        try:
+            target = self.host().path(remote_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(local_path, target)
+        except OSError as e:
+            return Output("", 1, str(e))
+        finally:
+            self.phases["upload"] += time.perf_counter() - start
+        return Output(remote_path)
+
+    def run(self, command: str) -> Output:
+        """runs command on the current host, timing its phases"""
+        host = self.host()
+        script = MARK.sub(r'echo "@phase \1 $EPOCHREALTIME"',
+                          localize(host, command))
+        start = time.time()
+        done = host.run(script)
+        end = time.time()
+        lines, marks = [], [("start", start)]
+        for line in done.stdout.decode("utf-8", "replace").splitlines():
+            if line.startswith("@phase "):
+                _, name, stamp = line.split(" ")
+                marks.append((name, float(stamp.replace(",", "."))))
+            else:
+                lines.append(line)
+        for (name, begin), (_, until) in zip(marks, marks[1:] +
+                                             [(None, end)]):
+            self.phases[name] += until - begin
+        return Output("\n".join(lines), done.returncode,
+                      done.stderr.decode("utf-8", "replace"))
+
+    sudo = run
+
+    @staticmethod
+    def runs_once(func):
+        """runs func on the first call only, returning its first result"""
+        results = []
+
+        @functools.wraps(func)
+        def once(*args, **kwargs):
+            if not results:
+                results.append(func(*args, **kwargs))
+            return results[0]
+        return once
+
+    def module(self) -> types.ModuleType:
+        """returns this api as a fabric.api module"""
+        api = types.ModuleType("fabric.api")
+        for name in ("env", "put", "run", "sudo", "runs_once"):
+            setattr(api, name, getattr(self, name))
+        return api
+
+
+def load_fabfile(path: str, api: FabricApi) -> types.ModuleType:
+    """Imports the fabfile at path with api as its fabric.api. The
+    hosts of the fabfile are replaced by the hosts of api.
+    """
+    fabric = types.ModuleType("fabric")
+    fabric.api = api.module()
+    saved = {name: sys.modules.get(name) for name in ("fabric", "fabric.api")}
+    sys.modules.update({"fabric": fabric, "fabric.api": fabric.api})
+    try:
+        name = "fabfile_" + re.sub(r"\W", "_", os.path.basename(path)[:-3])
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for name, saved_module in saved.items():
+            if saved_module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = saved_module
+    api.env.hosts = list(api.hosts)
+    return module
+
+
+def _change(source: str, round_number: int):
+    """edits the first page of source, so each round packs a new tree"""
+    pages = sorted(name for name in os.listdir(source)
+                   if name.endswith(".html"))
+    if pages:
+        with open(os.path.join(source, pages[0]), "a") as f:
+            f.write(f"<!-- round {round_number} -->\n")
+
+
+def _summary(runs: List[dict]) -> dict:
+    """returns the median and max seconds of each phase of runs"""
+    samples = defaultdict(list)
+    for run in runs:
+        samples["total"].append(run["seconds"])
+        for phase, seconds in run["phases"].items():
+            samples[phase].append(seconds)
+    return {phase: {"median": round(statistics.median(values), 6),
+                    "max": round(max(values), 6)}
+            for phase, values in samples.items()}
+
+
+def simulate(fabfile: str, hosts: int = 3, rounds: int = 1,
+             source: str = "web_static", fmt: str = "gz") -> dict:
+    """Runs do_pack once, then do_deploy and deploy on every host, in
+    each of rounds, against hosts local hosts. Without do_pack, the
+    tree is packed untimed for do_deploy. A copy of source is the
+    fabfile's web_static; it is edited before every round but the first.
+    Returns:
+        The report: for every task of the fabfile, one run per round and
+        host with its seconds and phases, and their summary.
+    """
+    fabfile = os.path.abspath(fabfile)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work:
+        shutil.copytree(source, os.path.join(work, "web_static"))
+        api = FabricApi([LocalHost(os.path.join(work, "hosts", name), name)
+                         for name in (f"web-{i:02}" for i in range(hosts))])
+        module = load_fabfile(fabfile, api)
+        tasks = [task for task in TASKS if hasattr(module, task)]
+        if hasattr(module, "do_pack"):
+            do_pack = module.do_pack
+
+            def timed_pack(*args):
+                start = time.perf_counter()
+                try:
+                    return do_pack(*args)
+                finally:
+                    api.phases["pack"] += time.perf_counter() - start
+            module.do_pack = timed_pack
+
+        report = {"fabfile": os.path.basename(fabfile), "hosts": hosts,
+                  "rounds": rounds, "format": fmt, "archive_bytes": None,
+                  "tasks": {task: {"runs": []} for task in tasks}}
+        os.chdir(work)
+        try:
+            for number in range(1, rounds + 1):
+                if number > 1:
+                    _change("web_static", number)
+                archive = _round(module, api, tasks, number, fmt, report)
+                if archive:
+                    report["archive_bytes"] = os.path.getsize(archive)
+        finally:
+            os.chdir(cwd)
+    for entry in report["tasks"].values():
+        entry["ok"] = all(run["ok"] for run in entry["runs"])
+        entry["summary"] = _summary(entry["runs"]) if entry["runs"] else {}
+    return report
+
+
+def _round(module, api: FabricApi, tasks: List[str], number: int,
+           fmt: str, report: dict):
+    """runs the tasks of one round, adding their runs to report, and
+    returns the archive packed by do_pack
+    """
+    archive = None
+
+    def record(task, host, call):
+        api.phases.clear()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            result = call()
+        report["tasks"][task]["runs"].append({
+            "round": number, "host": host, "ok": bool(result),
+            "seconds": round(time.perf_counter() - start, 6),
+            "phases": {phase: round(seconds, 6)
+                       for phase, seconds in api.phases.items()}})
+        return result
+
+    if "do_pack" in tasks:
+        archive = record("do_pack", None, lambda: module.do_pack(fmt))
+    else:
+        archive = pack("web_static", "versions", fmt)
+    for task in ("do_deploy", "deploy"):
+        if task not in tasks:
+            continue
+        for name in api.hosts:
+            api.env.host_string = name
+            if task == "deploy":
+                record(task, name, lambda: module.deploy(fmt))
+            elif archive:
+                record(task, name, lambda: module.do_deploy(archive))
+    api.env.host_string = None
+    return archive
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.25,
+            floor: float = 0.005) -> List[str]:
+    """Returns the regressions of report against baseline: failed tasks,
+    and phases whose median grew by more than tolerance and floor
+    seconds.
+    """
+    regressions = []
+    for task, entry in report["tasks"].items():
+        if not entry["ok"]:
+            regressions.append(f"{task}: failed")
+        before = baseline.get("tasks", {}).get(task, {}).get("summary", {})
+        for phase, stats in entry["summary"].items():
+            if phase not in before:
+                continue
+            old, new = before[phase]["median"], stats["median"]
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(f"{task} {phase}: {old:.4f}s -> "
+                                   f"{new:.4f}s")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    """writes the report of a simulated deploy, and returns 1 when a
+    task failed or regressed against the baseline
+    """
+    parser = argparse.ArgumentParser(
+        prog="python3 -m deploy.simulate",
+        description="Time the fabfile tasks against local hosts.")
+    parser.add_argument("--fabfile", default="3-deploy_web_static.py")
+    parser.add_argument("--hosts", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--source", default="web_static")
+    parser.add_argument("--format", default="gz", dest="fmt")
+    parser.add_argument("--out", help="report file instead of stdout")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    report = simulate(args.fabfile, args.hosts, args.rounds, args.source,
+                      args.fmt)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    failures = [f"{task}: failed" for task, entry in report["tasks"].items()
+                if not entry["ok"]]
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(report, json.load(f), args.tolerance)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+"""Thin client for the console served by `console.py --serve`
+
+Usage:
+    hbnb_client.py [-s <socket>] [<command> ...]
+
+The command given as arguments is sent as a single line; without
+arguments, every line read from stdin is sent in order.
+"""
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = os.getenv("HBNB_SOCKET", "/tmp/hbnb_console.sock")
+END = b"\0"
+
+
+def send(sock, reader, line, out):
+    """sends line and copies the reply to out until the end marker"""
+    sock.sendall(line.rstrip("\r\n").encode("utf-8") + b"\n")
+    while True:
+        chunk = reader.read1(65536)
+        if not chunk:
+            return False
+        end = chunk.find(END)
+        if end != -1:
+            out.write(chunk[:end])
+            out.flush()
+            return True
+        out.write(chunk)
+
+
+def main(argv):
+    """runs the client and returns the exit status"""
+    path = DEFAULT_SOCKET
+    if len(argv) >= 2 and argv[0] == "-s":
+        path, argv = argv[1], argv[2:]
+    lines = [" ".join(argv)] if argv else sys.stdin
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        print(f"cannot connect to {path}: {e}", file=sys.stderr)
+        return 1
+
+    with sock, sock.makefile("rb") as reader:
+        for line in lines:
+            if not send(sock, reader, line, sys.stdout.buffer):
+                break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,24 @@
 #!/usr/bin/python3
-"""This module instantiates an object of class FileStorage"""
-from models.engine.file_storage import FileStorage
+"""This module instantiates the storage engine selected by HBNB_TYPE_STORAGE
+The engine loads its data on first use, and SQLAlchemy is only imported
+when the db engine is selected.
+"""
+from os import getenv
 
+from models import metrics
 
-from os import getenv
+storage_t = getenv("HBNB_TYPE_STORAGE")
 
-if getenv("HBNB_TYPE_STORAGE") == "db":
+if storage_t == "db":
     from models.engine.db_storage import DBStorage
     storage = DBStorage()
 else:
     from models.engine.file_storage import FileStorage
     storage = FileStorage()
-storage.reload()
+
+
+@metrics.collector
+def object_counts():
+    """gauges of the number of objects of each class in storage"""
+    return {f"objects.{name}": count
+            for name, count in storage.object_counts().items()}
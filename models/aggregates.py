@@ -0,0 +1,222 @@
+#!/usr/bin/python3
+"""Aggregates of places per city and state, and of reviews per place
+Each group keeps a count, and for every numeric attribute of its class
+the sum, min, max and mean, so reading one is a dictionary lookup. The
+storage engines build them on the first read and keep them up to date
+through their listeners.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# what is grouped (class, attribute holding the group id) by group name;
+# places are grouped by state through the state_id of their city
+GROUPS = {
+    "city": ("Place", "city_id"),
+    "state": ("Place", "state_id"),
+    "place": ("Review", "place_id"),
+}
+# attributes summarized, by class name
+NUMBERS = {
+    "Place": ("price_by_night", "number_rooms", "number_bathrooms",
+              "max_guest"),
+    "Review": (),
+}
+
+
+def number_of(obj, attr: str):
+    """returns the attribute attr of obj if it is a number, else None"""
+    value = getattr(obj, attr, None)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+class Summary:
+    """The count, sum, min and max of the values of one attribute in one
+    group. The values themselves are counted so that removing the
+    smallest or largest one finds the next.
+    """
+    __slots__ = ("count", "sum", "values", "min", "max")
+
+    def __init__(self):
+        """creates an empty summary"""
+        self.count = self.sum = 0
+        self.values = Counter()
+        self.min = self.max = None
+
+    def add(self, value):
+        """adds one value"""
+        self.count += 1
+        self.sum += value
+        self.values[value] += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def remove(self, value):
+        """removes one value added before"""
+        self.count -= 1
+        self.sum -= value
+        self.values[value] -= 1
+        if self.values[value] <= 0:
+            del self.values[value]
+            if value == self.min:
+                self.min = min(self.values, default=None)
+            if value == self.max:
+                self.max = max(self.values, default=None)
+
+    def as_dict(self) -> Dict:
+        """returns the sum, min, max and mean of the values"""
+        return {"sum": self.sum, "min": self.min, "max": self.max,
+                "mean": self.sum / self.count if self.count else None}
+
+
+class Group:
+    """The objects of one group: their count and a Summary per attribute"""
+    __slots__ = ("count", "summaries")
+
+    def __init__(self, numbers: Tuple[str]):
+        """creates an empty group summarizing the attributes numbers"""
+        self.count = 0
+        self.summaries = {name: Summary() for name in numbers}
+
+    def add(self, values: Tuple):
+        """adds one object, given by its values of the attributes"""
+        self.count += 1
+        for summary, value in zip(self.summaries.values(), values):
+            if value is not None:
+                summary.add(value)
+
+    def remove(self, values: Tuple):
+        """removes one object added before with values"""
+        self.count -= 1
+        for summary, value in zip(self.summaries.values(), values):
+            if value is not None:
+                summary.remove(value)
+
+    def as_dict(self) -> Dict:
+        """returns the count and the summary of every attribute"""
+        result = {"count": self.count}
+        for name, summary in self.summaries.items():
+            result[name] = summary.as_dict()
+        return result
+
+
+class Aggregates:
+    """The groups of every grouping, maintained object by object.
+    Attributes:
+        groups (dict): Group of each id, by grouping name.
+        parts (dict): Groupings and values each object was added with,
+            by key, to remove it when it changes.
+        city_states (dict): state_id of each city id.
+        stale (bool): Whether the groups must be rebuilt before use.
+        touched (bool): Whether a change was reported since the last
+            save.
+    """
+
+    def __init__(self):
+        """creates empty, stale aggregates"""
+        self.clear()
+        self.stale = True
+        self.touched = False
+
+    def clear(self):
+        """removes every group"""
+        self.groups: Dict[str, Dict[str, Group]] = {by: {} for by in GROUPS}
+        self.parts: Dict[str, Tuple[List, Tuple]] = {}
+        self.city_states: Dict[str, str] = {}
+
+    def build(self, objs: Iterable):
+        """adds every object of objs, replacing all groups"""
+        self.clear()
+        objs = list(objs)
+        for obj in objs:
+            if type(obj).__name__ == "City":
+                self.city_states[obj.id] = obj.state_id
+        for obj in objs:
+            if type(obj).__name__ in NUMBERS:
+                self.add(obj)
+        self.stale = self.touched = False
+
+    def add(self, obj):
+        """adds obj to its groups, removing it from its previous ones"""
+        name = type(obj).__name__
+        key = f"{name}.{obj.id}"
+        self.remove(key)
+        values = tuple(number_of(obj, attr) for attr in NUMBERS[name])
+        joined = []
+        for by, (cls, attr) in GROUPS.items():
+            if cls != name:
+                continue
+            if attr == "state_id":
+                group_id = self.city_states.get(obj.city_id)
+            else:
+                group_id = getattr(obj, attr, None)
+            if group_id is None:
+                continue
+            group = self.groups[by].get(group_id)
+            if group is None:
+                group = self.groups[by][group_id] = Group(NUMBERS[name])
+            group.add(values)
+            joined.append((by, group_id))
+        self.parts[key] = (joined, values)
+
+    def remove(self, key: str):
+        """removes the object of key from its groups, if it is in any"""
+        part = self.parts.pop(key, None)
+        if part is None:
+            return
+        joined, values = part
+        for by, group_id in joined:
+            group = self.groups[by][group_id]
+            group.remove(values)
+            if not group.count:
+                del self.groups[by][group_id]
+
+    def changed(self, event: str, obj=None):
+        """Storage listener keeping the groups up to date. A city moving
+        to another state, or created after its places, moves its places
+        between states, and makes the aggregates stale. So does a save
+        with no change reported since the previous one, like reload.
+        """
+        if self.stale:
+            return
+        if obj is None:
+            if event == "save" and self.touched:
+                self.touched = False
+            else:
+                self.stale = True
+            return
+        self.touched = True
+        name = type(obj).__name__
+        if name == "City":
+            previous = self.city_states.get(obj.id)
+            state = None if event == "delete" else obj.state_id
+            self.city_states[obj.id] = state
+            if previous != state and obj.id in self.groups["city"]:
+                self.stale = True
+        elif name in NUMBERS:
+            if event == "delete":
+                self.remove(f"{name}.{obj.id}")
+            else:
+                self.add(obj)
+
+    def get(self, by: str, group_id: str) -> Dict:
+        """Returns the count and summaries of one group, empty when it
+        holds no object.
+        Raises:
+            KeyError: If by is not a grouping.
+        """
+        group = self.groups[by].get(group_id)
+        if group is None:
+            group = Group(NUMBERS[GROUPS[by][0]])
+        return group.as_dict()
+
+    def all(self, by: str) -> Dict[str, Dict]:
+        """Returns the count and summaries of every group of by.
+        Raises:
+            KeyError: If by is not a grouping.
+        """
+        return {group_id: group.as_dict()
+                for group_id, group in self.groups[by].items()}
@@ -1,10 +1,13 @@
 #!/usr/bin/python3
 """Defines the Amenity class."""
+import models
 from models.base_model import Base
 from models.base_model import BaseModel
-from sqlalchemy import Column
-from sqlalchemy import String
-from sqlalchemy.orm import relationship
+
+if models.storage_t == "db":
+    from sqlalchemy import Column
+    from sqlalchemy import String
+    from sqlalchemy.orm import relationship
 
 
 class Amenity(BaseModel, Base):
@@ -15,7 +18,10 @@ class Amenity(BaseModel, Base):
         name (sqlalchemy String): The amenity name.
         place_amenities (sqlalchemy relationship): Place-Amenity relationship.
     """
-    __tablename__ = "amenities"
-    name = Column(String(128), nullable=False)
-    place_amenities = relationship("Place", secondary="place_amenity",
-                                   viewonly=False)
+    if models.storage_t == "db":
+        __tablename__ = "amenities"
+        name = Column(String(128), nullable=False)
+        place_amenities = relationship("Place", secondary="place_amenity",
+                                       viewonly=False)
+    else:
+        name = ""
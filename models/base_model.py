@@ -2,21 +2,30 @@
 """This module defines a base class for all models in our hbnb clone"""
 import uuid
 from datetime import datetime
-from inspect import Signature, Parameter
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column
-from sqlalchemy import DateTime
-from sqlalchemy import String
 import models
 
-Base = declarative_base()
+if models.storage_t == "db":
+    from sqlalchemy import Column
+    from sqlalchemy import DateTime
+    from sqlalchemy import String
+    from sqlalchemy.orm import declarative_base
+
+    Base = declarative_base()
+else:
+    Base = object
+
+# attributes kept by the model itself, never set by an update
+RESERVED = ("id", "created_at", "updated_at", "__class__")
 
 
 class BaseModel:
     """A base class for all hbnb models"""
-    id = Column(String(60), primary_key=True, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow())
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow())
+    if models.storage_t == "db":
+        id = Column(String(60), primary_key=True, nullable=False)
+        created_at = Column(DateTime, nullable=False,
+                            default=datetime.utcnow())
+        updated_at = Column(DateTime, nullable=False,
+                            default=datetime.utcnow())
 
     def __init__(self, *args, **kwargs):
         """Initialize a new BaseModel.
@@ -28,10 +37,10 @@ class BaseModel:
         self.created_at = self.updated_at = datetime.utcnow()
 
         if kwargs:
+            from models.schema import get_schema
+            kwargs = get_schema(type(self)).coerce_dict(kwargs)
             for key, value in kwargs.items():
-                if key in ["created_at", "updated_at"]:
-                    value = datetime.fromisoformat(value)
-                elif key != "__class__":
+                if key != "__class__":
                     setattr(self, key, value)
 
     def to_datetime(self, attr):
@@ -1,7 +1,12 @@
 #!/usr/bin/python3
 """Defines the DBStorage engine."""
+from datetime import datetime
 from os import getenv
-from models.base_model import Base
+from models.aggregates import Aggregates
+from models.base_model import Base, RESERVED
+from models import metrics
+from models.metrics import counted, timed
+from models.search import SearchIndex
 from models.base_model import BaseModel
 from models.amenity import Amenity
 from models.city import City
@@ -10,9 +15,16 @@ from models.review import Review
 from models.state import State
 from models.user import User
 from sqlalchemy import create_engine
+from sqlalchemy import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.event import listen
+
+classes = {
+    'User': User, 'Place': Place, 'State': State,
+    'City': City, 'Amenity': Amenity, 'Review': Review
+}
 
 
 class DBStorage:
@@ -24,18 +36,33 @@ class DBStorage:
 
     __engine = None
     __session = None
+    __batch = False
+    __stamp = None
+    __listeners = []
+    __index = None
+    __aggregates = None
 
-    def __init__(self):
-        self.__engine = create_engine("mysql+mysqldb://{}:{}@{}/{}".
-                                      format(getenv("HBNB_MYSQL_USER"),
-                                             getenv("HBNB_MYSQL_PWD"),
-                                             getenv("HBNB_MYSQL_HOST"),
-                                             getenv("HBNB_MYSQL_DB")),
-                                      pool_pre_ping=True)
+    def __connect(self):
+        """Create the engine; deferred until the database is first used.
+        HBNB_DB_URL, when set, replaces the MySQL URL, e.g. with
+        sqlite:///hbnb.db for local runs.
+        """
+        url = getenv("HBNB_DB_URL") or "mysql+mysqldb://{}:{}@{}/{}".format(
+            getenv("HBNB_MYSQL_USER"), getenv("HBNB_MYSQL_PWD"),
+            getenv("HBNB_MYSQL_HOST"), getenv("HBNB_MYSQL_DB"))
+        self.__engine = create_engine(url, pool_pre_ping=True)
 
         if getenv("HBNB_ENV") == "test":
             Base.metadata.drop_all(self.__engine)
 
+    @property
+    def __db(self):
+        """The working session, opened by reload() on first use."""
+        if self.__session is None:
+            self.reload()
+        return self.__session
+
+    @counted
     def all(self, cls=None):
         """Query on the curret database session all objects of the given class.
         If cls is None, queries all types of objects.
@@ -43,39 +70,241 @@ class DBStorage:
             Dict of queried classes in the format <class name>.<obj id> = obj.
         """
         if cls is None:
-            objs = self.__session.query(State).all()
-            objs.extend(self.__session.query(City).all())
-            objs.extend(self.__session.query(User).all())
-            objs.extend(self.__session.query(Place).all())
-            objs.extend(self.__session.query(Review).all())
-            objs.extend(self.__session.query(Amenity).all())
+            objs = self.__db.query(State).all()
+            objs.extend(self.__db.query(City).all())
+            objs.extend(self.__db.query(User).all())
+            objs.extend(self.__db.query(Place).all())
+            objs.extend(self.__db.query(Review).all())
+            objs.extend(self.__db.query(Amenity).all())
         else:
-            if isinstance(cls, str):
-                cls = eval(cls)
-            objs = self.__session.query(cls)
+            cls = self.__mapped(cls)
+            if cls is None:
+                return {}
+            objs = self.__db.query(cls)
         return {"{}.{}".format(type(o).__name__, o.id): o for o in objs}
 
+    @counted
+    def count(self, cls=None):
+        """Count the rows of cls, or of every table if cls is None."""
+        if cls is None:
+            return sum(self.count(mapped) for mapped in classes.values())
+        cls = self.__mapped(cls)
+        if cls is None:
+            return 0
+        return self.__db.query(func.count(cls.id)).scalar()
+
+    @counted
+    def get(self, cls, id):
+        """Return the object of cls with the primary key id, or None."""
+        cls = self.__mapped(cls)
+        if cls is None:
+            return None
+        return self.__db.get(cls, id)
+
+    @counted
+    def search(self, query, cls=None, limit=10):
+        """Rank the places and reviews matching the words of query with
+        an in-memory index, built from the rows on the first search and
+        kept up to date by the listeners.
+        Return:
+            Up to limit (object, score) pairs, best first, only of cls
+            when given.
+        """
+        index = DBStorage.__index
+        if index is None:
+            index = DBStorage.__index = SearchIndex()
+            self.add_listener(index.changed)
+        if index.stale:
+            index.build(list(self.all(Place).values()) +
+                        list(self.all(Review).values()))
+        name = None if cls is None else \
+            cls if isinstance(cls, str) else cls.__name__
+        hits = index.search(query, limit, name)
+        objs = {}
+        for key, _ in hits:
+            kind, _, id = key.partition(".")
+            objs[key] = self.get(kind, id)
+        return [(objs[key], score) for key, score in hits
+                if objs[key] is not None]
+
+    @counted
+    def aggregate(self, by, id=None, rebuild=False):
+        """Return the number of places of a city or state, or of reviews
+        of a place, with the sum, min, max and mean of their numbers,
+        kept in memory and up to date by the listeners.
+        Args:
+            by (str): city, state or place.
+            id (str): id of the group, or None for every group by id.
+            rebuild (bool): Whether to rebuild every group from the rows.
+        Raises:
+            KeyError: If by is not city, state or place.
+        """
+        aggregates = DBStorage.__aggregates
+        if aggregates is None:
+            aggregates = DBStorage.__aggregates = Aggregates()
+            self.add_listener(aggregates.changed)
+        if aggregates.stale or rebuild:
+            aggregates.build(list(self.all(City).values()) +
+                             list(self.all(Place).values()) +
+                             list(self.all(Review).values()))
+        if id is None:
+            return aggregates.all(by)
+        return aggregates.get(by, id)
+
+    @staticmethod
+    def __mapped(cls):
+        """Resolve cls, a class or class name, to a mapped class or None."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        return classes.get(name)
+
+    @counted
+    def update_where(self, cls, filters, values):
+        """Set values on every row of cls matching filters with a single
+        UPDATE statement, then save.
+        Return:
+            The number of rows updated.
+        Raises:
+            ValueError: If values sets an attribute kept by the model, or
+                an attribute is not a column.
+        """
+        mapped = self.__mapped(cls)
+        if mapped is None:
+            return 0
+        for attr in values:
+            if attr in RESERVED:
+                raise ValueError("can't update {}.{}".format(
+                    mapped.__name__, attr))
+        for attr in list(filters) + list(values):
+            if attr not in mapped.__table__.columns:
+                raise ValueError("unknown attribute {}.{}".format(
+                    mapped.__name__, attr))
+        values = dict(values, updated_at=datetime.utcnow())
+        rows = self.__db.query(mapped).filter_by(**filters).update(
+            values, synchronize_session="evaluate")
+        self.save()
+        if rows:
+            self.notify("reload")
+        return rows
+
+    @counted
     def new(self, obj):
         """Add obj to the current database session."""
-        self.__session.add(obj)
+        event = "update" if obj in self.__db else "new"
+        self.__db.add(obj)
+        self.notify(event, obj)
 
+    def add_listener(self, listener):
+        """Call listener(event, obj) after every change to storage.
+        Events are new and update (obj was added or saved again), delete,
+        save (obj is None) and reload (obj is None: any row may have
+        changed).
+        """
+        DBStorage.__listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop calling listener."""
+        if listener in DBStorage.__listeners:
+            DBStorage.__listeners.remove(listener)
+
+    def notify(self, event, obj=None):
+        """Call every listener with event and obj."""
+        for listener in list(DBStorage.__listeners):
+            listener(event, obj)
+
+    @counted
+    def refresh(self):
+        """End the current transaction and expire the session when rows
+        were added, deleted or updated by others since the last refresh:
+        compares the row count and the latest updated_at of each table.
+        Return:
+            True if the session was expired.
+        """
+        if self.__batch:
+            return False
+        self.__db.commit()
+        stamp = tuple(self.__db.query(func.count(cls.id),
+                                      func.max(cls.updated_at)).one()
+                      for cls in classes.values())
+        changed = self.__stamp is not None and stamp != self.__stamp
+        self.__stamp = stamp
+        if changed:
+            self.__db.expire_all()
+            self.notify("reload")
+        return changed
+
+    @counted
+    @timed
     def save(self):
-        """Commit all changes to the current database session."""
-        self.__session.commit()
+        """Commit all changes to the current database session.
+        Inside a batch the changes are only flushed until commit().
+        """
+        if self.__batch:
+            self.__db.flush()
+        else:
+            self.__db.commit()
+        self.notify("save")
+
+    @counted
+    def begin(self):
+        """Start a batch: saves are deferred to a single commit."""
+        self.__batch = True
+
+    @counted
+    def commit(self):
+        """End the batch and commit all changes made during it."""
+        self.__batch = False
+        self.__db.commit()
+        self.notify("save")
+
+    @counted
+    def rollback(self):
+        """End the batch and discard all changes made during it."""
+        self.__batch = False
+        self.__db.rollback()
+        self.notify("reload")
 
+    @counted
     def delete(self, obj=None):
         """Delete obj from the current database session."""
         if obj is not None:
-            self.__session.delete(obj)
+            self.__db.delete(obj)
+            self.notify("delete", obj)
 
+    @counted
+    @timed
     def reload(self):
         """Create all tables in the database and initialize a new session."""
+        if self.__engine is None:
+            self.__connect()
         Base.metadata.create_all(self.__engine)
         session_factory = sessionmaker(bind=self.__engine,
                                        expire_on_commit=False)
         Session = scoped_session(session_factory)
         self.__session = Session()
+        listen(self.__session, "do_orm_execute", self.__loading)
+        self.notify("reload")
+
+    @staticmethod
+    def __loading(state):
+        """Count the relationships loaded by the session, such as
+        State.cities, in the metrics.
+        """
+        if state.is_relationship_load:
+            metrics.counters["relations.{}".format(
+                state.loader_strategy_path[-1])] += 1
+
+    def object_counts(self):
+        """Return the number of rows of each class, read on a connection
+        of its own so that any thread may call it.
+        """
+        if self.__engine is None:
+            return {}
+        with self.__engine.connect() as conn:
+            return {name: conn.execute(
+                func.count().select().select_from(cls.__table__)).scalar()
+                for name, cls in classes.items()}
 
     def close(self):
         """Close the working SQLAlchemy session."""
-        self.__session.close()
+        if self.__session is not None:
+            self.__session.close()
@@ -1,15 +1,22 @@
 #!/usr/bin/python3
 """This module defines a class to manage file storage for hbnb clone"""
 import json
+import os
+from datetime import datetime
+from itertools import repeat
 
-from models.base_model import BaseModel
+from models import metrics
+from models.aggregates import Aggregates
+from models.base_model import BaseModel, RESERVED
+from models.metrics import counted, timed
+from models.search import SearchIndex
 from models.user import User
 from models.place import Place
 from models.state import State
 from models.city import City
 from models.amenity import Amenity
 from models.review import Review
-from typing import Dict
+from typing import Callable, Dict, List
 
 classes = {
     'BaseModel': BaseModel, 'User': User, 'Place': Place,
@@ -17,44 +24,375 @@ classes = {
     'Review': Review
 }
 
+# files smaller than this are always decoded in a single process
+PARALLEL_MIN_BYTES = 1 << 20
+
+
+def _class_name(cls) -> str:
+    """Returns the name of cls given either as a class or as a str"""
+    return cls if isinstance(cls, str) else cls.__name__
+
+
+def _split_lines(path: str, chunks: int) -> List[int]:
+    """Returns byte offsets splitting the objects of a file saved one per
+    line into about `chunks` line-aligned ranges, or None when the file is
+    small or not in that layout.
+    """
+    size = os.path.getsize(path)
+    if size < PARALLEL_MIN_BYTES:
+        return None
+    with open(path, 'rb') as f:
+        if f.read(2) != b"{\n":
+            return None
+        f.seek(-2, os.SEEK_END)
+        if f.read(2) != b"\n}":
+            return None
+
+        begin, end = 2, size - 1
+        bounds = [begin]
+        for i in range(1, chunks):
+            f.seek(begin + (end - begin) * i // chunks)
+            f.readline()
+            if bounds[-1] < f.tell() < end:
+                bounds.append(f.tell())
+        bounds.append(end)
+    return bounds
+
+
+def _decode_range(path: str, start: int, end: int) -> List[BaseModel]:
+    """Builds the objects saved on the lines between two byte offsets"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8').strip().rstrip(',')
+    temp = json.loads("{" + text + "}")
+    return [classes[val['__class__']](**val) for val in temp.values()]
+
+
+class _Objects(dict):
+    """Objects by key, also indexed by class as keys are set, deleted,
+    popped or cleared
+    Attributes:
+        by_class (dict): Class name to the objects of that class by key.
+    """
+
+    def __init__(self):
+        """starts empty"""
+        super().__init__()
+        self.by_class: Dict[str, Dict[str, BaseModel]] = {}
+
+    def __setitem__(self, key, obj):
+        """adds obj under key and its class"""
+        super().__setitem__(key, obj)
+        self.by_class.setdefault(key.partition(".")[0], {})[key] = obj
+
+    def __delitem__(self, key):
+        """removes the object under key and from its class"""
+        super().__delitem__(key)
+        self.by_class[key.partition(".")[0]].pop(key, None)
+
+    def pop(self, key, *default):
+        """removes and returns the object under key, or default"""
+        if key not in self:
+            return super().pop(key, *default)
+        self.by_class[key.partition(".")[0]].pop(key, None)
+        return super().pop(key)
+
+    def clear(self):
+        """removes every object"""
+        super().clear()
+        self.by_class.clear()
+
 
 class FileStorage:
     """This class manages storage of hbnb models in JSON format"""
     __file_path: str = 'file.json'
-    __objects: Dict[str, BaseModel] = {}
+    __objects: Dict[str, BaseModel] = _Objects()
+    __by_class: Dict[str, Dict[str, BaseModel]] = __objects.by_class
+    __loaded: bool = False
+    __batch: bool = False
+    __pending: bool = False
+    __unsaved: bool = False
+    __stamp: tuple = None
+    __listeners: List[Callable] = []
+    __index: SearchIndex = None
+    __aggregates: Aggregates = None
+
+    def __ensure_loaded(self):
+        """Loads the storage file the first time storage is used"""
+        if not FileStorage.__loaded:
+            self.reload()
 
+    @counted
     def all(self, cls=None):
-        """Returns a dictionary of models currently in storage"""
-        if cls and cls in classes:
-            return {k: v for k, v in FileStorage.__objects
-                    if v.__class__.__name__ == cls}
-        return FileStorage.__objects
+        """Returns a copy of the dictionary of models currently in storage"""
+        self.__ensure_loaded()
+        if cls:
+            name = _class_name(cls)
+            return dict(FileStorage.__by_class.get(name, {}))
+        return dict(FileStorage.__objects)
 
+    @counted
     def new(self, obj):
         """Adds new object to storage dictionary"""
-        self.all().update({obj.id: obj})
+        self.__ensure_loaded()
+        key = f"{obj.__class__.__name__}.{obj.id}"
+        event = "update" if key in FileStorage.__objects else "new"
+        self.__add(obj)
+        FileStorage.__unsaved = True
+        self.notify(event, obj)
+
+    def add_listener(self, listener: Callable) -> None:
+        """Calls listener(event, obj) after every change to storage.
+        Events are new and update (obj was added or saved again), delete,
+        save (obj is None) and reload (obj is None: any object may have
+        changed).
+        """
+        FileStorage.__listeners.append(listener)
+
+    def remove_listener(self, listener: Callable) -> None:
+        """Stops calling listener"""
+        if listener in FileStorage.__listeners:
+            FileStorage.__listeners.remove(listener)
 
+    def notify(self, event: str, obj: BaseModel = None) -> None:
+        """Calls every listener with event and obj"""
+        for listener in list(FileStorage.__listeners):
+            listener(event, obj)
+
+    @staticmethod
+    def __file_stamp():
+        """Returns the modification time and size of the file, or None"""
+        try:
+            stat = os.stat(FileStorage.__file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @counted
+    def refresh(self) -> bool:
+        """Reloads the objects when another process changed the file
+        since it was last read or written.
+        Returns:
+            True if the objects were reloaded.
+        """
+        self.__ensure_loaded()
+        if FileStorage.__batch or \
+                self.__file_stamp() == FileStorage.__stamp:
+            return False
+        FileStorage.__objects.clear()
+        self.reload()
+        return True
+
+    @staticmethod
+    def __add(obj):
+        """Indexes obj under its key and its class"""
+        FileStorage.__objects[f"{obj.__class__.__name__}.{obj.id}"] = obj
+
+    @counted
+    def count(self, cls=None) -> int:
+        """Returns the number of objects of cls, or of all objects"""
+        self.__ensure_loaded()
+        if cls:
+            name = _class_name(cls)
+            return len(FileStorage.__by_class.get(name, ()))
+        return len(FileStorage.__objects)
+
+    @staticmethod
+    def object_counts() -> Dict[str, int]:
+        """Returns the number of objects of each class loaded, without
+        loading the file
+        """
+        return {name: len(objs)
+                for name, objs in list(FileStorage.__by_class.items())}
+
+    @counted
+    def get(self, cls, id):
+        """Returns the object of cls with the given id, or None"""
+        self.__ensure_loaded()
+        name = _class_name(cls)
+        return FileStorage.__objects.get(f"{name}.{id}")
+
+    def __search_index(self) -> SearchIndex:
+        """Returns the search index, read from the file saved with the
+        objects when they have no unsaved change, or built from them
+        """
+        self.__ensure_loaded()
+        index = FileStorage.__index
+        if index is None:
+            index = FileStorage.__index = SearchIndex()
+            self.add_listener(index.changed)
+        if not index.stale:
+            return index
+        path = FileStorage.__file_path + ".index"
+        saved = not FileStorage.__batch and not FileStorage.__unsaved
+        if saved and index.load(path, FileStorage.__stamp):
+            metrics.counters["cache_hits.search_index"] += 1
+        else:
+            metrics.counters["cache_misses.search_index"] += 1
+            index.build(FileStorage.__objects.values())
+            if FileStorage.__stamp is not None and saved:
+                index.save(path, FileStorage.__stamp)
+        return index
+
+    @counted
+    def search(self, query: str, cls=None, limit: int = 10) -> List:
+        """Ranks the places and reviews matching the words of query.
+        Returns:
+            Up to limit (object, score) pairs, best first, only of cls
+            when given.
+        """
+        name = _class_name(cls) if cls else None
+        hits = self.__search_index().search(query, limit, name)
+        return [(FileStorage.__objects[key], score) for key, score in hits
+                if key in FileStorage.__objects]
+
+    @counted
+    def aggregate(self, by: str, id: str = None,
+                  rebuild: bool = False) -> Dict:
+        """Returns the number of places of a city or state, or of reviews
+        of a place, with the sum, min, max and mean of their numbers.
+        Args:
+            by (str): city, state or place.
+            id (str): id of the group, or None for every group by id.
+            rebuild (bool): Whether to rebuild every group first.
+        Raises:
+            KeyError: If by is not city, state or place.
+        """
+        self.__ensure_loaded()
+        aggregates = FileStorage.__aggregates
+        if aggregates is None:
+            aggregates = FileStorage.__aggregates = Aggregates()
+            self.add_listener(aggregates.changed)
+        if aggregates.stale or rebuild:
+            aggregates.build(FileStorage.__objects.values())
+        if id is None:
+            return aggregates.all(by)
+        return aggregates.get(by, id)
+
+    @counted
+    def update_where(self, cls, filters: Dict, values: Dict) -> int:
+        """Sets values on every object of cls whose attributes match
+        filters, in one pass followed by a single save.
+        Returns:
+            The number of objects updated.
+        Raises:
+            ValueError: If values sets an attribute kept by the model.
+        """
+        for attr in values:
+            if attr in RESERVED:
+                raise ValueError(f"can't update {_class_name(cls)}.{attr}")
+        self.__ensure_loaded()
+        filters = list(filters.items())
+        matched = [
+            obj for obj in FileStorage.__by_class.get(
+                _class_name(cls), {}).values()
+            if all(getattr(obj, k, None) == v for k, v in filters)
+        ]
+        now = datetime.utcnow()
+        for obj in matched:
+            for k, v in values.items():
+                setattr(obj, k, v)
+            obj.updated_at = now
+            self.notify("update", obj)
+        if matched:
+            self.save()
+        return len(matched)
+
+    @counted
+    @timed
     def save(self):
-        """Saves storage dictionary to file"""
+        """Saves storage dictionary to file, or defers it inside a batch"""
+        self.__ensure_loaded()
+        if FileStorage.__batch:
+            FileStorage.__pending = True
+            self.notify("save")
+            return
+        # one object per line keeps the file splittable for reload
         with open(FileStorage.__file_path, 'w') as f:
-            temp = {}
-            temp.update(FileStorage.__objects)
-            for key, val in temp.items():
-                temp[key] = val.to_dict()
-            json.dump(temp, f)
-
-    def reload(self):
-        """Loads storage dictionary from file"""
+            f.write("{\n")
+            f.write(",\n".join(
+                f"{json.dumps(key)}: {json.dumps(val.to_dict())}"
+                for key, val in FileStorage.__objects.items()))
+            f.write("\n}")
+            metrics.counters["bytes_written"] += f.tell()
+            metrics.observe("bytes.save", f.tell(), metrics.Histogram.BYTES)
+        FileStorage.__stamp = self.__file_stamp()
+        FileStorage.__unsaved = False
+        self.notify("save")
+        index = FileStorage.__index
+        if index is not None and not index.stale:
+            index.save(FileStorage.__file_path + ".index",
+                       FileStorage.__stamp)
+
+    @counted
+    @timed
+    def reload(self, workers: int = None):
+        """Loads storage dictionary from file.
+        Args:
+            workers (int): Processes decoding the file, defaults to
+                HBNB_RELOAD_WORKERS or 1. Only files saved one object
+                per line and larger than PARALLEL_MIN_BYTES are split.
+        """
+        FileStorage.__loaded = True
+        FileStorage.__stamp = self.__file_stamp()
+        # objects already in memory are not in the file, or differ from it
+        FileStorage.__unsaved = bool(FileStorage.__objects)
+        if workers is None:
+            workers = int(os.getenv("HBNB_RELOAD_WORKERS", "1"))
         try:
-            with open(FileStorage.__file_path, 'r') as f:
-                temp = json.load(f)
-                for key, val in temp.items():
-                    self.all()[key] = classes[val['__class__']](**val)
+            bounds = None
+            if workers > 1:
+                bounds = _split_lines(FileStorage.__file_path, workers * 4)
+            if not bounds:
+                with open(FileStorage.__file_path, 'r') as f:
+                    temp = json.load(f)
+                for val in temp.values():
+                    self.__add(classes[val['__class__']](**val))
+                return
+            # only needed for large files, kept off the startup path
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for objs in pool.map(_decode_range,
+                                     repeat(FileStorage.__file_path),
+                                     bounds[:-1], bounds[1:]):
+                    for obj in objs:
+                        self.__add(obj)
         except FileNotFoundError:
             pass
+        finally:
+            self.notify("reload")
+
+    @counted
+    def begin(self) -> None:
+        """Starts a batch: saves are deferred until commit or rollback"""
+        self.__ensure_loaded()
+        FileStorage.__batch = True
+        FileStorage.__pending = False
+
+    @counted
+    def commit(self) -> None:
+        """Ends the batch and persists the changes made during it once"""
+        FileStorage.__batch = False
+        if FileStorage.__pending:
+            FileStorage.__pending = False
+            self.save()
+
+    @counted
+    def rollback(self) -> None:
+        """Ends the batch and restores the objects last saved to file"""
+        FileStorage.__batch = False
+        FileStorage.__pending = False
+        FileStorage.__objects.clear()
+        self.reload()
 
+    @counted
     def delete(self, obj: BaseModel = None) -> None:
         """Deletes obj from Basemodel if it exists"""
         if not obj:
             return
-        del self.__objects[obj.id]
+        self.__ensure_loaded()
+        name = obj.__class__.__name__
+        key = f"{name}.{obj.id}"
+        FileStorage.__objects.pop(key, None)
+        FileStorage.__unsaved = True
+        self.notify("delete", obj)
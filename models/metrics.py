@@ -0,0 +1,286 @@
+#!/usr/bin/python3
+"""Runtime counters and latency histograms for storage and the console
+Counters, histograms and collected gauges are named <family>.<label>,
+like calls.save or seconds.reload. snapshot() reads them all in process,
+prometheus() formats them for a Prometheus text file, and Exporter
+writes that file periodically.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+from typing import Callable, Dict, List
+
+# storage calls by method name ("calls.save", ...), bytes written,
+# relationship properties read ("relations.Place.reviews", ...) and
+# cache lookups ("cache_hits.api", "cache_misses.api", ...)
+counters: Counter = Counter()
+# storage durations ("seconds.save", ...) and bytes of each save
+histograms: Dict[str, "Histogram"] = {}
+# functions returning gauges, like the number of objects of each class
+collectors: List[Callable[[], Dict[str, float]]] = []
+# Prometheus name, label and help of each family
+FAMILIES = {
+    "calls": ("hbnb_storage_calls_total", "method",
+              "Storage method calls."),
+    "bytes_written": ("hbnb_storage_written_bytes_total", None,
+                      "Bytes written by storage saves."),
+    "relations": ("hbnb_relationship_calls_total", "relation",
+                  "Relationship properties read, or loaded in db mode."),
+    "cache_hits": ("hbnb_cache_hits_total", "cache", "Cache hits."),
+    "cache_misses": ("hbnb_cache_misses_total", "cache", "Cache misses."),
+    "cache_hit_ratio": ("hbnb_cache_hit_ratio", "cache",
+                        "Share of cache lookups that hit."),
+    "objects": ("hbnb_objects", "class", "Objects in storage."),
+    "seconds": ("hbnb_storage_seconds", "method",
+                "Duration of storage methods."),
+    "bytes": ("hbnb_storage_save_bytes", "method",
+              "Bytes written by each storage save."),
+}
+
+
+class Histogram:
+    """Counts observations into exponential buckets.
+    Attributes:
+        bounds (tuple): Upper bound of each bucket, in seconds.
+        buckets (list): Observations per bucket, the last one unbounded.
+        count (int): Number of observations.
+        sum (float): Sum of all observations.
+        max (float): Largest observation.
+    """
+    BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+              0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    BYTES = tuple(1 << shift for shift in range(10, 31, 2))
+
+    def __init__(self, bounds=BOUNDS):
+        """creates an empty histogram"""
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """adds one observation"""
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        """mean of all observations"""
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Returns the upper bound of the bucket holding quantile q,
+        or the largest observation for the unbounded bucket.
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= rank and seen:
+                return min(bound, self.max)
+        return self.max
+
+
+def counted(func):
+    """Counts the calls of a storage method in counters"""
+    key = f"calls.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        counters[key] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def observe(name: str, value: float, bounds=Histogram.BOUNDS) -> None:
+    """adds value to the histogram name, created with bounds if new"""
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = Histogram(bounds)
+    histogram.observe(value)
+
+
+def timed(func):
+    """Observes the seconds of each call of a storage method"""
+    key = f"seconds.{func.__name__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe(key, time.perf_counter() - start)
+    return wrapper
+
+
+def related(func):
+    """Counts the reads of a relationship property, by its qualified
+    name (relations.State.cities)
+    """
+    key = f"relations.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        counters[key] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def collector(func: Callable[[], Dict[str, float]]):
+    """Registers func, called by snapshot() for gauges"""
+    collectors.append(func)
+    return func
+
+
+def reset() -> None:
+    """clears every counter and histogram"""
+    counters.clear()
+    histograms.clear()
+
+
+def snapshot() -> Dict:
+    """Returns the counters, the gauges of the collectors with the hit
+    ratio of every cache, and a summary of every histogram.
+    """
+    gauges = {}
+    for func in list(collectors):
+        gauges.update(func())
+    current = dict(counters)
+    for key, hits in current.items():
+        if key.startswith("cache_hits."):
+            name = key.partition(".")[2]
+            lookups = hits + current.get(f"cache_misses.{name}", 0)
+            gauges[f"cache_hit_ratio.{name}"] = hits / lookups
+    return {"counters": current, "gauges": gauges,
+            "histograms": {name: {"count": h.count, "sum": h.sum,
+                                  "max": h.max, "bounds": list(h.bounds),
+                                  "buckets": list(h.buckets)}
+                           for name, h in list(histograms.items())}}
+
+
+def _family(key: str, suffix: str = ""):
+    """returns the Prometheus name, label, label value and help of key,
+    named hbnb_<family><suffix> when its family is not in FAMILIES
+    """
+    family, _, value = key.partition(".")
+    name, label, help = FAMILIES.get(
+        family, (f"hbnb_{family}{suffix}", "name", f"{family}."))
+    return name, label, value, help
+
+
+def _sample(name: str, labels: Dict[str, str], value) -> str:
+    """returns one line of the Prometheus text format"""
+    if labels:
+        pairs = ",".join('{}="{}"'.format(
+            k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+            for k, v in labels.items())
+        name = f"{name}{{{pairs}}}"
+    return f"{name} {value}"
+
+
+def prometheus(snap: Dict = None) -> str:
+    """Returns snap, or a new snapshot, in the Prometheus text format"""
+    snap = snapshot() if snap is None else snap
+    families: Dict[str, List[str]] = {}
+
+    def add(key, kind, lines):
+        name, label, value, help = _family(
+            key, "_total" if kind == "counter" else "")
+        if name not in families:
+            families[name] = [f"# HELP {name} {help}",
+                              f"# TYPE {name} {kind}"]
+        labels = {label: value} if label and value else {}
+        families[name] += lines(name, labels)
+    for key, value in sorted(snap["counters"].items()):
+        add(key, "counter",
+            lambda name, labels: [_sample(name, labels, value)])
+    for key, value in sorted(snap["gauges"].items()):
+        add(key, "gauge",
+            lambda name, labels: [_sample(name, labels, value)])
+    for key, h in sorted(snap["histograms"].items()):
+        def lines(name, labels, h=h):
+            out, seen = [], 0
+            for bound, count in zip(h["bounds"], h["buckets"]):
+                seen += count
+                out.append(_sample(f"{name}_bucket",
+                                   dict(labels, le=repr(float(bound))),
+                                   seen))
+            out.append(_sample(f"{name}_bucket", dict(labels, le="+Inf"),
+                               h["count"]))
+            out.append(_sample(f"{name}_sum", labels, h["sum"]))
+            out.append(_sample(f"{name}_count", labels, h["count"]))
+            return out
+        add(key, "histogram", lines)
+    return "".join(line + "\n" for lines in families.values()
+                   for line in lines)
+
+
+def write_textfile(path: str) -> None:
+    """Writes the metrics to path for the node exporter textfile
+    collector, replacing it atomically so it is never read half written
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus())
+    os.replace(tmp, path)
+
+
+class Exporter:
+    """Writes the metrics to a Prometheus text file every interval
+    seconds from a daemon thread, and once more when stopped.
+    Attributes:
+        path (str): The text file, usually named *.prom in the directory
+            of the node exporter --collector.textfile.directory.
+        interval (float): Seconds between writes.
+    """
+
+    def __init__(self, path: str, interval: float = 15.0):
+        """creates a stopped exporter"""
+        self.path = path
+        self.interval = interval
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def start(self) -> "Exporter":
+        """starts writing in the background and returns self"""
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+        return self
+
+    def __run(self):
+        """writes the file until stopped"""
+        while not self.__stop.wait(self.interval):
+            write_textfile(self.path)
+
+    def stop(self) -> None:
+        """stops the thread and writes the file a last time"""
+        if self.__thread is not None:
+            self.__stop.set()
+            self.__thread.join()
+            self.__thread = None
+        write_textfile(self.path)
+
+
+def export_from_env():
+    """Starts an Exporter writing to HBNB_METRICS_TEXTFILE every
+    HBNB_METRICS_INTERVAL seconds (default 15), stopped at exit.
+    Returns:
+        The exporter, or None when HBNB_METRICS_TEXTFILE is not set.
+    """
+    path = os.getenv("HBNB_METRICS_TEXTFILE")
+    if not path:
+        return None
+    import atexit
+    exporter = Exporter(path, float(os.getenv("HBNB_METRICS_INTERVAL",
+                                              "15")))
+    atexit.register(exporter.stop)
+    return exporter.start()
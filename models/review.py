@@ -1,11 +1,13 @@
 #!/usr/bin/python3
 """Defines the Review class."""
+import models
 from models.base_model import Base
 from models.base_model import BaseModel
-from sqlalchemy import Column
-from sqlalchemy import ForeignKey
-from sqlalchemy import String
-from sqlalchemy.orm import relationship
+
+if models.storage_t == "db":
+    from sqlalchemy import Column
+    from sqlalchemy import ForeignKey
+    from sqlalchemy import String
 
 
 class Review(BaseModel, Base):
@@ -17,7 +19,13 @@ class Review(BaseModel, Base):
         place_id (sqlalchemy String): The review's place id.
         user_id (sqlalchemy String): The review's user id.
     """
-    __tablename__ = "reviews"
-    text = Column(String(1024), nullable=False)
-    place_id = Column(String(60), ForeignKey("places.id"), nullable=False)
-    user_id = Column(String(60), ForeignKey("users.id"), nullable=False)
+    if models.storage_t == "db":
+        __tablename__ = "reviews"
+        text = Column(String(1024), nullable=False)
+        place_id = Column(String(60), ForeignKey("places.id"),
+                          nullable=False)
+        user_id = Column(String(60), ForeignKey("users.id"), nullable=False)
+    else:
+        text = ""
+        place_id = ""
+        user_id = ""
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+"""Compiles per-class schemas used to coerce model attribute values
+In db mode the types come from the SQLAlchemy Column definitions, in file
+mode from the type of each class attribute default.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict
+import models
+
+_schemas: Dict[type, "Schema"] = {}
+
+
+def _to_int(value):
+    """casts value to int"""
+    return value if type(value) is int else int(value)
+
+
+def _to_float(value):
+    """casts value to float"""
+    return value if type(value) is float else float(value)
+
+
+def _to_datetime(value):
+    """casts an isoformat string to datetime"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _to_str(length=None):
+    """creates a str cast that enforces the column length"""
+    def to_str(value):
+        """casts value to str"""
+        value = value if type(value) is str else str(value)
+        if length is not None and len(value) > length:
+            raise ValueError(f"longer than {length} characters")
+        return value
+    return to_str
+
+
+def _columns(cls) -> Dict:
+    """collects the Column definitions of a model class by attribute name"""
+    from sqlalchemy import Column
+
+    table = getattr(cls, "__table__", None)
+    if table is not None:
+        return {column.key: column for column in table.columns}
+
+    columns = {}
+    for klass in reversed(cls.__mro__):
+        for name, attr in vars(klass).items():
+            if isinstance(attr, Column):
+                columns[name] = attr
+    return columns
+
+
+def _compile_column(column) -> Callable:
+    """returns the coercion function for a single column"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    return _compile_type(python_type, getattr(column.type, "length", None))
+
+
+def _compile_type(python_type: type, length: int = None) -> Callable:
+    """returns the coercion function for values of python_type"""
+    if python_type is int:
+        return _to_int
+    if python_type is float:
+        return _to_float
+    if python_type is datetime:
+        return _to_datetime
+    if python_type is str:
+        return _to_str(length)
+    return None
+
+
+def _compile(cls) -> Dict[str, Callable]:
+    """returns the coercion functions declared by cls"""
+    if models.storage_t == "db":
+        declared = {attr: _compile_column(column)
+                    for attr, column in _columns(cls).items()}
+    else:
+        declared = {"id": _to_str(), "created_at": _to_datetime,
+                    "updated_at": _to_datetime}
+        for klass in reversed(cls.__mro__):
+            for attr, default in vars(klass).items():
+                if not attr.startswith("_"):
+                    declared[attr] = _compile_type(type(default))
+    return {attr: func for attr, func in declared.items() if func}
+
+
+class Schema:
+    """Coercion functions for the attributes of one model class.
+    Attributes:
+        name (str): The name of the model class.
+        coercers (dict): Attribute name to coercion function.
+    """
+
+    def __init__(self, cls):
+        """compiles the schema of cls"""
+        self.name = cls.__name__
+        self.coercers: Dict[str, Callable] = _compile(cls)
+
+    def coerce(self, attr: str, value: Any) -> Any:
+        """Casts value to the type declared for attr.
+        Unknown attributes and None are returned unchanged.
+        Raises:
+            ValueError: If value can not be cast to the declared type.
+        """
+        func = self.coercers.get(attr)
+        if func is None or value is None:
+            return value
+        try:
+            return func(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(
+                f"invalid value for {self.name}.{attr}: {value!r} ({e})")
+
+    def coerce_dict(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns a copy of values with every declared attribute cast."""
+        return {attr: self.coerce(attr, value)
+                for attr, value in values.items()}
+
+
+def get_schema(cls) -> Schema:
+    """Returns the compiled schema of cls, compiling it on first use."""
+    schema = _schemas.get(cls)
+    if schema is None:
+        schema = _schemas[cls] = Schema(cls)
+    return schema
@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+"""Full-text search over Place names and descriptions and Review texts
+An inverted index maps each term to its postings: the documents that
+hold it and how many times. Queries are ranked with BM25. The storage
+engines build the index on the first search, keep it up to date through
+their listeners, and FileStorage saves it next to its file.
+"""
+import heapq
+import math
+import os
+import pickle
+import re
+from array import array
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple
+
+# attributes indexed, by class name
+FIELDS = {"Place": ("name", "description"), "Review": ("text",)}
+TOKEN = re.compile(r"\w+")
+# BM25 term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """returns the lowercase words of text"""
+    return TOKEN.findall(text.lower())
+
+
+def document(obj) -> str:
+    """returns the indexed text of obj, or None if its class is not
+    indexed
+    """
+    fields = FIELDS.get(type(obj).__name__)
+    if fields is None:
+        return None
+    return " ".join(str(getattr(obj, field, "") or "") for field in fields)
+
+
+class SearchIndex:
+    """An inverted index ranking documents with BM25.
+    Documents get consecutive numbers. Removing one only blanks its key,
+    and the postings are compacted once half of the numbers are blank;
+    until then, document frequencies also count blanked documents.
+    Attributes:
+        keys (list): Key of each document number, None once removed.
+        lengths (array): Number of terms of each document number.
+        numbers (dict): Document number of each key.
+        postings (dict): Document numbers and term frequencies (two
+            arrays) of each term.
+        total (int): Number of terms of the documents not removed.
+        norms (array): BM25 length normalization of each document
+            number, for the average length norm_average.
+        stale (bool): Whether the index must be rebuilt before use.
+        touched (bool): Whether a change was reported since the last
+            save.
+    """
+
+    def __init__(self):
+        """creates an empty, stale index"""
+        self.clear()
+        self.stale = True
+        self.touched = False
+
+    def clear(self):
+        """removes every document"""
+        self.keys: List[str] = []
+        self.lengths = array("I")
+        self.numbers: Dict[str, int] = {}
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.total = 0
+        self.norms = array("d")
+        self.norm_average = 0.0
+
+    def __len__(self) -> int:
+        """returns the number of documents"""
+        return len(self.numbers)
+
+    def add(self, key: str, text: str):
+        """indexes text as the document of key, replacing its previous
+        one
+        """
+        if key in self.numbers:
+            self.remove(key)
+        terms = tokenize(text)
+        number = len(self.keys)
+        self.keys.append(key)
+        self.lengths.append(len(terms))
+        self.numbers[key] = number
+        self.total += len(terms)
+        if len(self.norms) == number and self.norm_average:
+            self.norms.append(
+                K1 * (1 - B + B * len(terms) / self.norm_average))
+        for term, count in Counter(terms).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("I"))
+            posting[0].append(number)
+            posting[1].append(count)
+
+    def remove(self, key: str):
+        """removes the document of key, if any"""
+        number = self.numbers.pop(key, None)
+        if number is None:
+            return
+        self.keys[number] = None
+        self.total -= self.lengths[number]
+        if len(self.keys) > 64 and len(self.numbers) * 2 < len(self.keys):
+            self.compact()
+
+    def compact(self):
+        """renumbers the documents left, dropping the removed ones"""
+        renumber = {}
+        keys, lengths = [], array("I")
+        for number, key in enumerate(self.keys):
+            if key is not None:
+                renumber[number] = len(keys)
+                keys.append(key)
+                lengths.append(self.lengths[number])
+        postings = {}
+        for term, (numbers, counts) in self.postings.items():
+            kept = [(renumber[n], c) for n, c in zip(numbers, counts)
+                    if n in renumber]
+            if kept:
+                postings[term] = (array("I", (n for n, _ in kept)),
+                                  array("I", (c for _, c in kept)))
+        self.keys, self.lengths, self.postings = keys, lengths, postings
+        self.numbers = {key: number for number, key in enumerate(keys)}
+        self.norms = array("d")
+
+    def build(self, objs: Iterable):
+        """indexes the documents of objs, replacing the whole index"""
+        self.clear()
+        for obj in objs:
+            text = document(obj)
+            if text is not None:
+                self.add(f"{type(obj).__name__}.{obj.id}", text)
+        self.stale = self.touched = False
+
+    def changed(self, event: str, obj=None):
+        """Storage listener keeping the index up to date. A save with no
+        change reported since the previous one may follow attributes set
+        in place, so it makes the index stale, like reload.
+        """
+        if self.stale:
+            return
+        if obj is not None:
+            self.touched = True
+            if type(obj).__name__ not in FIELDS:
+                return
+            key = f"{type(obj).__name__}.{obj.id}"
+            if event == "delete":
+                self.remove(key)
+            else:
+                self.add(key, document(obj))
+        elif event == "save" and self.touched:
+            self.touched = False
+        else:
+            self.stale = True
+
+    def __norms(self, average: float) -> array:
+        """returns the length normalization of every document, computed
+        again when the average length moved by more than 5%
+        """
+        if len(self.norms) != len(self.keys) or \
+                abs(average - self.norm_average) > 0.05 * average:
+            self.norm_average = average
+            self.norms = array("d", (K1 * (1 - B + B * length / average)
+                                     for length in self.lengths))
+        return self.norms
+
+    def search(self, query: str, limit: int = 10,
+               cls: str = None) -> List[Tuple[str, float]]:
+        """Returns the keys and BM25 scores of the limit documents that
+        match query best, only of class cls when given
+        """
+        docs = len(self.numbers)
+        if not docs:
+            return []
+        norms = self.__norms(self.total / docs)
+        postings = sorted((self.postings[term] for term in
+                           set(tokenize(query)) if term in self.postings),
+                          key=lambda posting: -len(posting[0]))
+        scores = {}
+        for numbers, counts in postings:
+            frequency = len(numbers)
+            weight = (K1 + 1) * math.log(
+                1 + (docs - frequency + 0.5) / (frequency + 0.5))
+            if not scores:
+                scores = {n: weight * c / (c + norms[n])
+                          for n, c in zip(numbers, counts)}
+                continue
+            get = scores.get
+            for n, c in zip(numbers, counts):
+                scores[n] = get(n, 0.0) + weight * c / (c + norms[n])
+        # removed documents and other classes are skipped among the best
+        # scores, looking further down when too many of them are skipped
+        keys = self.keys
+        prefix = None if cls is None else cls + "."
+        wanted = limit
+        while True:
+            best = heapq.nlargest(wanted, scores.items(), key=itemgetter(1))
+            hits = [(keys[n], score) for n, score in best
+                    if keys[n] is not None and
+                    (prefix is None or keys[n].startswith(prefix))]
+            if len(hits) >= limit or len(best) < wanted:
+                return hits[:limit]
+            wanted *= 4
+
+    def save(self, path: str, stamp):
+        """Writes the index to path, tagged with stamp, the version of the
+        data it indexes
+        """
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((VERSION, stamp), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump((self.keys, self.lengths, self.postings, self.total),
+                        f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load(self, path: str, stamp) -> bool:
+        """Reads the index saved at path if it was tagged with stamp.
+        Returns:
+            True if the index was read.
+        """
+        try:
+            with open(path, "rb") as f:
+                if pickle.load(f) != (VERSION, stamp):
+                    return False
+                self.keys, self.lengths, self.postings, self.total = \
+                    pickle.load(f)
+            self.norms = array("d")
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return False
+        self.numbers = {key: number for number, key in enumerate(self.keys)
+                        if key is not None}
+        self.stale = self.touched = False
+        return True
@@ -4,11 +4,13 @@
 from models.base_model import BaseModel
 from models.base_model import Base
 import models
-from os import getenv
+from models.metrics import related
 from models.city import City
-from sqlalchemy import Column
-from sqlalchemy import String
-from sqlalchemy.orm import relationship
+
+if models.storage_t == "db":
+    from sqlalchemy import Column
+    from sqlalchemy import String
+    from sqlalchemy.orm import relationship
 
 
 class State(BaseModel, Base):
@@ -19,12 +21,15 @@ class State(BaseModel, Base):
         name (sqlalchemy String): The name of the State.
         cities (sqlalchemy relationship): The State-City relationship.
     """
-    __tablename__ = "states"
-    name = Column(String(128), nullable=False)
-    cities = relationship("City", backref="state", cascade="delete")
+    if models.storage_t == "db":
+        __tablename__ = "states"
+        name = Column(String(128), nullable=False)
+        cities = relationship("City", backref="state", cascade="delete")
+    else:
+        name = ""
 
-    if getenv("HBNB_TYPE_STORAGE") != "db":
         @property
+        @related
         def cities(self):
             """Get a list of all related City objects."""
             return [
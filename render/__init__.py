@@ -0,0 +1,2 @@
+#!/usr/bin/python3
+"""Server-side rendering of the web_static pages from storage"""
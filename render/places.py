@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+"""Renders web_static/103-index.html from the objects in storage
+
+The page is put together from fragments: the state and city filter, the
+amenity filter, and one card per place. Each fragment is cached with a
+stamp made of the id and updated_at of every object it shows, so a
+render only rebuilds the fragments whose objects changed.
+
+Usage: python3 -m render.places [output file]
+"""
+import sys
+from collections import defaultdict
+from html import escape
+from typing import Callable, Dict, List, Tuple
+
+import models
+from models import metrics
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+  <head>
+    <title>AirBnB clone</title>
+
+    <link rel="shortcut icon" href="images/icon.ico" >
+
+    <link rel="stylesheet" href="styles/4-common.css"/>
+    <link rel="stylesheet" href="styles/3-header.css"/>
+    <link rel="stylesheet" href="styles/3-footer.css"/>
+    <link rel="stylesheet" href="styles/6-filters.css"/>
+    <link rel="stylesheet" href="styles/100-places.css"/>
+  </head>
+  <body>
+    <header>
+      <div id="header_logo"></div>
+    </header>
+    <div class="container">
+      <section class="filters">
+        <button>Search</button>
+{locations}{amenities}      </section>
+      <section class="places">
+        <h1>Places</h1>
+{places}      </section>
+    </div>
+    <footer>
+      <p>Holberton School</p>
+    </footer>
+  </body>
+</html>
+"""
+
+LOCATIONS = """        <div class="locations">
+          <h3>States</h3>
+          <h4>{summary}</h4>
+          <ul class="popover">
+{states}          </ul>
+        </div>
+"""
+
+STATE = """            <li><h2>{name}</h2>
+              <ul>
+{cities}              </ul></li>
+"""
+
+AMENITIES = """        <div class="filter_amenities">
+          <h3>Amenities</h3>
+          <h4>{summary}</h4>
+          <ul class="popover">
+{amenities}          </ul>
+        </div>
+"""
+
+CARD = """        <article>
+          <div class="headline">
+            <h2 class="article_title">{name}</h2>
+            <div class="price_by_night">${price_by_night}</div>
+          </div>
+          <div class="information">
+            <div class="max_guest">
+              <div class="guest_icon"></div>
+              <p>{max_guest}</p>
+            </div>
+            <div class="number_rooms">
+              <div class="bed_icon"></div>
+              <p>{number_rooms}</p>
+            </div>
+            <div class="number_bathrooms">
+              <div class="bath_icon"></div>
+              <p>{number_bathrooms}</p>
+            </div>
+          </div>
+          <div class="user"><b>Owner</b>: {owner}</div>
+          <div class="description">
+            {description}
+          </div>
+          <div class="amenities">
+            <h2 class="article_subtitle">Amenities</h2>
+            <ul>
+{amenities}            </ul>
+          </div>
+          <div class="reviews">
+            <h2 class="article_subtitle">Reviews</h2>
+            <ul>
+{reviews}            </ul>
+          </div>
+        </article>
+"""
+
+REVIEW = """              <li>
+                <div class="review_item">
+                  <h3>From {author} the {date}</h3>
+                  <p class="review_text">{text}</p>
+                </div>
+              </li>
+"""
+
+# icon of the amenities styled by 100-places.css, by lowercase name
+ICONS = {"tv": "tv_icon", "wifi": "wifi_icon", "pet friendly": "pet_icon"}
+
+
+def version(obj) -> Tuple:
+    """returns the stamp of one object: its id and updated_at"""
+    return (obj.id, obj.updated_at) if obj is not None else None
+
+
+def _by_name(objs) -> List:
+    """returns objs sorted by name"""
+    return sorted(objs, key=lambda obj: (obj.name or "", obj.id))
+
+
+def _count(number: int, noun: str) -> str:
+    """returns '1 Guest', '2 Guests'..."""
+    return f"{number} {noun}{'' if number == 1 else 's'}"
+
+
+def _summary(objs: List) -> str:
+    """returns the names of the first two objs, like 'Arizona, Utah...'"""
+    names = ", ".join(escape(obj.name) for obj in objs[:2])
+    return names + ("..." if len(objs) > 2 else "")
+
+
+def _date(when) -> str:
+    """returns when like '27th January 2017'"""
+    day = when.day
+    suffix = "th" if 10 <= day % 100 <= 20 else \
+        {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    return f"{day}{suffix} {when:%B %Y}"
+
+
+def _full_name(user) -> str:
+    """returns the escaped first and last name of user"""
+    if user is None:
+        return ""
+    return escape(f"{user.first_name or ''} {user.last_name or ''}".strip())
+
+
+def render_locations(states: List, cities: Dict[str, List]) -> str:
+    """returns the state and city filter"""
+    return LOCATIONS.format(summary=_summary(states), states="".join(
+        STATE.format(name=escape(state.name), cities="".join(
+            f"                <li><h4>{escape(city.name)}</h4></li>\n"
+            for city in cities.get(state.id, ())))
+        for state in states))
+
+
+def render_amenities(amenities: List) -> str:
+    """returns the amenity filter"""
+    return AMENITIES.format(summary=_summary(amenities), amenities="".join(
+        f"            <li><h4>{escape(amenity.name)}</h4></li>\n"
+        for amenity in amenities))
+
+
+def render_card(place, owner, amenities: List, reviews: List) -> str:
+    """returns the card of one place"""
+    items = []
+    for amenity in amenities:
+        icon = ICONS.get((amenity.name or "").lower())
+        icon = f'<div class="{icon}"></div>' if icon else ""
+        items.append(f"              <li>{icon}{escape(amenity.name)}</li>\n")
+    return CARD.format(
+        name=escape(place.name or ""),
+        price_by_night=place.price_by_night or 0,
+        max_guest=_count(place.max_guest or 0, "Guest"),
+        number_rooms=_count(place.number_rooms or 0, "Bedroom"),
+        number_bathrooms=_count(place.number_bathrooms or 0, "Bathroom"),
+        owner=_full_name(owner),
+        description=escape(place.description or ""),
+        amenities="".join(items),
+        reviews="".join(
+            REVIEW.format(author=_full_name(author),
+                          date=_date(review.created_at),
+                          text=escape(review.text or ""))
+            for review, author in reviews))
+
+
+class PlacesPage:
+    """Renders the places page, caching its fragments.
+    Attributes:
+        fragments (dict): Stamp and HTML of each fragment, by key.
+        hits (int): Fragments reused by renders.
+        misses (int): Fragments rendered.
+    """
+
+    def __init__(self):
+        """creates a renderer with an empty cache"""
+        self.fragments: Dict[Tuple, Tuple] = {}
+        self.hits = self.misses = 0
+
+    def fragment(self, key: Tuple, stamp: Tuple, build: Callable,
+                 *args) -> str:
+        """returns the cached fragment of key if its stamp is still
+        stamp, or builds it with build(*args)
+        """
+        cached = self.fragments.get(key)
+        if cached is not None and cached[0] == stamp:
+            self.hits += 1
+            metrics.counters["cache_hits.render"] += 1
+            return cached[1]
+        self.misses += 1
+        metrics.counters["cache_misses.render"] += 1
+        html = build(*args)
+        self.fragments[key] = (stamp, html)
+        return html
+
+    def render(self) -> str:
+        """returns the page built from the objects in storage"""
+        states = _by_name(storage.all(State).values())
+        cities = defaultdict(list)
+        for city in _by_name(storage.all(City).values()):
+            cities[city.state_id].append(city)
+        amenities = storage.all(Amenity)
+        users = storage.all(User)
+        reviews = defaultdict(list)
+        for review in storage.all(Review).values():
+            reviews[review.place_id].append(review)
+
+        locations = self.fragment(
+            ("locations",),
+            tuple((version(state), tuple(map(version, cities[state.id])))
+                  for state in states),
+            render_locations, states, cities)
+        listed = _by_name(amenities.values())
+        amenity_filter = self.fragment(
+            ("amenities",), tuple(map(version, listed)),
+            render_amenities, listed)
+
+        cards = []
+        for place in _by_name(storage.all(Place).values()):
+            owner = users.get(f"User.{place.user_id}")
+            if models.storage_t == "db":
+                linked = _by_name(place.amenities)
+            else:
+                linked = _by_name(amenities[f"Amenity.{i}"]
+                                  for i in place.amenity_ids
+                                  if f"Amenity.{i}" in amenities)
+            written = [(review, users.get(f"User.{review.user_id}"))
+                       for review in sorted(reviews[place.id],
+                                            key=lambda r: r.created_at)]
+            stamp = (version(place), version(owner),
+                     tuple(map(version, linked)),
+                     tuple((version(review), version(author))
+                           for review, author in written))
+            cards.append(self.fragment(("place", place.id), stamp,
+                                       render_card, place, owner, linked,
+                                       written))
+        # forget the cards of deleted places
+        if len(self.fragments) > len(cards) + 2:
+            live = {("locations",), ("amenities",)} | {
+                ("place", place.id) for place in storage.all(Place).values()}
+            self.fragments = {key: value for key, value in
+                              self.fragments.items() if key in live}
+        return PAGE.format(locations=locations, amenities=amenity_filter,
+                           places="".join(cards))
+
+
+def main(argv: List[str] = None) -> int:
+    """writes the page to the file given, or to stdout"""
+    argv = sys.argv[1:] if argv is None else argv
+    page = PlacesPage().render()
+    if argv:
+        with open(argv[0], "w") as f:
+            f.write(page)
+    else:
+        sys.stdout.write(page)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""Compares reading the aggregates of a city and a state with scanning
+every place, and measures building them and keeping them up to date.
+
+Usage: python3 -m tests.benchmarks.bench_aggregates [places]
+Places are spread over 50 states of 10 cities each, in memory only.
+"""
+import random
+import statistics
+import sys
+import time
+
+from models.aggregates import Aggregates
+from models.city import City
+from models.place import Place
+
+
+def median_us(func, runs=5):
+    """returns the median microseconds of runs calls of func"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def scan(places, city_ids):
+    """returns the count and mean price of the places in city_ids"""
+    prices = [p.price_by_night for p in places if p.city_id in city_ids]
+    return len(prices), sum(prices) / len(prices) if prices else None
+
+
+def main(places=100000, states=50, cities=10):
+    """prints build, read and update timings"""
+    rand = random.Random(0)
+    towns = [City(name=f"city {i}.{j}", state_id=f"state{i}")
+             for i in range(states) for j in range(cities)]
+    made = [Place(city_id=rand.choice(towns).id,
+                  price_by_night=rand.randrange(20, 500),
+                  number_rooms=rand.randrange(1, 6))
+            for _ in range(places)]
+    aggregates = Aggregates()
+    start = time.perf_counter()
+    aggregates.build(towns + made)
+    built = time.perf_counter() - start
+    print(f"{places} places, built in {built:.2f}s")
+
+    city = towns[0]
+    state = {t.id for t in towns if t.state_id == city.state_id}
+    print(f"{'read':<8}{'aggregate us':>14}{'scan us':>12}")
+    for name, by, group_id, ids in [("city", "city", city.id, {city.id}),
+                                    ("state", "state", city.state_id,
+                                     state)]:
+        read = median_us(lambda: aggregates.get(by, group_id))
+        scanned = median_us(lambda: scan(made, ids), runs=3)
+        print(f"{name:<8}{read:>14.1f}{scanned:>12.0f}")
+
+    start = time.perf_counter()
+    for place in made[:10000]:
+        place.price_by_night += 1
+        aggregates.changed("update", place)
+    updated = (time.perf_counter() - start) / 10000
+    start = time.perf_counter()
+    for place in made[:10000]:
+        aggregates.changed("delete", place)
+    removed = (time.perf_counter() - start) / 10000
+    print(f"update {updated * 1e6:.1f} us/place, "
+          f"delete {removed * 1e6:.1f} us/place")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
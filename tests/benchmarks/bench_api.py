@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""Load-tests the JSON API: requests per second with the response cache
+off, on, and with conditional requests answered 304.
+
+Usage: python3 -m tests.benchmarks.bench_api [states] [seconds]
+The storage file is written to a temporary directory.
+"""
+import http.client
+import os
+import random
+import sys
+import tempfile
+
+from api.app import Api, ApiServer
+from models import storage
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.state import State
+from tests.benchmarks.load import load
+
+
+def fill(path, states, cities=20):
+    """saves states states of cities cities each to path"""
+    FileStorage._FileStorage__file_path = path
+    storage._FileStorage__objects.clear()
+    ids = []
+    for i in range(states):
+        state = State(name=f"state {i}")
+        storage.new(state)
+        ids.append(state.id)
+        for j in range(cities):
+            storage.new(City(name=f"city {i}.{j}", state_id=state.id))
+    storage.save()
+    return ids
+
+
+def etags(port, paths):
+    """returns an If-None-Match header holding the ETags of paths"""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    tags = []
+    for path in paths:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        tags.append(response.getheader("ETag"))
+    conn.close()
+    return {"If-None-Match": ", ".join(tags)}
+
+
+def main(states=200, seconds=3.0):
+    """prints requests per second and bytes per request of each mode"""
+    with tempfile.TemporaryDirectory() as tmp:
+        ids = fill(os.path.join(tmp, "file.json"), states)
+        sample = random.Random(0).sample(ids, min(20, len(ids)))
+        paths = ["/api/v1/states"] + \
+            [f"/api/v1/states/{i}" for i in sample] + \
+            [f"/api/v1/states/{i}/cities" for i in sample]
+        print(f"{states} states, {storage.count()} objects, "
+              f"{len(paths)} paths, {seconds:g}s per mode")
+        print(f"{'mode':<12}{'req/s':>9}{'bytes/req':>11}{'errors':>8}")
+        for mode in ("uncached", "cached", "304"):
+            server = ApiServer(api=Api(cache=mode != "uncached")).start()
+            try:
+                headers = etags(server.port, paths) if mode == "304" \
+                    else None
+                result = load("127.0.0.1", server.port, paths, seconds,
+                              concurrency=4, headers=headers)
+            finally:
+                server.stop()
+            print(f"{mode:<12}{result['rps']:>9.0f}"
+                  f"{result['bytes'] / max(1, result['requests']):>11.0f}"
+                  f"{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    main(int(args[0]) if args else 200,
+         float(args[1]) if len(args) > 1 else 3.0)
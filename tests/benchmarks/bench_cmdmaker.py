@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""Measures Cmdmaker parse throughput on `create` lines with many
+key=value pairs, for the interpreted rule walk, the compiled grammar and
+the compiled grammar behind the parse plan cache.
+
+Usage: python3 -m tests.benchmarks.bench_cmdmaker [pairs] [lines]
+"""
+import sys
+import time
+
+from cmdmaker import Rule
+from console import maker
+
+
+def create_line(pairs):
+    """returns a create argument string with `pairs` key=value pairs"""
+    values = ['"some_text"', "42", "-3.25"]
+    return "Place " + " ".join(
+        f"attr_{i}={values[i % 3]}" for i in range(pairs))
+
+
+def interpreted(line):
+    """parses line by scanning it and walking the rule tree"""
+    return Rule.match_func_tokens(maker.scan_str(line),
+                                  maker.funcs["create"].args)
+
+
+def compiled(line):
+    """parses line with the compiled grammar"""
+    if "create" not in maker.parsers:
+        maker.parsers["create"] = maker.compile("create")
+    return maker.parsers["create"].parse(line)
+
+
+def cached(line):
+    """parses line through the parse plan cache"""
+    return maker.parse("create", line)
+
+
+def throughput(parse, line, lines):
+    """returns lines parsed per second"""
+    start = time.perf_counter()
+    for _ in range(lines):
+        parse(line)
+    return lines / (time.perf_counter() - start)
+
+
+def main(pairs=(10, 100, 500), lines=1000):
+    """prints lines/sec of each parser for each line size"""
+    print(f"{'pairs':>6}  {'interpreted/s':>14}  {'compiled/s':>11}  "
+          f"{'cached/s':>9}  {'speedup':>7}")
+    for n in pairs:
+        line = create_line(n)
+        assert interpreted(line) == compiled(line) == cached(line)
+        slow = throughput(interpreted, line, lines)
+        fast = throughput(compiled, line, lines)
+        maker.cache_clear()
+        hot = throughput(cached, line, lines)
+        print(f"{n:>6}  {slow:>14.0f}  {fast:>11.0f}  {hot:>9.0f}  "
+              f"{hot / slow:>7.2f}")
+    print(maker.cache_info())
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main((args[0],) if args else (10, 100, 500), *args[1:])
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+"""Compares full and delta deploys of a synthetic tree to local hosts:
+bytes sent and seconds per deploy after changing a share of the files.
+
+Usage: python3 -m tests.benchmarks.bench_deploy [files] [changed %]
+"""
+import os
+import sys
+import tempfile
+
+from deploy.pack import pack
+from deploy.remote import LocalHost, deploy_delta, deploy_host
+
+
+def make_tree(root, files, size=4096):
+    """writes files random files of size bytes under root"""
+    for i in range(files):
+        path = os.path.join(root, f"dir{i % 16}", f"file{i}.bin")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+
+
+def change(root, files, percent):
+    """rewrites percent of the files under root"""
+    for i in range(0, files, max(1, round(100 / percent))):
+        with open(os.path.join(root, f"dir{i % 16}", f"file{i}.bin"),
+                  "wb") as f:
+            f.write(os.urandom(4096))
+
+
+def main(files=2000, percent=1.0):
+    """prints bytes sent and time of a full and a delta redeploy"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "web_static")
+        versions = os.path.join(tmp, "versions")
+        make_tree(root, files)
+        first = pack(root, versions)
+        full_host = LocalHost(os.path.join(tmp, "full"))
+        delta_host = LocalHost(os.path.join(tmp, "delta"))
+        for host in (full_host, delta_host):
+            assert deploy_host(first, host).ok
+
+        change(root, files, percent)
+        second = pack(root, versions)
+        full = deploy_host(second, full_host)
+        delta = deploy_delta(second, delta_host)
+        assert full.ok and delta.ok, (full.error, delta.error)
+
+    print(f"{files} files, {percent:g}% changed")
+    print(f"{'mode':<6}{'sent bytes':>12}{'seconds':>10}")
+    for mode, result in (("full", full), ("delta", delta)):
+        print(f"{mode:<6}{result.sent:>12}{result.seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    main(int(args[0]) if args else 2000,
+         float(args[1]) if len(args) > 1 else 1.0)
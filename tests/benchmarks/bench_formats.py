@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""Compares the archive formats of do_pack on a synthetic tree: pack
+time, archive size (the bytes a deploy transfers) and unpack time of the
+release script on a local host.
+
+Usage: python3 -m tests.benchmarks.bench_formats [files]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from deploy.pack import FORMATS, pack, zstd_available
+from deploy.remote import LocalHost, deploy_host
+
+WORDS = ["place", "city", "state", "amenity", "review", "wifi", "margin",
+         "color", "border", "div", "class", "<li>", "</li>", "{", "}"]
+
+
+def make_tree(root, files, size=16384):
+    """writes files text files of about size bytes under root"""
+    rand = random.Random(0)
+    for i in range(files):
+        path = os.path.join(root, f"dir{i % 16}", f"page{i}.html")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(" ".join(rand.choice(WORDS) for _ in range(size // 6)))
+
+
+def main(files=500):
+    """prints pack seconds, archive bytes and unpack seconds per format"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "web_static")
+        make_tree(root, files)
+        print(f"{files} files")
+        print(f"{'format':<8}{'pack s':>9}{'bytes':>12}{'unpack s':>10}")
+        for fmt in FORMATS:
+            if fmt == "zst" and not zstd_available():
+                print(f"{fmt:<8}{'unavailable':>31}")
+                continue
+            versions = os.path.join(tmp, f"versions_{fmt}")
+            start = time.perf_counter()
+            archive = pack(root, versions, fmt)
+            packed = time.perf_counter() - start
+            result = deploy_host(archive, LocalHost(os.path.join(tmp, fmt)))
+            assert result.ok, result.error
+            print(f"{fmt:<8}{packed:>9.3f}{os.path.getsize(archive):>12}"
+                  f"{result.seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""Load-tests /hbnb_static under the original nginx server block and
+the generated one (deploy/nginx.py), serving the built web_static.
+
+Usage: python3 -m tests.benchmarks.bench_nginx [seconds] [concurrency]
+Needs an nginx binary on PATH; prints a notice and exits without it.
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from deploy.assets import build
+from deploy.nginx import nginx_conf, server_block
+from tests.benchmarks.load import load
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def legacy_block(port, root, www):
+    """returns the server block 0-setup_web_static.sh used to write"""
+    return f"""server {{
+    listen {port} default_server;
+    add_header X-Served-By bench;
+    root   {www};
+    index  index.html index.htm;
+
+    location /hbnb_static {{
+        alias {root};
+        index index.html index.htm;
+    }}
+}}
+"""
+
+
+def page_paths(tree, page="100-index.html"):
+    """returns the page and every asset it links, as /hbnb_static urls"""
+    with open(os.path.join(tree, page)) as f:
+        html = f.read()
+    refs = re.findall(r'href="([^"]+)"', html)
+    return [f"/hbnb_static/{page}"] + [f"/hbnb_static/{ref}" for ref in refs]
+
+
+def start(config, prefix):
+    """starts nginx with config under prefix and waits for its pid"""
+    path = os.path.join(prefix, "nginx.conf")
+    with open(path, "w") as f:
+        f.write(config)
+    proc = subprocess.Popen(["nginx", "-p", prefix, "-c", path,
+                             "-g", "daemon off;"])
+    time.sleep(0.5)
+    return proc
+
+
+def run(name, server, prefix, paths, port, seconds, concurrency):
+    """serves server and prints its requests/sec and bytes per request"""
+    os.makedirs(prefix)
+    proc = start(nginx_conf(server, prefix), prefix)
+    try:
+        result = load("127.0.0.1", port, paths, seconds, concurrency,
+                      {"Accept-Encoding": "gzip"})
+    finally:
+        proc.terminate()
+        proc.wait()
+    per = result["bytes"] / max(1, result["requests"])
+    print(f"{name:<10}{result['rps']:>12.0f}{per:>14.0f}"
+          f"{result['errors']:>8}")
+
+
+def main(seconds=5.0, concurrency=8):
+    """prints requests/sec of the original and generated configs"""
+    if shutil.which("nginx") is None:
+        print("nginx is not installed, nothing to measure")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_tree = os.path.join(ROOT, "web_static")
+        tuned_tree = os.path.join(tmp, "build", "web_static")
+        build(legacy_tree, tuned_tree)
+        www = os.path.join(tmp, "www")
+        os.makedirs(www)
+        port = 18080
+        print(f"{'config':<10}{'requests/s':>12}{'bytes/request':>14}"
+              f"{'errors':>8}")
+        run("original", legacy_block(port, legacy_tree, www),
+            os.path.join(tmp, "legacy"), page_paths(legacy_tree), port,
+            seconds, concurrency)
+        run("generated", server_block(port, "bench", tuned_tree, www=www),
+            os.path.join(tmp, "tuned"), page_paths(tuned_tree), port,
+            seconds, concurrency)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    main(float(args[0]) if args else 5.0,
+         int(args[1]) if len(args) > 1 else 8)
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""Measures FileStorage.reload() with 1 to N decoding processes.
+
+Usage: python3 -m tests.benchmarks.bench_reload [objects] [max_workers]
+The storage file is written to a temporary directory.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def write_store(path, objects):
+    """saves `objects` places to path and returns its size in bytes"""
+    FileStorage._FileStorage__file_path = path
+    storage._FileStorage__objects.clear()
+    for i in range(objects):
+        storage.new(Place(city_id="city", user_id="user",
+                          name=f"place {i}", description="x" * 200,
+                          number_rooms=i % 7, price_by_night=i % 300,
+                          latitude=1.5, longitude=2.5))
+    storage.save()
+    return os.path.getsize(path)
+
+
+def time_reload(workers):
+    """returns the seconds taken by one reload with `workers` processes"""
+    storage._FileStorage__objects.clear()
+    start = time.perf_counter()
+    storage.reload(workers=workers)
+    return time.perf_counter() - start
+
+
+def main(objects=200000, max_workers=os.cpu_count()):
+    """prints reload time and speedup for each worker count"""
+    with tempfile.TemporaryDirectory() as tmp:
+        size = write_store(os.path.join(tmp, "file.json"), objects)
+        print(f"{objects} objects, {size / 2**20:.1f} MiB, "
+              f"{os.cpu_count()} cpus")
+        print(f"{'workers':>7}  {'seconds':>8}  {'speedup':>7}")
+        workers, base = 1, None
+        while workers <= max_workers:
+            seconds = time_reload(workers)
+            base = base or seconds
+            print(f"{workers:>7}  {seconds:>8.3f}  {base / seconds:>7.2f}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
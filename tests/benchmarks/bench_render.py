@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""Compares full and incremental renders of the places page: a render
+with an empty fragment cache, then renders after no change, after
+changing one place, and after renaming one amenity.
+
+Usage: python3 -m tests.benchmarks.bench_render [places]
+The storage file is written to a temporary directory.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+from render.places import PlacesPage
+
+
+def fill(places, states=50, cities=10, amenities=20, users=1000):
+    """adds places places with their states, cities, amenities, owners
+    and one review each to storage
+    """
+    rand = random.Random(0)
+    storage._FileStorage__objects.clear()
+    linked = [Amenity(name=f"amenity {i}") for i in range(amenities)]
+    people = [User(email=f"u{i}@hbnb.io", first_name=f"First{i}",
+                   last_name=f"Last{i}") for i in range(users)]
+    towns = []
+    for i in range(states):
+        state = State(name=f"state {i}")
+        storage.new(state)
+        for j in range(cities):
+            towns.append(City(name=f"city {i}.{j}", state_id=state.id))
+    for obj in linked + people + towns:
+        storage.new(obj)
+    made = []
+    for i in range(places):
+        place = Place(city_id=rand.choice(towns).id,
+                      user_id=rand.choice(people).id, name=f"place {i}",
+                      description="A quiet place. " * 10,
+                      number_rooms=i % 5, number_bathrooms=i % 3,
+                      max_guest=i % 8, price_by_night=i % 300)
+        place.amenity_ids = [a.id for a in rand.sample(linked, 3)]
+        storage.new(place)
+        storage.new(Review(place_id=place.id,
+                           user_id=rand.choice(people).id,
+                           text="Great stay, would come back."))
+        made.append(place)
+    return made, linked
+
+
+def timed(page):
+    """returns the seconds and fragments rendered of one render"""
+    misses = page.misses
+    start = time.perf_counter()
+    page.render()
+    return time.perf_counter() - start, page.misses - misses
+
+
+def main(places=10000):
+    """prints seconds and fragments rendered per render"""
+    with tempfile.TemporaryDirectory() as tmp:
+        FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+        made, linked = fill(places)
+        page = PlacesPage()
+        print(f"{places} places, {storage.count()} objects")
+        print(f"{'render':<18}{'seconds':>9}{'fragments':>11}")
+        runs = [("full", lambda: None), ("unchanged", lambda: None)]
+
+        def edit_place():
+            made[0].name = "renamed place"
+            made[0].save()
+
+        def rename_amenity():
+            linked[0].name = "renamed amenity"
+            linked[0].save()
+        runs += [("one place", edit_place),
+                 ("one amenity", rename_amenity)]
+        for name, change in runs:
+            change()
+            seconds, rendered = timed(page)
+            print(f"{name:<18}{seconds:>9.3f}{rendered:>11}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""Measures the search index on synthetic reviews: build time, query
+latency against a substring scan of every text, incremental updates,
+and saving and loading the index.
+
+Usage: python3 -m tests.benchmarks.bench_search [reviews]
+Texts draw words from a Zipf-like vocabulary, so query terms range from
+rare to very common.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from models.search import SearchIndex
+
+WORDS = 5000
+LENGTH = 12
+
+
+def texts(count, seed=0):
+    """returns count review texts and the vocabulary, most common first"""
+    rand = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(WORDS)]
+    weights = [1 / (i + 1) for i in range(WORDS)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return [" ".join(rand.choices(vocabulary, cum_weights=cumulative,
+                                  k=LENGTH)) for _ in range(count)], \
+        vocabulary
+
+
+def median_ms(func, runs=5):
+    """returns the median milliseconds of runs calls of func"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+def main(reviews=1000000):
+    """prints build, query, update and persistence timings"""
+    docs, vocabulary = texts(reviews)
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i, text in enumerate(docs):
+        index.add(f"Review.{i}", text)
+    index.stale = False
+    built = time.perf_counter() - start
+    print(f"{reviews} reviews, {len(index.postings)} terms, "
+          f"built in {built:.2f}s")
+
+    queries = {"rare": vocabulary[-1], "medium": vocabulary[200],
+               "common": vocabulary[0],
+               "3 terms": " ".join(vocabulary[i] for i in (50, 500, 4000))}
+    print(f"{'query':<10}{'matches':>10}{'index ms':>10}{'scan ms':>10}")
+    for name, query in queries.items():
+        words = [f" {word} " for word in query.split()]
+        matches = sum(1 for text in docs
+                      if any(w in f" {text} " for w in words))
+        indexed = median_ms(lambda: index.search(query))
+        scanned = median_ms(lambda: [text for text in docs
+                                     if any(w in f" {text} " for w in words)],
+                            runs=1)
+        print(f"{name:<10}{matches:>10}{indexed:>10.2f}{scanned:>10.1f}")
+
+    extra, _ = texts(1000, seed=1)
+    start = time.perf_counter()
+    for i, text in enumerate(extra):
+        index.add(f"Review.{i}", text)
+    updated = (time.perf_counter() - start) / len(extra)
+    start = time.perf_counter()
+    for i in range(len(extra)):
+        index.remove(f"Review.{i}")
+    removed = (time.perf_counter() - start) / len(extra)
+    print(f"update {updated * 1e6:.1f} us/review, "
+          f"remove {removed * 1e6:.1f} us/review")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json.index")
+        start = time.perf_counter()
+        index.save(path, (0, 0))
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        assert SearchIndex().load(path, (0, 0))
+        loaded = time.perf_counter() - start
+        print(f"save {saved:.2f}s, load {loaded:.2f}s, "
+              f"{os.path.getsize(path) / 2**20:.1f} MiB "
+              f"(rebuild {built:.2f}s)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
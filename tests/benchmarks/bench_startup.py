@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""Measures console startup: an import time breakdown and the wall-clock
+time from process start to the first prompt.
+
+Usage: python3 -m tests.benchmarks.bench_startup [runs]
+Exits with status 1 when the median time to prompt exceeds the budget,
+HBNB_STARTUP_BUDGET seconds. Setting it also runs the budget test of
+tests/test_startup.py, which is skipped by default as timings are noisy.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+# about twice the time measured once the console imports lazily
+BUDGET = float(os.getenv("HBNB_STARTUP_BUDGET", "0.15"))
+
+
+def import_times(module="console"):
+    """Returns (name, self_us, cumulative_us) for each module imported
+    by `python -X importtime -c "import <module>"`, slowest first.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(own), int(cumulative)))
+    return sorted(times, key=lambda t: t[2], reverse=True)
+
+
+def time_to_prompt():
+    """Returns the seconds between starting console.py and its prompt.
+    Raises:
+        RuntimeError: If the console exits before its prompt.
+    """
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "console.py"], cwd=ROOT,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    try:
+        while True:
+            line = proc.stdout.readline()
+            if b"(hbnb)" in line:
+                return time.perf_counter() - start
+            if not line:
+                raise RuntimeError("console exited before its prompt:\n" +
+                                   proc.stderr.read().decode())
+    finally:
+        proc.stdin.close()
+        proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def main(runs=5):
+    """prints the breakdown and the median time to prompt"""
+    print("cumulative_us  self_us  module")
+    for name, own, cumulative in import_times()[:15]:
+        print(f"{cumulative:>13}  {own:>7}  {name}")
+
+    median = statistics.median(time_to_prompt() for _ in range(runs))
+    print(f"\ntime to first prompt: {median * 1000:.1f} ms "
+          f"(median of {runs}, budget {BUDGET * 1000:.0f} ms)")
+    return 0 if median <= BUDGET else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:2])))
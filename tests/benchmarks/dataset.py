@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+"""Generates synthetic HBNB data: states with cities, users, amenities,
+places in those cities owned by those users and linked to a few
+amenities, and reviews of those places, in fixed proportions of a total
+number of objects. Records are written straight to a storage file or
+inserted in bulk into a database, without building model objects.
+
+Usage: python3 -m tests.benchmarks.dataset <objects> <file.json|db url>
+The same objects and seed always give the same data.
+"""
+import json
+import random
+import sys
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
+
+WORDS = ("quiet sunny cozy large bright modern old charming central "
+         "view garden pool wifi kitchen beach city loft house room "
+         "great clean friendly host stay nice small noisy").split()
+EPOCH = datetime(2017, 1, 1)
+# amenities linked to each place
+LINKS = 3
+
+
+def shape(objects: int) -> Dict[str, int]:
+    """returns the number of objects of each class, in creation order"""
+    states = max(1, objects // 200)
+    counts = {"State": states, "City": states * 5,
+              "User": max(1, objects // 10),
+              "Amenity": min(100, max(1, objects // 100)),
+              "Place": max(1, objects * 3 // 10)}
+    counts["Review"] = max(0, objects - sum(counts.values()))
+    return counts
+
+
+def records(objects: int, seed: int = 0) -> Iterator[Tuple[str, Dict]]:
+    """Yields (class name, attributes) for every object, parents first.
+    Dates are left out; places list their amenity_ids.
+    """
+    rand = random.Random(seed)
+    ids = {}
+
+    def new_ids(name, count):
+        ids[name] = [str(uuid.UUID(int=rand.getrandbits(128), version=4))
+                     for _ in range(count)]
+        return ids[name]
+
+    def text(words):
+        return " ".join(rand.choices(WORDS, k=words))
+
+    counts = shape(objects)
+    for name in counts:
+        new_ids(name, counts[name])
+    for i, id in enumerate(ids["State"]):
+        yield "State", {"id": id, "name": f"State {i}"}
+    states = ids["State"]
+    for i, id in enumerate(ids["City"]):
+        yield "City", {"id": id, "name": f"City {i}",
+                       "state_id": states[i % len(states)]}
+    for i, id in enumerate(ids["User"]):
+        yield "User", {"id": id, "email": f"user{i}@hbnb.io",
+                       "password": "pwd", "first_name": f"First{i}",
+                       "last_name": f"Last{i}"}
+    for i, id in enumerate(ids["Amenity"]):
+        yield "Amenity", {"id": id, "name": f"Amenity {i}"}
+    amenities = ids["Amenity"]
+    for id in ids["Place"]:
+        yield "Place", {
+            "id": id, "city_id": rand.choice(ids["City"]),
+            "user_id": rand.choice(ids["User"]),
+            "name": text(3).title(), "description": text(20),
+            "number_rooms": rand.randrange(1, 6),
+            "number_bathrooms": rand.randrange(1, 3),
+            "max_guest": rand.randrange(1, 9),
+            "price_by_night": rand.randrange(20, 500),
+            "latitude": rand.uniform(-90, 90),
+            "longitude": rand.uniform(-180, 180),
+            "amenity_ids": rand.sample(amenities,
+                                       min(LINKS, len(amenities)))}
+    for id in ids["Review"]:
+        yield "Review", {"id": id, "place_id": rand.choice(ids["Place"]),
+                         "user_id": rand.choice(ids["User"]),
+                         "text": text(12)}
+
+
+def write_file(path: str, objects: int, seed: int = 0) -> int:
+    """Writes the objects to path in the layout FileStorage saves, one
+    object per line.
+    Returns:
+        The number of bytes written.
+    """
+    created = EPOCH.isoformat()
+    with open(path, "w") as f:
+        f.write("{\n")
+        first = True
+        for name, attrs in records(objects, seed):
+            attrs["__class__"] = name
+            attrs["created_at"] = attrs["updated_at"] = created
+            if not first:
+                f.write(",\n")
+            first = False
+            key = f"{name}.{attrs['id']}"
+            f.write(f"{json.dumps(key)}: {json.dumps(attrs)}")
+        f.write("\n}")
+        return f.tell()
+
+
+def fill_db(url: str, objects: int, seed: int = 0, chunk: int = 10000):
+    """Creates the tables of the db storage at url and inserts the
+    objects in bulk. Requires HBNB_TYPE_STORAGE=db, so that the models
+    are mapped.
+    """
+    from sqlalchemy import create_engine
+    from models.base_model import Base
+    from models.engine.db_storage import classes
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    tables = {name: cls.__table__ for name, cls in classes.items()}
+    links = Base.metadata.tables["place_amenity"]
+    batch, batch_name, pairs = [], None, []
+    with engine.begin() as conn:
+        for name, attrs in records(objects, seed):
+            if name != batch_name or len(batch) >= chunk:
+                if batch:
+                    conn.execute(tables[batch_name].insert(), batch)
+                batch, batch_name = [], name
+            for amenity_id in attrs.pop("amenity_ids", ()):
+                pairs.append({"place_id": attrs["id"],
+                              "amenity_id": amenity_id})
+            attrs["created_at"] = attrs["updated_at"] = EPOCH
+            batch.append(attrs)
+        if batch:
+            conn.execute(tables[batch_name].insert(), batch)
+        for i in range(0, len(pairs), chunk):
+            conn.execute(links.insert(), pairs[i:i + chunk])
+    engine.dispose()
+
+
+def main(objects: int, target: str):
+    """writes objects to a storage file, or a database given by its url"""
+    if "://" in target:
+        fill_db(target, objects)
+    else:
+        write_file(target, objects)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]), sys.argv[2])
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""Small keep-alive HTTP load generator used by the server benchmarks"""
+import http.client
+import threading
+import time
+
+
+def load(host, port, paths, seconds=5.0, concurrency=8, headers=None):
+    """Requests paths in turn from concurrency keep-alive connections for
+    seconds.
+    Returns:
+        A dict of requests, errors, response body bytes, elapsed seconds
+        and requests per second.
+    """
+    headers = headers or {}
+    totals = {"requests": 0, "errors": 0, "bytes": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(offset):
+        """sends requests until the deadline"""
+        done = errors = size = 0
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        i = offset
+        while time.perf_counter() < deadline:
+            try:
+                conn.request("GET", paths[i % len(paths)], headers=headers)
+                response = conn.getresponse()
+                size += len(response.read())
+                if response.status >= 400:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+            done += 1
+            i += 1
+        conn.close()
+        with lock:
+            totals["requests"] += done
+            totals["errors"] += errors
+            totals["bytes"] += size
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,))
+               for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    totals["seconds"] = time.perf_counter() - start
+    totals["rps"] = totals["requests"] / totals["seconds"]
+    return totals
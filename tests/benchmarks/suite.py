@@ -0,0 +1,252 @@
+#!/usr/bin/python3
+"""Times storage, relationships and console commands on generated data
+of growing size, with file storage and with db storage on SQLite.
+
+Usage: python3 -m tests.benchmarks.suite [--sizes 1000 10000 100000]
+           [--engines file db] [--out results.json]
+           [--baseline results.json] [--tolerance 0.5]
+Each engine and size runs in its own process, in a temporary directory,
+on data from tests.benchmarks.dataset. Times are also divided by the
+time of a fixed pure Python workload, so results from different
+machines compare; --baseline exits with 1 when a normalized time grew
+by more than the tolerance. The growth exponent of each measure between
+the smallest and largest size shows which ones are O(n) or O(n^2).
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+VERSION = 1
+# objects whose relationship properties are timed
+SAMPLE = 5
+
+
+def median_time(func: Callable, repeat: int) -> float:
+    """returns the median seconds of repeat calls of func"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def calibrate(repeat: int = 5) -> float:
+    """returns the seconds of a fixed workload of dicts, strings, json
+    and sorting, the unit of the normalized times
+    """
+    rows = [{"id": f"{i:08}", "name": f"place {i}", "price": i % 300}
+            for i in range(20000)]
+
+    def work():
+        text = json.dumps(rows)
+        sorted(json.loads(text), key=lambda row: (row["price"], row["id"]))
+    return median_time(work, repeat)
+
+
+def measure(engine: str, objects: int, repeat: int) -> Dict[str, float]:
+    """Generates objects objects for engine in the working directory and
+    returns the seconds of each measure. Must run in a process started
+    with the engine selected, see run().
+    """
+    from tests.benchmarks import dataset
+    results = {}
+    start = time.perf_counter()
+    if engine == "db":
+        dataset.fill_db(os.environ["HBNB_DB_URL"], objects)
+    else:
+        dataset.write_file("file.json", objects)
+    results["generate"] = time.perf_counter() - start
+
+    from console import HBNBCommand
+    from models import storage
+    from models.place import Place
+    from models.state import State
+
+    def reload():
+        if engine == "db":
+            storage.close()
+            storage.reload()
+        else:
+            storage._FileStorage__objects.clear()
+            storage.reload()
+        storage.all()
+    results["reload"] = median_time(reload, repeat)
+
+    place = next(iter(storage.all(Place).values()))
+
+    def save():
+        place.name = "Renamed place"
+        storage.new(place)
+        storage.save()
+    results["save"] = median_time(save, repeat)
+    for name in dataset.shape(objects):
+        results[f"all.{name}"] = median_time(lambda: storage.all(name), repeat)
+    results["count.Place"] = median_time(lambda: storage.count(Place), repeat)
+
+    states = list(storage.all(State).values())[:SAMPLE]
+    places = list(storage.all(Place).values())[:SAMPLE]
+
+    def related(objs, attr):
+        # db relationships are loaded once per object, then cached
+        if engine == "db":
+            for obj in objs:
+                storage._DBStorage__session.expire(obj, [attr])
+        return [getattr(obj, attr) for obj in objs]
+    for key, objs, attr in [("State.cities", states, "cities"),
+                            ("Place.reviews", places, "reviews"),
+                            ("Place.amenities", places, "amenities")]:
+        results[key] = median_time(lambda: related(objs, attr), repeat) / len(objs)
+
+    console = HBNBCommand()
+    for key, line in [("console.count", "count Place"),
+                      ("console.all", "all City"),
+                      ("console.update",
+                       f'update Place {place.id} name "Console place"')]:
+        with redirect_stdout(io.StringIO()):
+            results[key] = median_time(lambda: console.onecmd(line), repeat)
+    return results
+
+
+def run(engine: str, objects: int, repeat: int) -> Dict[str, float]:
+    """returns measure() run in a new process and directory for engine"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        env.pop("HBNB_ENV", None)
+        if engine == "db":
+            env["HBNB_TYPE_STORAGE"] = "db"
+            env["HBNB_DB_URL"] = "sqlite:///" + os.path.join(tmp, "hbnb.db")
+        else:
+            env.pop("HBNB_TYPE_STORAGE", None)
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-m", "tests.benchmarks.suite",
+             "--measure", engine, str(objects), str(repeat)],
+            cwd=tmp, env=env, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def exponents(runs: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Returns the growth exponent of each measure between the smallest
+    and largest size: about 1 for O(n), 2 for O(n^2)
+    """
+    sizes = sorted(runs, key=int)
+    if len(sizes) < 2:
+        return {}
+    low, high = sizes[0], sizes[-1]
+    scale = math.log(int(high) / int(low))
+    return {key: round(math.log(max(runs[high][key], 1e-7) /
+                                max(runs[low][key], 1e-7)) / scale, 2)
+            for key in runs[high] if key in runs[low]}
+
+
+def suite(sizes: List[int], engines: List[str],
+          repeat: int = 3) -> Dict:
+    """Returns the report of every engine at every size: seconds,
+    normalized times and growth exponents
+    """
+    unit = calibrate()
+    report = {"version": VERSION, "python": platform.python_version(),
+              "calibration": unit, "engines": {}}
+    for engine in engines:
+        runs = {}
+        for objects in sizes:
+            runs[str(objects)] = run(engine, objects, repeat)
+        report["engines"][engine] = {
+            "seconds": runs,
+            "normalized": {size: {key: value / unit
+                                  for key, value in results.items()}
+                           for size, results in runs.items()},
+            "exponents": exponents(runs)}
+    return report
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float = 0.5,
+            floor: float = 0.002) -> List[str]:
+    """Returns the regressions of report against baseline: measures whose
+    normalized time grew by more than tolerance, and their time by more
+    than floor seconds
+    """
+    regressions = []
+    for engine, entry in report["engines"].items():
+        before = baseline.get("engines", {}).get(engine, {})
+        for size, results in entry["normalized"].items():
+            old_results = before.get("normalized", {}).get(size, {})
+            for key, new in results.items():
+                old = old_results.get(key)
+                if old is None or key == "generate":
+                    continue
+                seconds = new * report["calibration"]
+                grown = seconds - old * report["calibration"]
+                if new > old * (1 + tolerance) and grown > floor:
+                    regressions.append(f"{engine} {size} {key}: "
+                                       f"{old:.3f} -> {new:.3f} units")
+    return regressions
+
+
+def print_report(report: Dict):
+    """prints the milliseconds of every measure, one column per size"""
+    for engine, entry in report["engines"].items():
+        sizes = list(entry["seconds"])
+        print(f"{engine + ' ms':<18}" +
+              "".join(f"{size:>11}" for size in sizes) +
+              f"{'exponent':>10}", file=sys.stderr)
+        for key in entry["seconds"][sizes[0]]:
+            cells = "".join(f"{entry['seconds'][size][key] * 1e3:>11.3f}"
+                            for size in sizes)
+            exponent = entry["exponents"].get(key)
+            tail = "" if exponent is None else f"{exponent:>10.2f}"
+            print(f"{key:<18}{cells}{tail}", file=sys.stderr)
+
+
+def main(argv: List[str] = None) -> int:
+    """writes the report, and returns 1 when a measure regressed against
+    the baseline
+    """
+    parser = argparse.ArgumentParser(
+        prog="python3 -m tests.benchmarks.suite",
+        description="Time storage, relationships and console commands.")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--engines", nargs="+", default=["file", "db"],
+                        choices=["file", "db"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="report file instead of stdout")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--measure", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.measure:
+        engine, objects, repeat = args.measure
+        print(json.dumps(measure(engine, int(objects), int(repeat))))
+        return 0
+    report = suite(args.sizes, args.engines, args.repeat)
+    print_report(report)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
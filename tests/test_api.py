@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+""" Module for testing the JSON read API """
+import gzip
+import http.client
+import json
+import os
+import unittest
+from api.app import ApiServer, matches
+from models import storage
+from models.city import City
+from models.state import State
+from models.user import User
+
+
+class test_api(unittest.TestCase):
+    """ Class to test requests to the API """
+
+    def setUp(self):
+        """ Saves a state with a city and starts a server """
+        self.state = State(name='California')
+        self.state.save()
+        self.city = City(name='Fremont', state_id=self.state.id)
+        self.city.save()
+        self.server = ApiServer().start()
+        self.conn = http.client.HTTPConnection('127.0.0.1', self.server.port)
+
+    def tearDown(self):
+        """ Stops the server and removes the objects """
+        self.conn.close()
+        self.server.stop()
+        storage.delete(self.city)
+        storage.delete(self.state)
+        try:
+            os.remove('file.json')
+        except Exception:
+            pass
+
+    def get(self, path, method='GET', **headers):
+        """ Returns the response and body of a request """
+        self.conn.request(method, '/api/v1/' + path, headers=headers)
+        response = self.conn.getresponse()
+        return response, response.read()
+
+    def test_status(self):
+        """ The status route answers OK """
+        response, body = self.get('status')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(body), {'status': 'OK'})
+        self.assertEqual(response.getheader('Content-Type'),
+                         'application/json')
+
+    def test_objects(self):
+        """ Lists, objects and related objects are served """
+        states = json.loads(self.get('states')[1])
+        self.assertIn(self.state.id, [s['id'] for s in states])
+        state = json.loads(self.get(f'states/{self.state.id}')[1])
+        self.assertEqual(state['name'], 'California')
+        cities = json.loads(self.get(f'states/{self.state.id}/cities')[1])
+        self.assertEqual([c['id'] for c in cities], [self.city.id])
+        stats = json.loads(self.get('stats')[1])
+        self.assertGreaterEqual(stats['cities'], 1)
+
+    def test_not_found(self):
+        """ Unknown routes and ids are 404 """
+        for path in ['nope', 'states/nope', f'states/{self.state.id}/users',
+                     f'cities/{self.city.id}/places/x']:
+            with self.subTest(path=path):
+                response, body = self.get(path)
+                self.assertEqual(response.status, 404)
+                self.assertEqual(json.loads(body), {'error': 'Not found'})
+
+    def test_methods(self):
+        """ Only GET and HEAD are allowed """
+        response, body = self.get('states', 'HEAD')
+        self.assertEqual(body, b'')
+        self.assertGreater(int(response.getheader('Content-Length')), 0)
+        response, _ = self.get('states', 'POST')
+        self.assertEqual(response.status, 405)
+
+    def test_etag(self):
+        """ A matching If-None-Match gets an empty 304 """
+        response, _ = self.get(f'states/{self.state.id}')
+        etag = response.getheader('ETag')
+        response, body = self.get(f'states/{self.state.id}',
+                                  **{'If-None-Match': etag})
+        self.assertEqual((response.status, body), (304, b''))
+        self.assertEqual(response.getheader('ETag'), etag)
+        response, _ = self.get(f'states/{self.state.id}',
+                               **{'If-None-Match': '"other", W/' + etag})
+        self.assertEqual(response.status, 304)
+
+    def test_cache(self):
+        """ Responses are cached until their class changes """
+        api = self.server.api
+        self.get('states')
+        self.get(f'states/{self.state.id}/cities')
+        self.get('states')
+        self.assertEqual((api.hits, api.misses), (1, 2))
+        User(email='a@b.c', password='pw').save()
+        self.assertEqual(len(api.cache), 2)
+        self.city.name = 'San Jose'
+        self.city.save()
+        self.assertEqual(list(api.cache), ['/api/v1/states'])
+        cities = json.loads(self.get(f'states/{self.state.id}/cities')[1])
+        self.assertEqual(cities[0]['name'], 'San Jose')
+
+    def test_save_in_place(self):
+        """ A save without a reported change drops every response """
+        response, _ = self.get(f'states/{self.state.id}')
+        self.state.name = 'Nevada'
+        storage.save()
+        response, body = self.get(f'states/{self.state.id}', **{
+            'If-None-Match': response.getheader('ETag')})
+        self.assertEqual(json.loads(body)['name'], 'Nevada')
+
+    def test_private(self):
+        """ Passwords are not served """
+        user = User(email='a@b.c', password='secret')
+        user.save()
+        self.addCleanup(storage.delete, user)
+        body = json.loads(self.get(f'users/{user.id}')[1])
+        self.assertEqual(body['email'], 'a@b.c')
+        self.assertNotIn('password', body)
+
+    def test_gzip(self):
+        """ Large bodies are sent gzipped when accepted """
+        for i in range(40):
+            City(name=f'City {i}', state_id=self.state.id).save()
+        path = f'states/{self.state.id}/cities'
+        plain, body = self.get(path)
+        response, zipped = self.get(path, **{'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(gzip.decompress(zipped), body)
+        self.assertNotEqual(response.getheader('ETag'),
+                            plain.getheader('ETag'))
+
+    def test_matches(self):
+        """ If-None-Match lists, stars and weak tags """
+        self.assertTrue(matches('"a", "b"', '"b"'))
+        self.assertTrue(matches('*', '"b"'))
+        self.assertTrue(matches('W/"b"', '"b"'))
+        self.assertFalse(matches('"a"', '"b"'))
+        self.assertFalse(matches(None, '"b"'))
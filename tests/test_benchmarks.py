@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+""" Module for testing the synthetic dataset and the benchmark suite """
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+from tests.benchmarks import dataset, suite
+
+
+class test_dataset(unittest.TestCase):
+    """ Class to test the synthetic dataset generator """
+
+    def test_shape(self):
+        """ Every class gets its share of the objects """
+        counts = dataset.shape(1000)
+        self.assertEqual(sum(counts.values()), 1000)
+        self.assertEqual(list(counts), ['State', 'City', 'User', 'Amenity',
+                                        'Place', 'Review'])
+        self.assertEqual(counts['City'], counts['State'] * 5)
+
+    def test_records(self):
+        """ Records are the same for a seed and point to earlier ones """
+        first = list(dataset.records(500))
+        self.assertEqual(first, list(dataset.records(500)))
+        self.assertNotEqual(first, list(dataset.records(500, seed=1)))
+        seen = set()
+        for name, attrs in first:
+            for attr in ['state_id', 'city_id', 'user_id', 'place_id']:
+                if attr in attrs:
+                    self.assertIn(attrs[attr], seen)
+            seen.add(attrs['id'])
+
+    def test_write_file(self):
+        """ The file has the layout of FileStorage, one object per line """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'file.json')
+            size = dataset.write_file(path, 300)
+            self.assertEqual(os.path.getsize(path), size)
+            with open(path) as f:
+                lines = f.read().splitlines()
+            objs = json.loads('\n'.join(lines))
+        self.assertEqual(len(lines), 302)
+        self.assertEqual(Counter(v['__class__'] for v in objs.values()),
+                         Counter(dataset.shape(300)))
+        place = next(v for v in objs.values() if v['__class__'] == 'Place')
+        self.assertEqual(len(place['amenity_ids']), dataset.LINKS)
+
+
+class test_suite(unittest.TestCase):
+    """ Class to test the benchmark suite and its comparisons """
+
+    def report(self, seconds):
+        """ Returns a report of one file storage run of 1000 objects """
+        return {'calibration': 0.01, 'engines': {'file': {
+            'normalized': {'1000': {key: value / 0.01
+                                    for key, value in seconds.items()}}}}}
+
+    def test_exponents(self):
+        """ Linear and quadratic measures get exponents 1 and 2 """
+        runs = {'1000': {'save': 0.01, 'scan': 0.001},
+                '10000': {'save': 0.1, 'scan': 0.1}}
+        self.assertEqual(suite.exponents(runs), {'save': 1.0, 'scan': 2.0})
+        self.assertEqual(suite.exponents({'1000': runs['1000']}), {})
+
+    def test_compare(self):
+        """ Only measures grown past tolerance and floor regress """
+        baseline = self.report({'save': 0.1, 'reload': 0.001})
+        self.assertEqual(suite.compare(baseline, baseline), [])
+        slower = self.report({'save': 0.2, 'reload': 0.002})
+        self.assertEqual(suite.compare(slower, baseline),
+                         ['file 1000 save: 10.000 -> 20.000 units'])
+        self.assertEqual(suite.compare(slower, baseline, tolerance=1.5), [])
+
+    def test_run_file(self):
+        """ A file storage run measures every operation """
+        results = suite.run('file', 300, 1)
+        for key in ['reload', 'save', 'all.Review', 'Place.reviews',
+                    'console.count', 'console.update']:
+            self.assertGreater(results[key], 0)
+
+    @unittest.skipUnless(importlib.util.find_spec('sqlalchemy'),
+                         'requires sqlalchemy')
+    def test_run_db(self):
+        """ A db storage run uses SQLite """
+        results = suite.run('db', 300, 1)
+        self.assertEqual(set(results), set(suite.run('file', 300, 1)))
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+""" Module for testing the compiled Cmdmaker grammars """
+import unittest
+from cmdmaker import Rule
+from console import maker
+
+
+def interpreted(cmd, line):
+    """ Parses line by scanning it and walking the rule tree """
+    return Rule.match_func_tokens(maker.scan_str(line), maker.funcs[cmd].args)
+
+
+class test_compiled(unittest.TestCase):
+    """ Class to test the compiled parser against the rule walk """
+
+    def test_same_values(self):
+        """ Both parsers return the same values on valid lines """
+        lines = [
+            'Place',
+            'Place name="My_house"',
+            'Place number_rooms=4 latitude=-1.25 name="a_b" max_guest=+3',
+            '  State   name="California"  ',
+            'User a=1 b=2.0 c="" d=-7',
+        ]
+        for line in lines:
+            with self.subTest(line=line):
+                self.assertEqual(maker.parse('create', line),
+                                 interpreted('create', line))
+
+    def test_native_values(self):
+        """ Match actions run on the captured tokens """
+        args = maker.parse('create', 'Place a=1 b=1.5 c="x_y"')
+        self.assertEqual(args, ['Place', [['a', '=', 1], ['b', '=', 1.5],
+                                          ['c', '=', 'x y']]])
+        self.assertIs(type(args[1][0][2]), int)
+        self.assertIs(type(args[1][1][2]), float)
+
+    def test_token_priority(self):
+        """ Earlier patterns win, like in the scanner """
+        args = maker.parse('create', 'Place a=12.5')
+        self.assertEqual(args[1], [['a', '=', 12.5]])
+
+    def test_invalid(self):
+        """ Lines outside the grammar are rejected """
+        for line in ['', '12', 'Place a=', 'Place a=b', 'Place =1',
+                     'Place a=1 junk', 'Place a="open']:
+            with self.subTest(line=line):
+                self.assertIsNone(maker.parse('create', line))
+
+    def test_walked(self):
+        """ Grammars with capturing groups fall back to the rule walk """
+        from cmdmaker import Cmdmaker, Walker
+        walked = Cmdmaker({'pair': r'(\w+):(\w+)', 'ignore': r'\s+'})
+
+        @walked.cmd('pair r<pair|>')
+        def pairs(first, rest):
+            pass
+        self.assertIsInstance(walked.compile('pairs'), Walker)
+        self.assertEqual(walked.parse('pairs', 'a:b c:d e:f'),
+                         ['a:b', [['c:d'], ['e:f']]])
+        self.assertIsNone(walked.parse('pairs', 'a:b c'))
+
+    def test_cached(self):
+        """ Grammars are compiled once per command """
+        maker.parse('create', 'Place')
+        parser = maker.parsers['create']
+        maker.parse('create', 'User')
+        self.assertIs(maker.parsers['create'], parser)
+
+
+class test_plan_cache(unittest.TestCase):
+    """ Class to test the parse plan cache """
+
+    def setUp(self):
+        """ Starts every test with an empty cache """
+        maker.cache_clear()
+
+    def test_hits(self):
+        """ Lines of the same shape reuse the plan of the first one """
+        self.assertEqual(maker.parse('create', 'Place a=1 b="x"'),
+                         ['Place', [['a', '=', 1], ['b', '=', 'x']]])
+        self.assertEqual(maker.parse('create', 'User c=2.5 d=-3'),
+                         ['User', [['c', '=', 2.5], ['d', '=', -3]]])
+        info = maker.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_same_values(self):
+        """ Cached plans return what the full grammar returns """
+        parser = maker.compile('create')
+        for line in ['Place', 'Place a=1', 'Place b="x_y"', 'Place c=1.5',
+                     'State a=1 b=2 c=3', 'City a="1" b=2.0 c=-3']:
+            with self.subTest(line=line):
+                self.assertEqual(maker.parse('create', line),
+                                 parser.parse(line))
+
+    def test_other_shape(self):
+        """ Lines with other token types get plans of their own """
+        maker.parse('create', 'Place a=1')
+        self.assertEqual(maker.parse('create', 'Place a="b c"'),
+                         ['Place', [['a', '=', 'b c']]])
+        self.assertIsNone(maker.parse('create', 'Place a=junk'))
+        self.assertEqual(maker.cache_info().hits, 0)
+
+    def test_same_word_count(self):
+        """ Lines of other shapes but as many words do not evict plans """
+        for _ in range(3):
+            self.assertEqual(maker.parse('create', 'Place a="b c"'),
+                             ['Place', [['a', '=', 'b c']]])
+            self.assertEqual(maker.parse('create', 'Place a=1 b=2'),
+                             ['Place', [['a', '=', 1], ['b', '=', 2]]])
+        info = maker.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (4, 2, 2))
+
+    def test_shape(self):
+        """ Shapes follow the token types, not the spacing """
+        self.assertEqual(maker.shape('Place a=1'),
+                         maker.shape('  User   b=-20 '))
+        self.assertNotEqual(maker.shape('Place a=1'),
+                            maker.shape('Place a=1.5'))
+        self.assertNotEqual(maker.shape('Place a=1'),
+                            maker.shape('Place a="1"'))
+
+    def test_bounded(self):
+        """ The least recently used plan is dropped first """
+        maker.maxsize = 2
+        try:
+            maker.parse('create', 'Place')
+            maker.parse('create', 'Place a=1')
+            maker.parse('create', 'Place')
+            maker.parse('create', 'Place a=1 b=2')
+            self.assertEqual(list(maker.plans), [
+                ('create', maker.shape('Place')),
+                ('create', maker.shape('Place a=1 b=2'))])
+        finally:
+            maker.maxsize = 128
+
+    def test_large_shape(self):
+        """ Shapes too large to unroll use the full grammar """
+        line = 'Place ' + ' '.join(f'a{i}={i}' for i in range(300))
+        args = maker.parse('create', line)
+        self.assertEqual(len(args[1]), 300)
+        self.assertEqual(maker.parse('create', line), args)
+        self.assertEqual(maker.plans[('create', maker.shape(line))],
+                         (None, None))
+        self.assertEqual(maker.cache_info().hits, 0)
+
+
+class test_pipeline(unittest.TestCase):
+    """ Class to test lines parsed ahead of their execution """
+
+    def test_order(self):
+        """ Lines come back in order, numbered from 1 """
+        lines = ['create Place a=1\n', 'all Place\n', 'create State\n']
+        parsed = list(maker.pipeline(lines, depth=1, chunk=2))
+        self.assertEqual([p.number for p in parsed], [1, 2, 3])
+        self.assertEqual(parsed[0].line, 'create Place a=1')
+        self.assertEqual(parsed[0].args, ['Place', [['a', '=', 1]]])
+        self.assertEqual(parsed[2].args, ['State', []])
+
+    def test_other_commands(self):
+        """ Lines of other commands are passed through unparsed """
+        parsed = list(maker.pipeline(['all Place', 'User.count()']))
+        self.assertEqual([(p.cmd, p.args) for p in parsed],
+                         [(None, None), (None, None)])
+
+    def test_invalid(self):
+        """ Lines that do not parse keep their command and number """
+        parsed = list(maker.pipeline(['create Place', 'create Place a=']))
+        self.assertEqual(parsed[1][:3], (2, 'create Place a=', 'create'))
+        self.assertIsNone(parsed[1].args)
+
+    def test_early_stop(self):
+        """ The reader stops when the consumer does """
+        pipeline = maker.pipeline(('create Place' for _ in range(10000)),
+                                  depth=4, chunk=1)
+        self.assertEqual(next(pipeline).number, 1)
+        pipeline.close()
+
+    def test_reader_error(self):
+        """ Errors raised while reading reach the consumer """
+        def lines():
+            yield 'create Place'
+            raise OSError('read failed')
+        with self.assertRaises(OSError):
+            list(maker.pipeline(lines()))
@@ -0,0 +1,250 @@
+#!/usr/bin/python3
+""" Module for testing the console helpers """
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from console import parse_where
+
+
+class ConsoleCase(unittest.TestCase):
+    """ Runs commands in a console and returns what they print """
+
+    def run_cmd(self, line):
+        """ Returns the output of one command """
+        import io
+        from contextlib import redirect_stdout
+        from console import HBNBCommand
+        out = io.StringIO()
+        with redirect_stdout(out):
+            HBNBCommand().onecmd(line)
+        return out.getvalue()
+
+
+class test_parse_where(unittest.TestCase):
+    """ Class to test where clause parsing """
+
+    def test_set(self):
+        """ Pairs before set are filters, pairs after are values """
+        filters, values = parse_where(
+            'city_id="c1" name="My_house" set price_by_night=120 '
+            'latitude=1.5')
+        self.assertEqual(filters, {'city_id': 'c1', 'name': 'My house'})
+        self.assertEqual(values, {'price_by_night': 120, 'latitude': 1.5})
+
+    def test_without_set(self):
+        """ Without set, the first pair is the filter """
+        filters, values = parse_where('city_id="c1" price_by_night=120')
+        self.assertEqual(filters, {'city_id': 'c1'})
+        self.assertEqual(values, {'price_by_night': 120})
+
+    def test_invalid(self):
+        """ Clauses that are not pairs raise ValueError """
+        for clause in ['city_id="c1"', 'city_id', 'set a=1', 'a=1 set']:
+            with self.assertRaises(ValueError):
+                parse_where(clause)
+
+
+class test_update_where(ConsoleCase):
+    """ Class to test updates of every object matching a where clause """
+
+    def test_update(self):
+        """ Matching objects are updated, reserved attributes refused """
+        from models import storage
+        from models.place import Place
+        place = Place(city_id='wc1', price_by_night=10)
+        storage.new(place)
+        self.addCleanup(storage.delete, place)
+        self.addCleanup(lambda: os.path.exists('file.json') and
+                        os.remove('file.json'))
+        self.assertEqual(self.run_cmd('update Place where city_id="wc1" '
+                                      'set price_by_night=80'), '1\n')
+        self.assertEqual(place.price_by_night, 80)
+        for attr in ['id', 'created_at', '__class__']:
+            self.assertEqual(
+                self.run_cmd(f'update Place where city_id="wc1" '
+                             f'set {attr}="x"'),
+                f"** can't update Place.{attr} **\n")
+            self.assertEqual(
+                self.run_cmd(f'update Place {place.id} {attr} "x"'),
+                f"** can't update Place.{attr} **\n")
+        self.assertIs(storage.get(Place, place.id), place)
+
+
+class test_update(ConsoleCase):
+    """ Class to test updates of a single object """
+
+    def test_all_or_nothing(self):
+        """ An invalid pair leaves every attribute unchanged """
+        from models import storage
+        from models.place import Place
+        place = Place(name='Old', max_guest=2)
+        storage.new(place)
+        self.addCleanup(storage.delete, place)
+        self.addCleanup(lambda: os.path.exists('file.json') and
+                        os.remove('file.json'))
+        for pairs in ['{"name": "New", "max_guest": "many"}',
+                      '{"name": "New", "id": "x"}']:
+            with self.subTest(pairs=pairs):
+                self.assertTrue(self.run_cmd(
+                    f'update Place {place.id} {pairs}').startswith('** '))
+                self.assertEqual((place.name, place.max_guest), ('Old', 2))
+        self.run_cmd(f'update Place {place.id} '
+                     '{"name": "New", "max_guest": "4"}')
+        self.assertEqual((place.name, place.max_guest), ('New', 4))
+
+
+class test_stats(unittest.TestCase):
+    """ Class to test per-command statistics """
+
+    def test_record(self):
+        """ Commands run through the hooks are timed """
+        import io
+        from contextlib import redirect_stdout
+        from console import HBNBCommand
+        console = HBNBCommand()
+        console.echo_prompt = False
+        console.do_stats('reset')
+        with redirect_stdout(io.StringIO()):
+            console.run_line('count State')
+            console.run_line('count State')
+            console.run_line('')
+        self.assertEqual(list(console.latency), ['count'])
+        self.assertEqual(console.latency['count'].count, 2)
+        self.assertEqual(console.storage_use['count']['calls.count'], 2)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            console.do_stats('')
+        self.assertIn('count', out.getvalue().splitlines()[1])
+
+
+class test_search(ConsoleCase):
+    """ Class to test the search command """
+
+    def test_search(self):
+        """ Matching places are printed best first """
+        from models import storage
+        from models.place import Place
+        place = Place(name='Zanzibar villa', description='ocean view')
+        storage.new(place)
+        self.addCleanup(storage.delete, place)
+        from models.engine.file_storage import FileStorage
+        for name in ['file.json', 'file.json.index']:
+            self.addCleanup(lambda n=name: os.path.exists(n) and os.remove(n))
+        self.addCleanup(lambda: setattr(FileStorage._FileStorage__index,
+                                        'stale', True))
+        out = self.run_cmd('search Place zanzibar ocean')
+        self.assertIn(f'[Place] ({place.id}) Zanzibar villa', out)
+        self.assertEqual(self.run_cmd('search Review zanzibar'), '')
+        self.assertEqual(self.run_cmd('search'),
+                         '** search words missing **\n')
+
+
+class test_aggregate(ConsoleCase):
+    """ Class to test the aggregate command """
+
+    def test_aggregate(self):
+        """ Groups are printed with their counts and numbers """
+        from models import storage
+        from models.place import Place
+        from models.engine.file_storage import FileStorage
+        place = Place(city_id='c1', price_by_night=70)
+        storage.new(place)
+        self.addCleanup(storage.delete, place)
+        self.addCleanup(lambda: os.path.exists('file.json') and
+                        os.remove('file.json'))
+        out = self.run_cmd('aggregate rebuild city c1')
+        self.assertTrue(out.startswith("{'count': 1, 'price_by_night': "
+                                       "{'sum': 70, 'min': 70"))
+        self.addCleanup(lambda: setattr(FileStorage._FileStorage__aggregates,
+                                        'stale', True))
+        self.assertIn("c1: {'count': 1", self.run_cmd('aggregate city'))
+        self.assertEqual(self.run_cmd('aggregate'),
+                         '** grouping missing **\n')
+        self.assertEqual(self.run_cmd('aggregate user'),
+                         "** grouping doesn't exist **\n")
+
+
+class test_metrics(ConsoleCase):
+    """ Class to test the metrics command """
+
+    def test_metrics(self):
+        """ Metrics are printed as a table, json or Prometheus text """
+        import json
+        from models import metrics
+        metrics.counters['calls.save'] += 1
+        self.assertIn('calls.save', self.run_cmd('metrics'))
+        snap = json.loads(self.run_cmd('metrics json'))
+        self.assertGreaterEqual(snap['counters']['calls.save'], 1)
+        self.assertIn('# TYPE hbnb_storage_calls_total counter\n',
+                      self.run_cmd('metrics prometheus'))
+        self.assertEqual(self.run_cmd('metrics xml'),
+                         '** unknown format **\n')
+
+
+class test_batch(unittest.TestCase):
+    """ Class to test running a script with --batch """
+
+    def batch(self, script):
+        """ Runs script in a console of its own, in an empty directory """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        env.pop('HBNB_TYPE_STORAGE', None)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.file = os.path.join(tmp.name, 'file.json')
+        return subprocess.run(
+            [sys.executable, os.path.join(root, 'console.py'), '--batch',
+             '-'], input=script, cwd=tmp.name, env=env,
+            capture_output=True, text=True)
+
+    def test_commit(self):
+        """ A script without errors is saved once and exits with 0 """
+        import json
+        done = self.batch('create State name="Texas"\n'
+                          'create City name="Austin"\n')
+        self.assertEqual(done.returncode, 0, done.stderr)
+        self.assertIn('** 2 commands in ', done.stderr)
+        with open(self.file) as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_failure(self):
+        """ A failing command rolls the batch back and exits with 1 """
+        for line in ['create Nowhere name="x"', 'show State missing-id',
+                     'create State name', 'foo bar']:
+            with self.subTest(line=line):
+                done = self.batch('create State name="Texas"\n'
+                                  f'{line}\n'
+                                  'create State name="Utah"\n')
+                self.assertEqual(done.returncode, 1)
+                self.assertIn('** line 2: ', done.stderr)
+                self.assertIn('** 2 commands in ', done.stderr)
+                self.assertFalse(os.path.exists(self.file))
+
+
+@unittest.skipUnless(importlib.util.find_spec('sqlalchemy'),
+                     'requires sqlalchemy')
+class test_update_db(unittest.TestCase):
+    """ Class to test updates with db storage on SQLite """
+
+    def console(self, script):
+        """ Returns the output of script run by a new db mode console """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root, HBNB_TYPE_STORAGE='db',
+                   HBNB_DB_URL='sqlite:///' + self.db)
+        env.pop('HBNB_ENV', None)
+        return subprocess.run(
+            [sys.executable, '-W', 'ignore', os.path.join(root, 'console.py')],
+            input=script, cwd=os.path.dirname(self.db), env=env,
+            capture_output=True, text=True, check=True).stdout
+
+    def test_update(self):
+        """ An update is committed and read back by the next console """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = os.path.join(tmp.name, 'hbnb.db')
+        id = self.console('create State name="Texas"\n').split()[1]
+        self.console(f'update State {id} name "Utah"\n')
+        self.assertIn("'name': 'Utah'", self.console(f'show State {id}\n'))
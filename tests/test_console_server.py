@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+""" Module for testing the console socket server and client """
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from console_server import ConsoleServer
+from hbnb_client import send
+from models import storage
+
+
+class test_console_server(unittest.TestCase):
+    """ Class to test commands sent over the console socket """
+
+    def setUp(self):
+        """ Starts a server on a temporary socket """
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'hbnb.sock')
+        self.server = ConsoleServer(self.path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        """ Stops the server and removes the storage file """
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        os.rmdir(self.tmp)
+        try:
+            os.remove('file.json')
+        except Exception:
+            pass
+
+    def connect(self):
+        """ Opens a client connection """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        self.addCleanup(sock.close)
+        reader = sock.makefile('rb')
+        self.addCleanup(reader.close)
+        return sock, reader
+
+    def run_cmd(self, client, line):
+        """ Sends line and returns the reply """
+        out = io.BytesIO()
+        self.assertTrue(send(*client, line, out))
+        return out.getvalue().decode()
+
+    def test_create_show(self):
+        """ Objects created by one client are seen by another """
+        obj_id = self.run_cmd(self.connect(), 'create State').strip()
+        reply = self.run_cmd(self.connect(), 'show State ' + obj_id)
+        self.assertIn(obj_id, reply)
+        self.assertEqual(storage.get('State', obj_id).id, obj_id)
+
+    def test_errors(self):
+        """ Error messages are sent back """
+        reply = self.run_cmd(self.connect(), 'show Nope 1')
+        self.assertEqual(reply, "** class doesn't exist **\n")
+
+    def test_socket_removed(self):
+        """ The socket file is removed when the server closes """
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_owner_only(self):
+        """ Only the owner may connect to the socket """
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_in_use(self):
+        """ A second server refuses a socket that still answers """
+        with self.assertRaises(OSError):
+            ConsoleServer(self.path)
+        self.assertEqual(self.run_cmd(self.connect(), 'count Nope'),
+                         "** class doesn't exist **\n")
+
+    def test_stale(self):
+        """ The socket file of a server that is gone is replaced """
+        path = os.path.join(self.tmp, 'stale.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        server = ConsoleServer(path)
+        server.server_close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_not_socket(self):
+        """ A file that is not a socket is left alone """
+        path = os.path.join(self.tmp, 'file.txt')
+        with open(path, 'w') as f:
+            f.write('keep')
+        try:
+            with self.assertRaises(OSError):
+                ConsoleServer(path)
+            with open(path) as f:
+                self.assertEqual(f.read(), 'keep')
+        finally:
+            os.remove(path)
+
+    def test_disconnect_rolls_back(self):
+        """ A batch left open by a client is rolled back """
+        client = self.connect()
+        self.run_cmd(client, 'create State')
+        count = storage.count('State')
+        self.run_cmd(client, 'begin')
+        self.run_cmd(client, 'create State')
+        client[1].close()
+        client[0].close()
+        other = self.connect()
+        self.assertEqual(self.run_cmd(other, 'count State').strip(),
+                         str(count))
+
+    def test_other_process(self):
+        """ Objects saved by another process are kept and seen """
+        client = self.connect()
+        self.run_cmd(client, 'create State')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        env.pop('HBNB_TYPE_STORAGE', None)
+        other = subprocess.run(
+            [sys.executable, os.path.join(root, 'console.py')],
+            input='create City\n', env=env, capture_output=True,
+            text=True, check=True).stdout.split()[1]
+        self.assertIn(other, self.run_cmd(client, 'show City ' + other))
+        self.run_cmd(client, 'create State')
+        storage.reload()
+        self.assertIsNotNone(storage.get('City', other))
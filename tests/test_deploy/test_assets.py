@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+""" Module for testing the web_static asset build """
+import gzip
+import os
+import tempfile
+import unittest
+from deploy.assets import build, minify_css
+from deploy.pack import manifest, walk
+from tests.test_deploy.test_images import make_png
+
+PAGE = """<html>
+\t<head>
+\t\t<link rel="stylesheet" href="styles/a.css"/>
+\t\t<link rel="stylesheet" href="styles/b.css"/>
+\t</head>
+\t<body>{body}</body>
+</html>
+"""
+
+
+class test_minify(unittest.TestCase):
+    """ Class to test CSS minification """
+
+    def test_whitespace(self):
+        """ Comments and spaces around punctuation are dropped """
+        css = "/* c */\nbody {\n\tmargin: 0 auto;\n\tcolor: red;\n}\n"
+        self.assertEqual(minify_css(css), "body{margin:0 auto;color:red}")
+
+    def test_selectors(self):
+        """ Descendant and child selectors keep their meaning """
+        self.assertEqual(minify_css("div  p > a :hover , b { }"),
+                         "div p>a :hover,b{}")
+
+    def test_strings(self):
+        """ Strings are kept as they are """
+        css = 'a { content: "x  ;  }"; font-family: "A  B" }'
+        self.assertEqual(minify_css(css),
+                         'a{content:"x  ;  }";font-family:"A  B"}')
+
+
+class test_build(unittest.TestCase):
+    """ Class to test bundling, fingerprinting and precompression """
+
+    def setUp(self):
+        """ Creates a tree with two pages sharing stylesheets """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, 'web_static')
+        self.out = os.path.join(self.tmp.name, 'build', 'web_static')
+        os.makedirs(os.path.join(self.src, 'styles'))
+        self.write('styles/a.css', 'body {\n  margin: 0;\n}\n' * 20)
+        self.write('styles/b.css', 'a { color: red; }\n')
+        self.write('styles/unused.css', 'p { }\n')
+        self.write('1-index.html', PAGE.format(body='one ' * 100))
+        self.write('2-index.html', PAGE.format(body='two'))
+
+    def tearDown(self):
+        """ Removes the temporary files """
+        self.tmp.cleanup()
+
+    def write(self, rel, text):
+        """ Writes text to a file of the source tree """
+        with open(os.path.join(self.src, rel), 'w') as f:
+            f.write(text)
+
+    def read(self, rel, mode='r'):
+        """ Returns a file of the built tree """
+        with open(os.path.join(self.out, rel), mode) as f:
+            return f.read()
+
+    def test_bundle(self):
+        """ Pages link one bundle of their stylesheets, in order """
+        report = build(self.src, self.out)
+        self.assertEqual(len(report['bundles']), 1)
+        bundle = report['bundles'][0]
+        self.assertRegex(bundle, r'^styles/bundle\.[0-9a-f]{10}\.css$')
+        self.assertTrue(self.read(bundle).endswith('a{color:red}'))
+        html = self.read('1-index.html')
+        self.assertIn(f'\t\t<link rel="stylesheet" href="{bundle}"/>\n'
+                      '\t</head>', html)
+        self.assertNotIn('a.css', html)
+        self.assertEqual(report['requests_before'], 4)
+        self.assertEqual(report['requests_after'], 2)
+
+    def test_files(self):
+        """ Bundled stylesheets are dropped, other files copied """
+        build(self.src, self.out)
+        styles = os.listdir(os.path.join(self.out, 'styles'))
+        self.assertIn('unused.css', styles)
+        self.assertNotIn('a.css', styles)
+
+    def test_fingerprint(self):
+        """ Changing a stylesheet changes the bundle name """
+        first = build(self.src, self.out)['bundles']
+        self.write('styles/b.css', 'a { color: blue; }\n')
+        self.assertNotEqual(build(self.src, self.out)['bundles'], first)
+
+    def test_precompressed(self):
+        """ Large text files get a .gz sibling with the same content """
+        report = build(self.src, self.out)
+        bundle = report['bundles'][0]
+        self.assertEqual(gzip.decompress(self.read(bundle + '.gz', 'rb')),
+                         self.read(bundle, 'rb'))
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.out, '1-index.html.gz')))
+        self.assertFalse(os.path.isfile(
+            os.path.join(self.out, 'styles/unused.css.gz')))
+
+    def test_report(self):
+        """ Per page bytes shrink with the build """
+        pages = build(self.src, self.out)['pages']
+        before, after, served = pages['1-index.html']
+        self.assertLess(after, before)
+        self.assertLess(served, after)
+
+    def test_reproducible(self):
+        """ Building twice gives identical files """
+        build(self.src, self.out)
+        first = manifest(self.out)
+        build(self.src, self.out)
+        self.assertEqual(manifest(self.out), first)
+
+    def test_rebuild(self):
+        """ Unchanged files are not written again, stale ones removed """
+        os.makedirs(os.path.join(self.src, 'fonts'))
+        self.write('fonts/old.txt', 'old')
+        self.write('notes.txt', 'kept')
+        first = build(self.src, self.out)['bundles'][0]
+        notes = os.path.join(self.out, 'notes.txt')
+        mtime = os.stat(notes).st_mtime_ns
+        self.write('styles/b.css', 'a { color: blue; }\n')
+        os.remove(os.path.join(self.src, 'fonts/old.txt'))
+        second = build(self.src, self.out)['bundles'][0]
+        built = list(walk(self.out))
+        self.assertEqual(os.stat(notes).st_mtime_ns, mtime)
+        self.assertIn(second, built)
+        for rel in [first, first + '.gz', 'fonts/old.txt']:
+            self.assertNotIn(rel, built)
+        self.assertFalse(os.path.exists(os.path.join(self.out, 'fonts')))
+        self.assertIn(second, self.read('1-index.html'))
+
+    def test_images(self):
+        """ Small images are inlined, large ones optimized and linked """
+        os.makedirs(os.path.join(self.src, 'images'))
+        with open(os.path.join(self.src, 'images/small.png'), 'wb') as f:
+            f.write(make_png(4, 4, b'a\0b'))
+        with open(os.path.join(self.src, 'images/large.png'), 'wb') as f:
+            f.write(make_png(64, 64, noise=64))
+        self.write('styles/b.css',
+                   'a { background: url("../images/small.png"); }\n'
+                   'b { background: url(../images/large.png) }\n')
+        report = build(self.src, self.out)
+        css = self.read(report['bundles'][0])
+        self.assertIn('url("data:image/png;base64,', css)
+        self.assertIn('url(../images/large.png)', css)
+        before, after, _ = report['images']['images/large.png']
+        self.assertLess(after, before)
+        self.assertEqual(len(self.read('images/large.png', 'rb')), after)
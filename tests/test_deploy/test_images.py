@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+""" Module for testing the web_static image stage """
+import base64
+import os
+import random
+import struct
+import tempfile
+import unittest
+import zlib
+from deploy import images
+from deploy.images import (chunks, data_uri, optimize_file, optimize_png,
+                           unfilter)
+
+
+def make_png(width=32, height=32, text=b'Comment\0' + b'x' * 200,
+             noise=0):
+    """ Returns an RGB gradient PNG stored without filters or compression,
+    with noise added to every channel from a fixed seed
+    """
+    rand = random.Random(0)
+    raw = b''.join(b'\0' + bytes((x * 8 + y + rand.randrange(noise + 1))
+                                 & 0xff for x in range(width)
+                                 for _ in range(3))
+                   for y in range(height))
+
+    def chunk(kind, body):
+        return (struct.pack('>I', len(body)) + kind + body +
+                struct.pack('>I', zlib.crc32(kind + body)))
+    return (images.SIGNATURE +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2,
+                                       0, 0, 0)) +
+            chunk(b'tEXt', text) +
+            chunk(b'IDAT', zlib.compress(raw, 0)) + chunk(b'IEND', b''))
+
+
+def pixels(data):
+    """ Returns the unfiltered rows of an 8 bit RGB PNG """
+    found = chunks(data)
+    width, height = struct.unpack('>II', found[0][1][:8])
+    raw = zlib.decompress(b''.join(b for k, b in found if k == b'IDAT'))
+    return [bytes(row) for row in unfilter(raw, height, width * 3, 3)]
+
+
+class test_optimize_png(unittest.TestCase):
+    """ Class to test lossless PNG recompression """
+
+    def test_lossless(self):
+        """ The optimized PNG is smaller with the same pixels """
+        data = make_png()
+        out = optimize_png(data)
+        self.assertLess(len(out), len(data))
+        self.assertEqual(pixels(out), pixels(data))
+
+    def test_metadata(self):
+        """ Text chunks are dropped """
+        kinds = [kind for kind, _ in chunks(optimize_png(make_png()))]
+        self.assertEqual(kinds, [b'IHDR', b'IDAT', b'IEND'])
+
+    def test_not_larger(self):
+        """ An optimal PNG is returned unchanged """
+        data = optimize_png(make_png())
+        self.assertEqual(optimize_png(data), data)
+
+    def test_invalid(self):
+        """ Data that is not a PNG raises ValueError """
+        with self.assertRaises(ValueError):
+            optimize_png(b'GIF89a')
+        with self.assertRaises(ValueError):
+            optimize_png(make_png()[:-20])
+
+
+class test_optimize_file(unittest.TestCase):
+    """ Class to test the cached image stage """
+
+    def setUp(self):
+        """ Writes a source PNG """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, 'a.png')
+        self.cache = os.path.join(self.tmp.name, 'cache')
+        with open(self.src, 'wb') as f:
+            f.write(make_png())
+
+    def tearDown(self):
+        """ Removes the temporary files """
+        self.tmp.cleanup()
+
+    def test_cached(self):
+        """ A second run reads the result from the cache """
+        out = os.path.join(self.tmp.name, 'out', 'a.png')
+        before, after, _ = optimize_file(self.src, out, self.cache)
+        self.assertLess(after, before)
+        cached, = os.listdir(self.cache)
+        with open(os.path.join(self.cache, cached), 'wb') as f:
+            f.write(b'from cache')
+        optimize_file(self.src, out, self.cache)
+        with open(out, 'rb') as f:
+            self.assertEqual(f.read(), b'from cache')
+
+    def test_not_png(self):
+        """ Files that do not parse are copied as they are """
+        with open(self.src, 'wb') as f:
+            f.write(b'\x89PNG broken')
+        out = os.path.join(self.tmp.name, 'b.png')
+        self.assertEqual(optimize_file(self.src, out, self.cache)[:2],
+                         [11, 11])
+
+    @unittest.skipIf(images.Image is None, "Pillow is not installed")
+    def test_webp(self):
+        """ A WebP sibling is written when it is smaller """
+        out = os.path.join(self.tmp.name, 'c.png')
+        webp = optimize_file(self.src, out, self.cache)[2]
+        if webp:
+            self.assertTrue(os.path.isfile(out + '.webp'))
+
+    def test_data_uri(self):
+        """ Images become base64 data URIs with their MIME type """
+        uri = data_uri(self.src)
+        self.assertTrue(uri.startswith('data:image/png;base64,'))
+        self.assertEqual(base64.b64decode(uri.split(',', 1)[1]),
+                         make_png())
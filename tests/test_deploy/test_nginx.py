@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+""" Module for testing the generated nginx server block """
+import io
+import os
+import re
+import shutil
+import subprocess
+import unittest
+from contextlib import redirect_stdout
+from deploy import nginx
+
+
+class test_nginx(unittest.TestCase):
+    """ Class to test the server block generator """
+
+    def setUp(self):
+        """ Generates the default server block """
+        self.config = nginx.server_block()
+
+    def test_valid(self):
+        """ The generated block is well formed """
+        self.assertEqual(nginx.check(self.config), [])
+
+    def test_directives(self):
+        """ The tuning directives are present """
+        for directive in ['sendfile on;', 'tcp_nopush on;',
+                          'gzip_static on;', 'open_file_cache max=']:
+            self.assertIn(directive, self.config)
+        self.assertIn('alias /data/web_static/current/;', self.config)
+        self.assertIn('location /hbnb_static/ {', self.config)
+
+    def test_cache_control(self):
+        """ Hashed bundles are immutable, HTML is revalidated """
+        self.assertIn(nginx.IMMUTABLE, self.config)
+        self.assertIn(nginx.HTML_CACHE, self.config)
+        hashed = re.compile(nginx.HASHED, re.I)
+        self.assertTrue(hashed.search('styles/bundle.0a1b2c3d4e.css'))
+        self.assertFalse(hashed.search('styles/4-common.css'))
+
+    def test_served_by(self):
+        """ Every location that sets headers repeats X-Served-By """
+        self.assertEqual(self.config.count('add_header X-Served-By'), 4)
+        self.assertNotIn('X-Served-By',
+                         nginx.server_block(served_by=''))
+
+    def test_parameters(self):
+        """ Port, paths and location are configurable """
+        config = nginx.server_block(8080, 'web-01', '/srv/current/',
+                                    '/static/', '/srv/www')
+        self.assertIn('listen 8080 default_server;', config)
+        self.assertIn('alias /srv/current/;', config)
+        self.assertIn('location = /static {', config)
+        self.assertIn('root /srv/www;', config)
+
+    def test_check_errors(self):
+        """ Missing semicolons and braces are reported """
+        self.assertEqual(len(nginx.check('server {\n listen 80\n')), 2)
+        self.assertEqual(len(nginx.check('}\n')), 1)
+        self.assertEqual(nginx.check('a "{ x";\n# b {\n'), [])
+
+    def test_main(self):
+        """ The command prints the block """
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(nginx.main(['--port', '81']), 0)
+        self.assertIn('listen 81 default_server;', out.getvalue())
+
+    def test_embed(self):
+        """ The setup script carries the current block, written as is """
+        script = os.path.join(os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(__file__)))),
+            '0-setup_web_static.sh')
+        with open(script) as f:
+            text = f.read()
+        self.assertEqual(nginx.embed(text, self.config), text)
+        heredoc = text[text.index('cat > '):text.index('\nNGINX\n') + 7]
+        heredoc = heredoc.replace('/tmp/hbnb_nginx.conf', '/dev/stdout', 1)
+        done = subprocess.run(['bash', '-c', heredoc], capture_output=True,
+                              text=True, check=True)
+        self.assertEqual(done.stdout, self.config)
+        with self.assertRaises(ValueError):
+            nginx.embed('#!/bin/bash\n', self.config)
+
+    @unittest.skipIf(shutil.which('nginx') is None, "nginx is not installed")
+    def test_nginx_accepts(self):
+        """ nginx -t accepts the generated block """
+        self.assertEqual(nginx.nginx_test(self.config), [])
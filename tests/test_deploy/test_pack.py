@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+""" Module for testing content-addressed packing of web_static """
+import os
+import tarfile
+import tempfile
+import unittest
+from deploy.pack import (FORMATS, detect, manifest, open_archive, pack,
+                         read_manifest, tree_hash, write_changed,
+                         zstd_available)
+
+
+class PackCase(unittest.TestCase):
+    """ Small tree shared by the pack tests """
+
+    def setUp(self):
+        """ Creates a small tree and an empty versions directory """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'web_static')
+        self.versions = os.path.join(self.tmp.name, 'versions')
+        os.makedirs(os.path.join(self.root, 'styles'))
+        self.write('index.html', '<html></html>')
+        self.write('styles/a.css', 'body {}')
+
+    def tearDown(self):
+        """ Removes the temporary files """
+        self.tmp.cleanup()
+
+    def write(self, rel, text):
+        """ Writes text to a file of the tree """
+        with open(os.path.join(self.root, rel), 'w') as f:
+            f.write(text)
+
+
+class test_pack(PackCase):
+    """ Class to test reproducible archives of a tree """
+
+    def test_layout(self):
+        """ Files are archived sorted under the tree directory """
+        path = pack(self.root, self.versions)
+        with tarfile.open(path) as tar:
+            self.assertEqual(tar.getnames(), [
+                'web_static', 'web_static/index.html', 'web_static/styles',
+                'web_static/styles/a.css'])
+            self.assertTrue(all(m.mtime == 0 for m in tar.getmembers()))
+
+    def test_reused(self):
+        """ An unchanged tree reuses its archive """
+        path = pack(self.root, self.versions)
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(pack(self.root, self.versions), path)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+    def test_reproducible(self):
+        """ Identical trees give identical bytes """
+        first = pack(self.root, self.versions)
+        with open(first, 'rb') as f:
+            data = f.read()
+        os.remove(first)
+        os.utime(os.path.join(self.root, 'index.html'), (1, 1))
+        second = pack(self.root, self.versions)
+        self.assertEqual(first, second)
+        with open(second, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_changed(self):
+        """ A changed file gives a new archive and manifest """
+        first = pack(self.root, self.versions)
+        self.write('styles/a.css', 'body { margin: 0 }')
+        second = pack(self.root, self.versions)
+        self.assertNotEqual(first, second)
+        files = read_manifest(second)['files']
+        self.assertEqual(files['styles/a.css'][0], 18)
+
+    def test_tree_hash(self):
+        """ The tree hash depends on paths and contents only """
+        files = manifest(self.root)
+        self.assertEqual(tree_hash(files), tree_hash(dict(
+            reversed(list(files.items())))))
+        self.assertEqual(read_manifest(pack(self.root, self.versions))
+                         ['tree'], tree_hash(files))
+
+    def test_hash_cache(self):
+        """ Files with the same size and mtime are not hashed again """
+        cache = {}
+        manifest(self.root, cache)
+        cache['index.html'][2] = 'cached'
+        self.assertEqual(manifest(self.root, cache)['index.html'][1],
+                         'cached')
+
+    def test_write_changed(self):
+        """ Files already holding the data keep their mtime """
+        path = os.path.join(self.root, 'new/page.html')
+        self.assertTrue(write_changed(path, b'one'))
+        os.utime(path, ns=(0, 0))
+        self.assertFalse(write_changed(path, b'one'))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(write_changed(path, b'two'))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'two')
+
+    def test_missing(self):
+        """ A missing tree raises OSError """
+        with self.assertRaises(OSError):
+            pack(os.path.join(self.tmp.name, 'nope'), self.versions)
+
+
+class test_formats(PackCase):
+    """ Class to test the archive formats """
+
+    def check(self, fmt):
+        """ Packs in fmt and checks the name, format and entries """
+        path = pack(self.root, self.versions, fmt)
+        self.assertTrue(path.endswith(FORMATS[fmt].ext))
+        self.assertEqual(detect(path), fmt)
+        with open_archive(path) as tar:
+            self.assertEqual([m.name for m in tar][-1],
+                             'web_static/styles/a.css')
+        self.assertEqual(read_manifest(path)['tree'],
+                         tree_hash(manifest(self.root)))
+        return path
+
+    def test_gz(self):
+        """ gzip is the default format """
+        self.assertEqual(detect(pack(self.root, self.versions)), 'gz')
+        self.check('gz')
+
+    def test_tar(self):
+        """ Uncompressed archives are plain tar files """
+        with tarfile.open(self.check('tar'), 'r:') as tar:
+            self.assertIn('web_static/index.html', tar.getnames())
+
+    @unittest.skipUnless(zstd_available(), "zstd is not installed")
+    def test_zst(self):
+        """ zstd archives are written and read back """
+        self.check('zst')
+
+    def test_same_tree(self):
+        """ Formats of one tree share the name and manifest """
+        gz = pack(self.root, self.versions, 'gz')
+        tar = pack(self.root, self.versions, 'tar')
+        self.assertEqual(gz.split('.')[0], tar.split('.')[0])
+
+    def test_unknown(self):
+        """ Unknown formats raise ValueError """
+        with self.assertRaises(ValueError):
+            pack(self.root, self.versions, 'rar')
+        path = os.path.join(self.tmp.name, 'x.bin')
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 600)
+        with self.assertRaises(ValueError):
+            detect(path)
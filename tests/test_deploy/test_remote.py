@@ -0,0 +1,192 @@
+#!/usr/bin/python3
+""" Module for testing releases on local host stand-ins """
+import os
+import tempfile
+import unittest
+from deploy.pack import pack
+from deploy.remote import (LocalHost, deploy_all, deploy_delta,
+                           deploy_host, release_name, release_script,
+                           remote_hashes)
+
+
+class DeployCase(unittest.TestCase):
+    """ Packed tree and local hosts shared by the deploy tests """
+
+    def setUp(self):
+        """ Packs a small tree and creates three hosts """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'web_static')
+        os.makedirs(os.path.join(self.root, 'styles'))
+        self.write('index.html', 'v1')
+        self.write('styles/a.css', 'body {}')
+        self.versions = os.path.join(self.tmp.name, 'versions')
+        self.archive = pack(self.root, self.versions)
+        self.hosts = [LocalHost(os.path.join(self.tmp.name, f'host{i}'))
+                      for i in range(3)]
+
+    def tearDown(self):
+        """ Removes the temporary files """
+        self.tmp.cleanup()
+
+    def write(self, rel, text):
+        """ Writes text to a file of the tree """
+        with open(os.path.join(self.root, rel), 'w') as f:
+            f.write(text)
+
+    def current(self, host, rel='index.html'):
+        """ Returns a file of the current release of host """
+        with open(host.path(f'/data/web_static/current/{rel}')) as f:
+            return f.read()
+
+
+class test_remote(DeployCase):
+    """ Class to test deploys to local directories """
+
+    def test_deploy_all(self):
+        """ Every host gets the release and a current link to it """
+        results = deploy_all(self.archive, self.hosts, parallel=2)
+        self.assertEqual([r.host for r in results],
+                         [h.name for h in self.hosts])
+        self.assertTrue(all(r.ok for r in results), results)
+        for host in self.hosts:
+            link = os.readlink(host.path('/data/web_static/current'))
+            self.assertEqual(os.path.basename(link),
+                             release_name(self.archive))
+            self.assertEqual(self.current(host, 'styles/a.css'), 'body {}')
+
+    def test_swap(self):
+        """ A second release replaces current and keeps the first """
+        host = self.hosts[0]
+        deploy_host(self.archive, host)
+        self.write('index.html', 'v2')
+        second = pack(self.root, self.versions)
+        self.assertTrue(deploy_host(second, host).ok)
+        self.assertEqual(self.current(host), 'v2')
+        releases = os.listdir(host.path('/data/web_static/releases'))
+        self.assertEqual(sorted(releases), sorted(
+            [release_name(self.archive), release_name(second)]))
+
+    def test_redeploy(self):
+        """ Deploying the live release again only relinks it """
+        host = self.hosts[0]
+        deploy_host(self.archive, host)
+        release = host.path('/data/web_static/releases/' +
+                            release_name(self.archive))
+        inode = os.stat(release).st_ino
+        self.assertTrue(deploy_host(self.archive, host).ok)
+        self.assertTrue(deploy_delta(self.archive, host).ok)
+        self.assertEqual(os.stat(release).st_ino, inode)
+        self.assertEqual(self.current(host), 'v1')
+        self.assertEqual(os.listdir(os.path.dirname(release)),
+                         [release_name(self.archive)])
+
+    def test_formats(self):
+        """ Hosts unpack archives of every format they can read """
+        host = self.hosts[0]
+        for fmt in ['tar', 'gz']:
+            self.write('index.html', fmt)
+            result = deploy_host(pack(self.root, self.versions, fmt), host)
+            self.assertTrue(result.ok, result.error)
+            self.assertEqual(self.current(host), fmt)
+
+    def test_failure(self):
+        """ A broken archive fails its host and leaves current alone """
+        host = self.hosts[0]
+        deploy_host(self.archive, host)
+        broken = os.path.join(self.tmp.name, 'broken.tgz')
+        with open(broken, 'wb') as f:
+            f.write(b'not an archive')
+        result = deploy_host(broken, host)
+        self.assertFalse(result.ok)
+        self.assertTrue(result.error)
+        self.assertEqual(self.current(host), 'v1')
+
+    def test_script_from_file(self):
+        """ A script releasing an uploaded file removes it afterwards """
+        host = self.hosts[0]
+        upload = host.path('/tmp/archive.tgz')
+        os.makedirs(os.path.dirname(upload))
+        with open(self.archive, 'rb') as src, open(upload, 'wb') as dst:
+            dst.write(src.read())
+        done = host.run(release_script(
+            'r1', host.path('/data/web_static'), upload))
+        self.assertEqual(done.returncode, 0, done.stderr)
+        self.assertFalse(os.path.exists(upload))
+        self.assertEqual(self.current(host), 'v1')
+
+
+class test_delta(DeployCase):
+    """ Class to test deploys sending only changed files """
+
+    def releases(self, host):
+        """ Returns the release names of host """
+        return sorted(os.listdir(host.path('/data/web_static/releases')))
+
+    def test_first(self):
+        """ Without a current release every file is sent """
+        host = self.hosts[0]
+        result = deploy_delta(self.archive, host)
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(self.current(host, 'styles/a.css'), 'body {}')
+        self.assertEqual(len(remote_hashes(host)), 2)
+
+    def test_changed_only(self):
+        """ Unchanged files are hardlinked, changed ones replaced """
+        host = self.hosts[0]
+        deploy_host(self.archive, host)
+        first = host.path('/data/web_static/releases/'
+                          f'{release_name(self.archive)}/index.html')
+        self.write('index.html', 'v2')
+        self.write('new.html', 'new')
+        os.remove(os.path.join(self.root, 'styles/a.css'))
+        second = pack(self.root, self.versions)
+        full = deploy_host(second, self.hosts[1])
+        result = deploy_delta(second, host)
+        self.assertTrue(result.ok, result.error)
+        self.assertLess(result.sent, full.sent)
+        self.assertEqual(self.current(host), 'v2')
+        self.assertEqual(self.current(host, 'new.html'), 'new')
+        current = host.path('/data/web_static/current')
+        self.assertFalse(os.path.exists(os.path.join(current, 'styles')))
+        with open(first) as f:
+            self.assertEqual(f.read(), 'v1')
+
+    def test_hardlinks(self):
+        """ Files of the new release share inodes with the old one """
+        host = self.hosts[0]
+        deploy_host(self.archive, host)
+        self.write('index.html', 'v2')
+        second = pack(self.root, self.versions)
+        deploy_delta(second, host)
+        base = host.path('/data/web_static/releases')
+        old = os.stat(os.path.join(base, release_name(self.archive),
+                                   'styles/a.css'))
+        new = os.stat(os.path.join(base, release_name(second),
+                                   'styles/a.css'))
+        self.assertEqual(old.st_ino, new.st_ino)
+
+    def test_keep(self):
+        """ Only the newest releases are kept """
+        host = self.hosts[0]
+        names = []
+        for i in range(4):
+            self.write('index.html', f'v{i}')
+            archive = pack(self.root, self.versions)
+            names.append(release_name(archive))
+            self.assertTrue(deploy_delta(archive, host, keep=2).ok)
+        self.assertEqual(self.releases(host), sorted(names[2:]))
+        self.assertEqual(self.current(host), 'v3')
+
+    def test_from_tar(self):
+        """ Deltas are built from archives of any format """
+        host = self.hosts[0]
+        deploy_host(self.archive, host)
+        self.write('index.html', 'v2')
+        result = deploy_delta(pack(self.root, self.versions, 'tar'), host)
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(self.current(host), 'v2')
+
+    def test_deploy_all(self):
+        """ Delta deploys run on every host """
+        results = deploy_all(self.archive, self.hosts, delta=True)
+        self.assertTrue(all(r.ok for r in results), results)
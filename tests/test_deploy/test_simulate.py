@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+""" Module for testing the local deploy simulation """
+import os
+import sys
+import tempfile
+import unittest
+from deploy.remote import LocalHost, release_script
+from deploy.simulate import FabricApi, compare, localize, simulate
+
+FABFILE = os.path.join(os.path.dirname(__file__), '..', '..',
+                       '3-deploy_web_static.py')
+
+
+class test_simulate(unittest.TestCase):
+    """ Class to test fabfiles run against local hosts """
+
+    def setUp(self):
+        """ Creates a small web_static """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, 'web_static')
+        os.makedirs(os.path.join(self.source, 'styles'))
+        with open(os.path.join(self.source, '0-index.html'), 'w') as f:
+            f.write('<link rel="stylesheet" href="styles/a.css">\n')
+        with open(os.path.join(self.source, 'styles', 'a.css'), 'w') as f:
+            f.write('body { margin: 0; }\n')
+
+    def tearDown(self):
+        """ Removes the temporary files """
+        self.tmp.cleanup()
+
+    def test_localize(self):
+        """ Server paths are mapped into the host, others are kept """
+        host = LocalHost('/h')
+        self.assertEqual(localize(host, 'tar -xf /tmp/a.tgz -C /data/x'),
+                         'tar -xf /h/tmp/a.tgz -C /h/data/x')
+        self.assertEqual(localize(host, 'base="/data/w" a=/tmp/b'),
+                         'base="/h/data/w" a=/h/tmp/b')
+        self.assertEqual(localize(host, 'mv "$r.tmp" /x/tmp/y'),
+                         'mv "$r.tmp" /x/tmp/y')
+
+    def test_phases(self):
+        """ Release scripts are timed per marked phase """
+        root = os.path.join(self.tmp.name, 'host')
+        api = FabricApi([LocalHost(root, 'web')])
+        api.env.host_string = 'web'
+        out = api.run('echo hi\n# phase one\ntrue\n# phase two\n')
+        self.assertFalse(out.failed)
+        self.assertEqual(out, 'hi')
+        self.assertEqual(sorted(api.phases), ['one', 'start', 'two'])
+        self.assertTrue(api.run(release_script(
+            'r', source='/tmp/missing.tgz')).failed)
+        self.assertIn('unpack', api.phases)
+
+    def test_report(self):
+        """ Every task runs on every host and round """
+        report = simulate(FABFILE, hosts=2, rounds=2, source=self.source)
+        tasks = report['tasks']
+        self.assertEqual(list(tasks), ['do_pack', 'do_deploy', 'deploy'])
+        self.assertEqual([len(tasks[t]['runs']) for t in tasks], [2, 4, 4])
+        self.assertTrue(all(tasks[t]['ok'] for t in tasks))
+        self.assertGreater(report['archive_bytes'], 0)
+        for phase in ['upload', 'unpack', 'relink']:
+            self.assertIn(phase, tasks['do_deploy']['summary'])
+        self.assertIn('pack', tasks['deploy']['summary'])
+        self.assertNotIn('fabric', sys.modules)
+
+    def test_compare(self):
+        """ Failures and slower phases are regressions """
+        def report(seconds, ok=True):
+            return {'tasks': {'deploy': {'ok': ok, 'summary': {
+                'unpack': {'median': seconds, 'max': seconds}}}}}
+        self.assertEqual(compare(report(0.1), report(0.1)), [])
+        self.assertEqual(compare(report(0.102), report(0.1)), [])
+        self.assertEqual(len(compare(report(0.2), report(0.1))), 1)
+        self.assertEqual(compare(report(0.002), report(0.001)), [])
+        self.assertEqual(compare(report(0.1, False), report(0.1)),
+                         ['deploy: failed'])
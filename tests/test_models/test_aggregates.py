@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+""" Module for testing the aggregates of places and reviews """
+import unittest
+from models.aggregates import Aggregates, Summary
+from models.city import City
+from models.place import Place
+from models.review import Review
+
+
+class test_summary(unittest.TestCase):
+    """ Class to test the summary of one attribute """
+
+    def test_add_remove(self):
+        """ Removing the smallest or largest value finds the next one """
+        summary = Summary()
+        for value in [5, 1, 9, 1]:
+            summary.add(value)
+        self.assertEqual(summary.as_dict(),
+                         {'sum': 16, 'min': 1, 'max': 9, 'mean': 4.0})
+        summary.remove(9)
+        summary.remove(1)
+        self.assertEqual(summary.as_dict(),
+                         {'sum': 6, 'min': 1, 'max': 5, 'mean': 3.0})
+        summary.remove(1)
+        summary.remove(5)
+        self.assertEqual(summary.as_dict(),
+                         {'sum': 0, 'min': None, 'max': None, 'mean': None})
+
+
+class test_aggregates(unittest.TestCase):
+    """ Class to test aggregates maintained object by object """
+
+    def setUp(self):
+        """ Builds aggregates over two cities of one state """
+        self.city = City(name='Lagos', state_id='s1')
+        self.other = City(name='Abuja', state_id='s1')
+        self.places = [Place(city_id=self.city.id, price_by_night=100),
+                       Place(city_id=self.city.id, price_by_night=50),
+                       Place(city_id=self.other.id, price_by_night=30)]
+        self.review = Review(place_id=self.places[0].id, text='ok')
+        self.aggregates = Aggregates()
+        self.aggregates.build([self.city, self.other, self.review] +
+                              self.places)
+
+    def test_build(self):
+        """ Places are grouped by city and state, reviews by place """
+        city = self.aggregates.get('city', self.city.id)
+        self.assertEqual(city['count'], 2)
+        self.assertEqual(city['price_by_night'],
+                         {'sum': 150, 'min': 50, 'max': 100, 'mean': 75.0})
+        state = self.aggregates.get('state', 's1')
+        self.assertEqual(state['count'], 3)
+        self.assertEqual(state['price_by_night']['min'], 30)
+        self.assertEqual(self.aggregates.get('place', self.places[0].id),
+                         {'count': 1})
+        self.assertEqual(self.aggregates.get('city', 'none')['count'], 0)
+        self.assertEqual(set(self.aggregates.all('city')),
+                         {self.city.id, self.other.id})
+        with self.assertRaises(KeyError):
+            self.aggregates.get('user', 'u1')
+
+    def test_changed(self):
+        """ Updates and deletes move objects between groups """
+        place = self.places[0]
+        place.price_by_night = 10
+        place.city_id = self.other.id
+        self.aggregates.changed('update', place)
+        city = self.aggregates.get('city', self.city.id)
+        self.assertEqual((city['count'], city['price_by_night']['sum']),
+                         (1, 50))
+        other = self.aggregates.get('city', self.other.id)
+        self.assertEqual(other['price_by_night']['min'], 10)
+        self.assertEqual(self.aggregates.get('state', 's1')['count'], 3)
+        self.aggregates.changed('delete', self.places[1])
+        self.assertNotIn(self.city.id, self.aggregates.all('city'))
+        self.aggregates.changed('delete', self.review)
+        self.assertEqual(self.aggregates.all('place'), {})
+        self.aggregates.changed('save')
+        self.assertFalse(self.aggregates.stale)
+
+    def test_stale(self):
+        """ Moving a city with places, or a bare save, needs a rebuild """
+        self.aggregates.changed('new', City(state_id='s2'))
+        self.assertFalse(self.aggregates.stale)
+        self.city.state_id = 's2'
+        self.aggregates.changed('update', self.city)
+        self.assertTrue(self.aggregates.stale)
+        self.aggregates.build([self.city, self.other] + self.places)
+        self.assertEqual(self.aggregates.get('state', 's2')['count'], 2)
+        self.aggregates.changed('save')
+        self.assertTrue(self.aggregates.stale)
+
+    def test_not_numbers(self):
+        """ Values that are not numbers are left out of the summaries """
+        place = Place(city_id='c9')
+        place.price_by_night = 'cheap'
+        self.aggregates.changed('new', place)
+        city = self.aggregates.get('city', 'c9')
+        self.assertEqual(city['count'], 1)
+        self.assertIsNone(city['price_by_night']['mean'])
@@ -107,3 +107,221 @@ class test_fileStorage(unittest.TestCase):
         from models.engine.file_storage import FileStorage
         print(type(storage))
         self.assertEqual(type(storage), FileStorage)
+
+    def test_batch_defers_save(self):
+        """ Saves inside a batch are written once on commit """
+        storage.begin()
+        new = BaseModel()
+        new.save()
+        self.assertFalse(os.path.exists('file.json'))
+        storage.commit()
+        self.assertTrue(os.path.exists('file.json'))
+
+    def test_batch_rollback(self):
+        """ Rollback restores the objects last saved to file """
+        kept = BaseModel()
+        kept.save()
+        storage.begin()
+        dropped = BaseModel()
+        dropped.save()
+        storage.rollback()
+        ids = [obj.id for obj in storage.all().values()]
+        self.assertEqual(ids, [kept.id])
+
+    def test_count(self):
+        """ Objects are counted per class and in total """
+        from models.state import State
+        BaseModel().save()
+        BaseModel().save()
+        State().save()
+        self.assertEqual(storage.count(), 3)
+        self.assertEqual(storage.count(BaseModel), 2)
+        self.assertEqual(storage.count('State'), 1)
+        self.assertEqual(storage.count('City'), 0)
+
+    def test_get(self):
+        """ Objects are found by class and id """
+        new = BaseModel()
+        new.save()
+        self.assertIs(storage.get(BaseModel, new.id), new)
+        self.assertIs(storage.get('BaseModel', new.id), new)
+        self.assertIsNone(storage.get('State', new.id))
+
+    def test_all_cls(self):
+        """ all(cls) only returns objects of cls """
+        from models.state import State
+        BaseModel().save()
+        state = State()
+        state.save()
+        self.assertEqual(list(storage.all(State).values()), [state])
+
+    def test_delete(self):
+        """ Deleted objects leave storage and the class counts """
+        new = BaseModel()
+        new.save()
+        storage.delete(new)
+        self.assertIsNone(storage.get(BaseModel, new.id))
+        self.assertEqual(storage.count(BaseModel), 0)
+
+    def test_update_where(self):
+        """ Matching objects are updated and counted """
+        from models.place import Place
+        first = Place(city_id='a')
+        first.save()
+        second = Place(city_id='b')
+        second.save()
+        count = storage.update_where(Place, {'city_id': 'a'},
+                                     {'price_by_night': 120})
+        self.assertEqual(count, 1)
+        self.assertEqual(first.price_by_night, 120)
+        self.assertNotEqual(second.price_by_night, 120)
+        self.assertEqual(storage.update_where('Place', {'city_id': 'c'},
+                                              {'max_guest': 1}), 0)
+        for attr in ['id', 'created_at', '__class__']:
+            with self.assertRaises(ValueError):
+                storage.update_where(Place, {'city_id': 'a'}, {attr: 'x'})
+        self.assertIs(storage.get(Place, first.id), first)
+
+    def test_one_object_per_line(self):
+        """ Objects are saved one per line """
+        BaseModel().save()
+        BaseModel().save()
+        with open('file.json', 'r') as f:
+            lines = f.read().split('\n')
+        self.assertEqual(lines[0], '{')
+        self.assertEqual(lines[-1], '}')
+        self.assertEqual(len(lines), 4)
+
+    def test_reload_parallel(self):
+        """ Objects decoded by several processes match a serial reload """
+        from models.engine import file_storage
+        from models.place import Place
+        ids = set()
+        for i in range(50):
+            new = Place(name='place {}'.format(i), price_by_night=i)
+            new.save()
+            ids.add(new.id)
+        min_bytes = file_storage.PARALLEL_MIN_BYTES
+        file_storage.PARALLEL_MIN_BYTES = 0
+        try:
+            self.setUp()
+            storage.reload(workers=2)
+        finally:
+            file_storage.PARALLEL_MIN_BYTES = min_bytes
+        places = storage.all(Place)
+        self.assertEqual({obj.id for obj in places.values()}, ids)
+        for obj in places.values():
+            self.assertEqual(obj.name, 'place {}'.format(obj.price_by_night))
+            self.assertIs(storage.get(Place, obj.id), obj)
+
+    def test_listeners(self):
+        """ Listeners are told of every change """
+        events = []
+
+        def listener(event, obj):
+            events.append((event, obj))
+        storage.add_listener(listener)
+        try:
+            new = BaseModel()
+            new.save()
+            new.save()
+            storage.delete(new)
+        finally:
+            storage.remove_listener(listener)
+        BaseModel().save()
+        self.assertEqual(events, [('new', new), ('save', None),
+                                  ('update', new), ('save', None),
+                                  ('delete', new)])
+
+    def test_refresh(self):
+        """ Changes made to the file by others are reloaded """
+        new = BaseModel()
+        new.save()
+        self.assertFalse(storage.refresh())
+        with open('file.json', 'w') as f:
+            f.write('{}')
+        self.assertTrue(storage.refresh())
+        self.assertEqual(storage.all(), {})
+
+    def test_search(self):
+        """ Search follows the changes made through storage """
+        from models.place import Place
+        from models.engine.file_storage import FileStorage
+        index = FileStorage._FileStorage__index
+        if index is not None:
+            index.stale = True
+        self.addCleanup(lambda: os.path.exists('file.json.index') and
+                        os.remove('file.json.index'))
+        self.addCleanup(lambda: setattr(FileStorage._FileStorage__index,
+                                        'stale', True))
+        loft = Place(name='Sunny loft', description='wifi')
+        loft.save()
+        cave = Place(name='Dark cave', description='no wifi')
+        cave.save()
+        self.assertEqual([obj for obj, _ in storage.search('loft wifi')],
+                         [loft, cave])
+        cave.name = 'Lofty cave'
+        cave.save()
+        self.assertEqual(storage.search('lofty')[0][0], cave)
+        storage.delete(loft)
+        storage.save()
+        self.assertEqual(storage.search('loft'), [])
+        self.assertEqual(storage.search('wifi', 'Review'), [])
+        index = FileStorage._FileStorage__index
+        index.stale = True
+        self.assertTrue(index.load('file.json.index',
+                                   FileStorage._FileStorage__stamp))
+
+    def test_search_batch(self):
+        """ Search inside a batch finds objects not saved to file yet """
+        from models.place import Place
+        from models.engine.file_storage import FileStorage
+        self.addCleanup(lambda: os.path.exists('file.json.index') and
+                        os.remove('file.json.index'))
+        self.addCleanup(lambda: setattr(FileStorage._FileStorage__index,
+                                        'stale', True))
+        house = Place(name='Beach house')
+        house.save()
+        storage.search('beach')
+        FileStorage._FileStorage__index.stale = True
+        storage.begin()
+        self.addCleanup(storage.rollback)
+        villa = Place(name='Beach villa')
+        villa.save()
+        self.assertEqual({obj for obj, _ in storage.search('beach')},
+                         {house, villa})
+        storage.rollback()
+        FileStorage._FileStorage__index.stale = True
+        self.assertEqual([obj.id for obj, _ in storage.search('beach')],
+                         [house.id])
+
+    def test_aggregate(self):
+        """ Aggregates follow the changes made through storage """
+        from models.city import City
+        from models.place import Place
+        from models.engine.file_storage import FileStorage
+        aggregates = FileStorage._FileStorage__aggregates
+        if aggregates is not None:
+            aggregates.stale = True
+        self.addCleanup(lambda: setattr(FileStorage._FileStorage__aggregates,
+                                        'stale', True))
+        city = City(name='Kano', state_id='s1')
+        city.save()
+        cheap = Place(city_id=city.id, price_by_night=40)
+        cheap.save()
+        dear = Place(city_id=city.id, price_by_night=200)
+        dear.save()
+        self.assertEqual(storage.aggregate('city', city.id)['count'], 2)
+        self.assertEqual(storage.aggregate('state', 's1')['price_by_night'],
+                         {'sum': 240, 'min': 40, 'max': 200, 'mean': 120.0})
+        dear.price_by_night = 100
+        dear.save()
+        storage.delete(cheap)
+        storage.save()
+        aggregates = FileStorage._FileStorage__aggregates
+        self.assertFalse(aggregates.stale)
+        self.assertEqual(storage.aggregate('city', city.id)['price_by_night'],
+                         {'sum': 100, 'min': 100, 'max': 100, 'mean': 100.0})
+        self.assertEqual(list(storage.aggregate('state')), ['s1'])
+        with self.assertRaises(KeyError):
+            storage.aggregate('user')
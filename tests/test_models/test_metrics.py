@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+""" Module for testing storage metrics """
+import unittest
+from models import metrics
+from models import storage
+from models.metrics import Histogram
+
+
+class test_histogram(unittest.TestCase):
+    """ Class to test latency histograms """
+
+    def test_empty(self):
+        """ An empty histogram reports zeros """
+        hist = Histogram()
+        self.assertEqual(hist.count, 0)
+        self.assertEqual(hist.mean, 0.0)
+        self.assertEqual(hist.quantile(0.5), 0.0)
+
+    def test_observe(self):
+        """ Observations are counted into buckets """
+        hist = Histogram()
+        for value in (0.0002, 0.0002, 0.003, 20.0):
+            hist.observe(value)
+        self.assertEqual(hist.count, 4)
+        self.assertEqual(hist.max, 20.0)
+        self.assertAlmostEqual(hist.mean, 5.00085)
+        self.assertEqual(hist.quantile(0.5), 0.00025)
+        self.assertEqual(hist.quantile(0.75), 0.005)
+        self.assertEqual(hist.quantile(1.0), 20.0)
+        self.assertEqual(sum(hist.buckets), 4)
+
+
+class test_counters(unittest.TestCase):
+    """ Class to test storage call counters """
+
+    def test_counted(self):
+        """ Storage methods count their calls """
+        before = metrics.counters['calls.count']
+        storage.count()
+        self.assertEqual(metrics.counters['calls.count'], before + 1)
+
+    def test_storage(self):
+        """ Saves record their duration and bytes, relations their reads """
+        import os
+        from models.state import State
+        self.addCleanup(lambda: os.path.exists('file.json') and
+                        os.remove('file.json'))
+        state = State(name='Oyo')
+        storage.new(state)
+        self.addCleanup(storage.delete, state)
+        saves = metrics.histograms.get('seconds.save', Histogram()).count
+        written = metrics.histograms.get('bytes.save', Histogram()).sum
+        reads = metrics.counters['relations.State.cities']
+        storage.save()
+        state.cities
+        self.assertEqual(metrics.histograms['seconds.save'].count, saves + 1)
+        self.assertEqual(metrics.histograms['bytes.save'].sum,
+                         written + os.path.getsize('file.json'))
+        self.assertEqual(metrics.counters['relations.State.cities'],
+                         reads + 1)
+        self.assertGreaterEqual(
+            metrics.snapshot()['gauges']['objects.State'], 1)
+
+
+class test_export(unittest.TestCase):
+    """ Class to test the snapshot and the Prometheus text format """
+
+    def setUp(self):
+        """ Starts from empty metrics, restored after the test """
+        counters = metrics.counters.copy()
+        histograms = dict(metrics.histograms)
+        self.addCleanup(metrics.histograms.update, histograms)
+        self.addCleanup(metrics.counters.update, counters)
+        self.addCleanup(metrics.reset)
+        metrics.reset()
+
+    def test_snapshot(self):
+        """ Cache hit ratios are computed from hits and misses """
+        metrics.counters['cache_hits.api'] += 3
+        metrics.counters['cache_misses.api'] += 1
+        metrics.observe('seconds.save', 0.002)
+        snap = metrics.snapshot()
+        self.assertEqual(snap['gauges']['cache_hit_ratio.api'], 0.75)
+        self.assertEqual(snap['histograms']['seconds.save']['count'], 1)
+
+    def test_prometheus(self):
+        """ Families get HELP and TYPE lines and cumulative buckets """
+        metrics.counters['calls.save'] += 2
+        metrics.counters['relations.Place.reviews'] += 1
+        metrics.counters['odd'] += 1
+        metrics.observe('bytes.save', 5000, Histogram.BYTES)
+        lines = metrics.prometheus().splitlines()
+        self.assertIn('# TYPE hbnb_storage_calls_total counter', lines)
+        self.assertIn('hbnb_storage_calls_total{method="save"} 2', lines)
+        self.assertIn('hbnb_relationship_calls_total'
+                      '{relation="Place.reviews"} 1', lines)
+        self.assertIn('hbnb_odd_total 1', lines)
+        self.assertIn('# TYPE hbnb_storage_save_bytes histogram', lines)
+        self.assertIn('hbnb_storage_save_bytes_bucket'
+                      '{method="save",le="4096.0"} 0', lines)
+        self.assertIn('hbnb_storage_save_bytes_bucket'
+                      '{method="save",le="+Inf"} 1', lines)
+        self.assertIn('hbnb_storage_save_bytes_count{method="save"} 1',
+                      lines)
+
+    def test_exporter(self):
+        """ The exporter writes the text file, and once more on stop """
+        import os
+        import tempfile
+        import time
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'hbnb.prom')
+            exporter = metrics.Exporter(path, interval=0.01).start()
+            metrics.counters['calls.save'] += 1
+            deadline = time.time() + 5
+            while not os.path.exists(path) and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(os.path.exists(path))
+            metrics.counters['calls.save'] += 1
+            exporter.stop()
+            with open(path) as f:
+                self.assertIn('hbnb_storage_calls_total{method="save"} 2',
+                              f.read())
+            self.assertEqual(os.listdir(tmp), ['hbnb.prom'])
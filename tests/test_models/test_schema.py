@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+""" Module for testing the compiled model schemas """
+import unittest
+from datetime import datetime
+import models
+from models.base_model import BaseModel
+from models.place import Place
+from models.user import User
+from models.schema import get_schema
+
+
+class test_schema(unittest.TestCase):
+    """ Class to test per-class schema coercion """
+
+    def test_cached(self):
+        """ Schemas are compiled once per class """
+        self.assertIs(get_schema(Place), get_schema(Place))
+        self.assertIsNot(get_schema(Place), get_schema(User))
+
+    def test_columns(self):
+        """ Coercers follow the Column types """
+        schema = get_schema(Place)
+        self.assertEqual(schema.coerce('number_rooms', '3'), 3)
+        self.assertEqual(schema.coerce('latitude', 3), 3.0)
+        self.assertIs(type(schema.coerce('latitude', 3)), float)
+        self.assertEqual(schema.coerce('name', 12), '12')
+
+    def test_datetime(self):
+        """ Isoformat strings become datetimes """
+        now = datetime.utcnow()
+        schema = get_schema(BaseModel)
+        self.assertEqual(schema.coerce('created_at', now.isoformat()), now)
+        self.assertIs(schema.coerce('created_at', now), now)
+
+    def test_base_attributes(self):
+        """ Attributes declared by BaseModel are in every schema """
+        schema = get_schema(User)
+        self.assertIn('email', schema.coercers)
+        self.assertIn('created_at', schema.coercers)
+
+    def test_unknown_and_none(self):
+        """ Unknown attributes and None pass through """
+        schema = get_schema(Place)
+        self.assertEqual(schema.coerce('nickname', '3'), '3')
+        self.assertIsNone(schema.coerce('latitude', None))
+
+    def test_invalid(self):
+        """ Invalid values raise ValueError """
+        schema = get_schema(Place)
+        with self.assertRaises(ValueError):
+            schema.coerce('price_by_night', 'abc')
+
+    @unittest.skipIf(models.storage_t != 'db', "lengths come from Columns")
+    def test_length(self):
+        """ Strings longer than their Column raise ValueError """
+        with self.assertRaises(ValueError):
+            get_schema(Place).coerce('name', 'x' * 129)
+
+    def test_coerce_dict(self):
+        """ Every declared attribute of a dict is cast """
+        values = get_schema(Place).coerce_dict(
+            {'max_guest': '2', 'longitude': '1.5', '__class__': 'Place'})
+        self.assertEqual(values, {'max_guest': 2, 'longitude': 1.5,
+                                  '__class__': 'Place'})
+
+    def test_kwargs_native(self):
+        """ Models built from kwargs store native types """
+        place = Place(price_by_night='120', latitude='1.25')
+        self.assertEqual(place.price_by_night, 120)
+        self.assertEqual(place.latitude, 1.25)
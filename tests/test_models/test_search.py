@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+""" Module for testing the full-text search index """
+import os
+import tempfile
+import unittest
+from models.place import Place
+from models.review import Review
+from models.search import SearchIndex, document, tokenize
+
+
+class test_search_index(unittest.TestCase):
+    """ Class to test indexing and BM25 ranking """
+
+    def setUp(self):
+        """ Indexes a few documents """
+        self.index = SearchIndex()
+        self.index.add('Place.1', 'Sunny loft with wifi and a kitchen')
+        self.index.add('Place.2', 'Dark cave, no wifi')
+        self.index.add('Review.3', 'The kitchen was great, great stay')
+        self.index.stale = False
+
+    def test_tokenize(self):
+        """ Words are lowercased and split on punctuation """
+        self.assertEqual(tokenize('Wi-Fi, KITCHEN  loft_2'),
+                         ['wi', 'fi', 'kitchen', 'loft_2'])
+
+    def test_document(self):
+        """ Only places and reviews are indexed """
+        place = Place(name='Loft', description='Big')
+        self.assertEqual(document(place), 'Loft Big')
+        self.assertEqual(document(Review(text='Nice')), 'Nice')
+        self.assertIsNone(document(object()))
+
+    def test_ranking(self):
+        """ Documents matching more and rarer terms rank first """
+        keys = [key for key, _ in self.index.search('wifi kitchen')]
+        self.assertEqual(keys[0], 'Place.1')
+        self.assertEqual(set(keys), {'Place.1', 'Place.2', 'Review.3'})
+        self.assertEqual(self.index.search('nothing'), [])
+        self.assertEqual(len(self.index.search('wifi kitchen', limit=1)), 1)
+
+    def test_class(self):
+        """ Results can be limited to one class """
+        self.assertEqual([k for k, _ in self.index.search('kitchen',
+                                                          cls='Review')],
+                         ['Review.3'])
+
+    def test_replace_remove(self):
+        """ Adding a key again replaces its document """
+        self.index.add('Place.2', 'Bright kitchen')
+        self.index.remove('Review.3')
+        self.index.remove('missing')
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual({k for k, _ in self.index.search('kitchen')},
+                         {'Place.1', 'Place.2'})
+        self.assertEqual(self.index.search('cave'), [])
+
+    def test_compact(self):
+        """ Compacting keeps the ranking """
+        for i in range(100):
+            self.index.add(f'Review.x{i}', 'filler words')
+        before = self.index.search('wifi kitchen')
+        for i in range(100):
+            self.index.remove(f'Review.x{i}')
+        self.assertLess(len(self.index.keys), 100)
+        after = self.index.search('wifi kitchen')
+        self.assertEqual([k for k, _ in after], [k for k, _ in before])
+
+    def test_save_load(self):
+        """ A saved index is read back only with the same stamp """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'file.json.index')
+            self.index.save(path, (1, 2))
+            loaded = SearchIndex()
+            self.assertFalse(loaded.load(path, (1, 3)))
+            self.assertTrue(loaded.stale)
+            self.assertTrue(loaded.load(path, (1, 2)))
+            self.assertEqual(loaded.search('wifi'), self.index.search('wifi'))
+            self.assertFalse(loaded.load(os.path.join(tmp, 'none'), (1, 2)))
+
+    def test_changed(self):
+        """ Storage events update the index """
+        place = Place(name='Castle')
+        self.index.changed('new', place)
+        self.index.changed('save')
+        self.assertEqual(self.index.search('castle')[0][0],
+                         f'Place.{place.id}')
+        self.index.changed('delete', place)
+        self.assertEqual(self.index.search('castle'), [])
+        self.index.changed('save')
+        self.assertFalse(self.index.stale)
+        self.index.changed('save')
+        self.assertTrue(self.index.stale)
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+""" Module for testing the places page renderer """
+import os
+import unittest
+from datetime import datetime
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+from render.places import PlacesPage, _date
+
+
+class test_places_page(unittest.TestCase):
+    """ Class to test rendering the places page from storage """
+
+    def setUp(self):
+        """ Fills storage with one place of each kind of object """
+        storage._FileStorage__objects.clear()
+        state = State(name='California')
+        city = City(name='San Francisco', state_id=state.id)
+        self.owner = User(first_name='John', last_name='Lennon')
+        self.wifi = Amenity(name='Wifi')
+        self.place = Place(name='My <home>', city_id=city.id,
+                           user_id=self.owner.id, price_by_night=80,
+                           max_guest=2, number_rooms=1, number_bathrooms=1)
+        self.place.amenity_ids = [self.wifi.id]
+        self.other = Place(name='Tiny house', user_id=self.owner.id,
+                           max_guest=4)
+        self.review = Review(place_id=self.place.id, user_id=self.owner.id,
+                             text='Wow')
+        for obj in [state, city, self.owner, self.wifi, self.place,
+                    self.other, self.review]:
+            storage.new(obj)
+        self.page = PlacesPage()
+
+    def tearDown(self):
+        """ Removes the storage file """
+        try:
+            os.remove('file.json')
+        except Exception:
+            pass
+
+    def test_content(self):
+        """ The page shows the objects in storage """
+        html = self.page.render()
+        for text in ['<h2>California</h2>', '<h4>San Francisco</h4>',
+                     '<h4>Wifi</h4>', 'My &lt;home&gt;', '$80', '2 Guests',
+                     '1 Bedroom', '1 Bathroom', '<b>Owner</b>: John Lennon',
+                     '<div class="wifi_icon"></div>Wifi', 'From John Lennon',
+                     '<p class="review_text">Wow</p>']:
+            self.assertIn(text, html)
+        self.assertLess(html.index('My &lt;home&gt;'),
+                        html.index('Tiny house'))
+
+    def test_unchanged(self):
+        """ A second render reuses every fragment """
+        first = self.page.render()
+        misses = self.page.misses
+        self.assertEqual(self.page.render(), first)
+        self.assertEqual(self.page.misses, misses)
+
+    def test_one_place(self):
+        """ Changing a place renders only its card """
+        self.page.render()
+        misses = self.page.misses
+        self.other.name = 'Big house'
+        self.other.save()
+        html = self.page.render()
+        self.assertEqual(self.page.misses, misses + 1)
+        self.assertIn('Big house', html)
+        self.assertEqual(html, PlacesPage().render())
+
+    def test_dependencies(self):
+        """ Cards follow their reviews, amenities and owner """
+        self.page.render()
+        for obj, attr, value in [(self.review, 'text', 'Meh'),
+                                 (self.wifi, 'name', 'Fiber'),
+                                 (self.owner, 'last_name', 'Doe')]:
+            setattr(obj, attr, value)
+            obj.save()
+            self.assertIn(value, self.page.render())
+        self.assertEqual(self.page.render(), PlacesPage().render())
+
+    def test_deleted(self):
+        """ Cards of deleted places are dropped """
+        self.page.render()
+        storage.delete(self.other)
+        self.assertNotIn('Tiny house', self.page.render())
+        self.assertNotIn(('place', self.other.id), self.page.fragments)
+
+    def test_date(self):
+        """ Review dates use ordinal days """
+        self.assertEqual(_date(datetime(2017, 1, 27)), '27th January 2017')
+        self.assertEqual(_date(datetime(2017, 1, 1)), '1st January 2017')
+        self.assertEqual(_date(datetime(2017, 1, 12)), '12th January 2017')
+        self.assertEqual(_date(datetime(2017, 1, 23)), '23rd January 2017')
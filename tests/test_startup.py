@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+""" Module for testing the console startup budget """
+import os
+import statistics
+import subprocess
+import sys
+import unittest
+from tests.benchmarks.bench_startup import BUDGET, ROOT, time_to_prompt
+
+
+def file_mode_env():
+    """ Environment selecting the file storage engine """
+    env = dict(os.environ)
+    env.pop('HBNB_TYPE_STORAGE', None)
+    return env
+
+
+class test_startup(unittest.TestCase):
+    """ Class to test what the console pays before its first prompt """
+
+    def run_python(self, code):
+        """ Runs code in a fresh file mode interpreter """
+        return subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                              env=file_mode_env(), capture_output=True,
+                              text=True, check=True).stdout.strip()
+
+    def test_no_sqlalchemy(self):
+        """ File mode never imports SQLAlchemy """
+        out = self.run_python(
+            'import sys, console; print("sqlalchemy" in sys.modules)')
+        self.assertEqual(out, 'False')
+
+    def test_no_schema(self):
+        """ Schemas are only imported by the commands that coerce values """
+        out = self.run_python(
+            'import sys, console; print("models.schema" in sys.modules)')
+        self.assertEqual(out, 'False')
+
+    def test_no_process_pool(self):
+        """ File mode only imports the reload workers for large files """
+        out = self.run_python('import sys, console; '
+                              'print("concurrent.futures" in sys.modules)')
+        self.assertEqual(out, 'False')
+
+    def test_lazy_reload(self):
+        """ Storage is not loaded until it is used """
+        out = self.run_python(
+            'import console; print(console.storage._FileStorage__loaded)')
+        self.assertEqual(out, 'False')
+
+    @unittest.skipIf(os.getenv('HBNB_TYPE_STORAGE') == 'db', "file mode")
+    @unittest.skipUnless(os.getenv('HBNB_STARTUP_BUDGET'),
+                         "timing, set HBNB_STARTUP_BUDGET to run")
+    def test_prompt_budget(self):
+        """ The first prompt shows up within the startup budget """
+        median = statistics.median(time_to_prompt() for _ in range(3))
+        self.assertLessEqual(median, BUDGET)